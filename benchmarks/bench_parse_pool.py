@@ -0,0 +1,81 @@
+"""Measures how extraction throughput scales with the parse pool's process count.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parse_pool --version v1 [--processes 1,2,4,8] [--rounds 5]
+
+Every page of the recorded corpus is extracted ``--rounds`` times, first
+in-process on a single core, then through a ``ParsePool`` of each size. Workers
+are started before timing, so the numbers are steady-state pages per second.
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.record_corpus import CORPUS_DIR, load_manifest
+from scraper.parse_pool import PAGES_PER_WORKER, ParsePool, extract_page
+
+
+def load_pages(version_dir, manifest):
+    pages = []
+    for page in manifest["pages"]:
+        with open(os.path.join(version_dir, page["path"]), "rb") as f:
+            pages.append((page["site"], page["url"], f.read(), "utf-8"))
+    return pages
+
+
+def bench_in_process(pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            extract_page(*page)
+    return len(pages) * rounds / (time.perf_counter() - start)
+
+
+async def _extract_all(pool, pages):
+    await asyncio.gather(*(pool.extract(*page) for page in pages))
+
+
+def bench_pool(pages, rounds, processes, pages_per_worker):
+    pool = ParsePool(processes=processes, pages_per_worker=pages_per_worker)
+    try:
+        # Warm up: start every worker and import the extractors there
+        asyncio.run(_extract_all(pool, pages[:1] * processes))
+        start = time.perf_counter()
+        asyncio.run(_extract_all(pool, pages * rounds))
+        return len(pages) * rounds / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_sizes = sorted({1, 2, cpus // 2, cpus} - {0})
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", required=True, help="Corpus version to replay, e.g. v1")
+    parser.add_argument("--processes", default=",".join(map(str, default_sizes)),
+                        help="Comma-separated pool sizes to measure")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the corpus per run")
+    parser.add_argument("--pages-per-worker", type=int, default=PAGES_PER_WORKER,
+                        help="Pages a worker extracts before it is replaced")
+    args = parser.parse_args()
+
+    version_dir = os.path.join(CORPUS_DIR, args.version)
+    manifest = load_manifest(version_dir)
+    if not manifest["pages"]:
+        parser.error(f"Corpus {args.version} is empty; record it with python -m benchmarks.record_corpus")
+    pages = load_pages(version_dir, manifest)
+
+    baseline = bench_in_process(pages, args.rounds)
+    print(f"{cpus} CPUs, {len(pages)} pages x {args.rounds} rounds\n")
+    print(f"{'workers':<12} {'pages/s':>9} {'speedup':>8}")
+    print(f"{'in-process':<12} {baseline:>9.1f} {1:>7.2f}x")
+    for processes in (int(n) for n in args.processes.split(",")):
+        rate = bench_pool(pages, args.rounds, processes, args.pages_per_worker)
+        print(f"{processes:<12} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
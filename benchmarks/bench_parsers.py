@@ -0,0 +1,69 @@
+"""Compares parse time and peak memory of each parser backend on stored pages.
+
+Run from the repository root against a directory of saved ``.html`` pages:
+
+    python -m benchmarks.bench_parsers PAGES_DIR [--repeat 5]
+
+Every installed backend is measured three ways: a full parse, a full parse
+followed by ``prune_page`` (what the product scrapers do) and a parse through
+the ``SEARCH_PAGE`` strainer (what the search probes do).
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from scraper.parsing import BACKENDS, SEARCH_PAGE, make_soup, prune_page
+
+MODES = {
+    "full": lambda html, backend: make_soup(html, backend=backend),
+    "full+prune": lambda html, backend: prune_page(make_soup(html, backend=backend)),
+    "search strainer": lambda html, backend: make_soup(html, SEARCH_PAGE, backend=backend),
+}
+
+
+def measure(parse, html, backend, repeat):
+    """Returns (best wall time in seconds, peak traced memory in bytes) for one page."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(html, backend)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(html, backend)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", help="Directory containing saved .html pages")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per page (best is kept)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pages, "**", "*.html"), recursive=True))
+    if not paths:
+        parser.error(f"No .html files found under {args.pages}")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            pages.append(f.read())
+    print(f"{len(pages)} pages, {sum(map(len, pages)) / 1024:.0f} KiB total\n")
+
+    print(f"{'backend':<12} {'mode':<16} {'total ms':>10} {'ms/page':>9} {'max peak MiB':>13}")
+    for backend in BACKENDS:
+        for mode, parse in MODES.items():
+            total, peak = 0.0, 0
+            for html in pages:
+                elapsed, page_peak = measure(parse, html, backend, args.repeat)
+                total += elapsed
+                peak = max(peak, page_peak)
+            print(f"{backend:<12} {mode:<16} {total * 1000:>10.1f} "
+                  f"{total * 1000 / len(pages):>9.2f} {peak / 2 ** 20:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compares canonical MedicineRecords with the plain product dicts they replace.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_records --version v1 [--count 20000]
+    python -m benchmarks.bench_records --input results.jsonl [--count 20000]
+
+The product records come from the recorded corpus (every page extracted
+once) or from a JSON Lines file of ``scrape_product`` results or
+``scraper.batch`` lookups. They are repeated up to ``--count`` and loaded
+the way a batch job would load them, from one JSON line each, so no two
+records share strings. For each representation the benchmark reports the
+memory that stays allocated (tracemalloc), JSON Lines dump and load time,
+and the columnar round trip for the records.
+"""
+import argparse
+import io
+import itertools
+import json
+import os
+import time
+import tracemalloc
+
+from benchmarks.bench_parse_pool import load_pages
+from benchmarks.record_corpus import CORPUS_DIR, load_manifest
+from scraper.parse_pool import extract_page
+from scraper.records import MedicineRecord, dump_jsonl, from_columns, load_jsonl, to_columns
+
+
+def corpus_products(version):
+    version_dir = os.path.join(CORPUS_DIR, version)
+    manifest = load_manifest(version_dir)
+    return [extract_page(*page) for page in load_pages(version_dir, manifest)]
+
+
+def file_products(path):
+    products = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            products += data["results"].values() if "results" in data else [data]
+    return [product for product in products if "error" not in product]
+
+
+def retained(build):
+    """Returns ``(result, bytes still allocated after build())``."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--version", help="Corpus version to extract, e.g. v1")
+    source.add_argument("--input", help="JSON Lines file of product records or batch lookups")
+    parser.add_argument("--count", type=int, default=20000, help="Records held in memory")
+    args = parser.parse_args()
+
+    products = corpus_products(args.version) if args.version else file_products(args.input)
+    if not products:
+        parser.error("No product records to load")
+    product_lines = [json.dumps(product, ensure_ascii=False)
+                     for product in itertools.islice(itertools.cycle(products), args.count)]
+    record_lines = [json.dumps(MedicineRecord.from_product(json.loads(line)).to_dict(),
+                               ensure_ascii=False) for line in product_lines]
+
+    dicts, dict_bytes = retained(lambda: [json.loads(line) for line in product_lines])
+    records, record_bytes = retained(
+        lambda: [MedicineRecord.from_dict(json.loads(line)) for line in record_lines])
+
+    out = io.StringIO()
+    _, dict_dump = timed(lambda: [out.write(json.dumps(d, ensure_ascii=False) + "\n") for d in dicts])
+    dict_text = out.getvalue()
+    _, dict_load = timed(lambda: [json.loads(line) for line in io.StringIO(dict_text)])
+    out = io.StringIO()
+    _, record_dump = timed(lambda: dump_jsonl(records, out))
+    record_text = out.getvalue()
+    loaded, record_load = timed(lambda: list(load_jsonl(io.StringIO(record_text))))
+    assert loaded == records
+    columns, to_cols = timed(lambda: to_columns(records))
+    rebuilt, from_cols = timed(lambda: from_columns(columns))
+    assert rebuilt == records
+    column_text = json.dumps(columns, ensure_ascii=False)
+
+    n = len(product_lines)
+    print(f"{len(products)} distinct products, {n} held\n")
+    print(f"{'':<10} {'retained':>10} {'per record':>11} {'dump':>8} {'load':>8} {'JSONL':>9}")
+    for label, size, dump, load, text in (("dicts", dict_bytes, dict_dump, dict_load, dict_text),
+                                          ("records", record_bytes, record_dump, record_load,
+                                           record_text)):
+        print(f"{label:<10} {size / 2**20:>8.1f}MB {size / n:>9.0f} B {dump * 1000:>6.0f}ms "
+              f"{load * 1000:>6.0f}ms {len(text) / 2**20:>7.1f}MB")
+    print(f"\nrecords use {record_bytes / dict_bytes:.0%} of the dicts' memory")
+    print(f"columns: to {to_cols * 1000:.0f}ms, from {from_cols * 1000:.0f}ms, "
+          f"{len(column_text) / 2**20:.1f}MB as JSON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+"""Replays a recorded page corpus through the scrapers and reports speed and accuracy.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scrapers --version v1 [--repeat 3] [--output results.json]
+    python -m benchmarks.bench_scrapers --version v1 --compare baseline.json
+
+For every site scraper (and for ``scrape_product`` end to end) it reports parse
+time, extraction time, peak traced allocations (worst page and per-page mean),
+peak RSS and the share of fields that came back non-empty. ``--output`` writes
+the numbers as JSON so two commits can be diffed; ``--compare`` does that diff
+and exits non-zero when a timing or the mean allocation regresses by more than
+``--threshold`` or field completion drops.
+No network access is needed: ``scrape_product`` is served from a throwaway
+response cache filled with the corpus pages, with the product catalog
+switched off so every run parses and extracts (and nothing lands in the
+user's catalog).
+"""
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from benchmarks.record_corpus import CORPUS_DIR, load_manifest
+from scraper import catalog, http_cache
+from scraper.extractors import scrape_1mg, scrape_apollo, scrape_truemeds
+from scraper.http_cache import ResponseCache
+from scraper.parsing import DEFAULT_BACKEND, make_soup, prune_page
+from scraper.pipeline import scrape_product
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; peak RSS is reported as None
+    resource = None
+
+SITE_SCRAPERS = {
+    "1mg": scrape_1mg,
+    "apollo": scrape_apollo,
+    "truemeds": scrape_truemeds,
+}
+TIMINGS = ("parse_ms", "extract_ms")
+
+
+def field_completion(details):
+    """Share of a scraper's fields that came back non-empty."""
+    if not details:
+        return 0.0
+    return sum(1 for value in details.values() if value) / len(details)
+
+
+def best_of(repeat, fn, *args):
+    """Returns (best wall time in ms, last result) over repeat runs."""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def traced_peak_kib(fn, *args):
+    """Peak memory traced by tracemalloc while fn runs, in KiB."""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def parse_page(html):
+    """Parses a page the way scrape_product does."""
+    return prune_page(make_soup(html))
+
+
+def bench_site_pages(name, scrape, pages, repeat):
+    """Measures one site scraper over its pages; returns per-page rows."""
+    rows = []
+    for page in pages:
+        parse_ms, soup = best_of(repeat, parse_page, page["html"])
+        extract_ms, details = best_of(repeat, scrape, soup)
+        rows.append({
+            "function": name,
+            "path": page["path"],
+            "parse_ms": round(parse_ms, 3),
+            "extract_ms": round(extract_ms, 3),
+            "alloc_peak_kib": round(traced_peak_kib(scrape, soup), 1),
+            "field_completion": round(field_completion(details), 3),
+        })
+    return rows
+
+
+@contextlib.contextmanager
+def replay_from(cache):
+    """Serves fetches from cache with the catalog disabled, then restores both."""
+    saved = (http_cache._cache, http_cache._cache_enabled, catalog._catalog, catalog._catalog_enabled)
+    http_cache.set_cache(cache)
+    catalog.set_catalog(None)  # Catalog hits would skip the parse and extraction being timed
+    try:
+        yield
+    finally:
+        (http_cache._cache, http_cache._cache_enabled,
+         catalog._catalog, catalog._catalog_enabled) = saved
+
+
+def bench_scrape_product(pages, repeat):
+    """Measures scrape_product end to end, replaying pages from a temporary cache."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResponseCache(path=os.path.join(tmp, "replay.sqlite"), default_ttl=10 ** 9,
+                              host_ttls={}, max_bytes=10 ** 12)
+        for page in pages:
+            r = requests.Response()
+            r.status_code = 200
+            r.url = page["url"]
+            r.headers = CaseInsensitiveDict({"Content-Type": "text/html; charset=utf-8"})
+            r._content = page["html"].encode("utf-8")
+            cache.store(page["url"], r)
+        with replay_from(cache):
+            rows = []
+            for page in pages:
+                # scrape_product parses and extracts in one go, so it has a single timing
+                total_ms, result = best_of(repeat, scrape_product, page["url"])
+                rows.append({
+                    "function": "scrape_product",
+                    "path": page["path"],
+                    "parse_ms": None,
+                    "extract_ms": round(total_ms, 3),
+                    "alloc_peak_kib": round(traced_peak_kib(scrape_product, page["url"]), 1),
+                    "field_completion": round(field_completion(result.get("details")), 3),
+                })
+    return rows
+
+
+def run_isolated(fn, *args):
+    """Runs fn in a forked child so its peak RSS can be measured on its own.
+
+    Returns (result, peak RSS in KiB). Without fork (Windows) fn runs in this
+    process and the peak RSS is None.
+    """
+    if resource is None or not hasattr(os, "fork"):
+        return fn(*args), None
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        with os.fdopen(write_fd, "w") as out:
+            json.dump(fn(*args), out)
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd) as inp:
+        payload = inp.read()
+    _, status, usage = os.wait4(pid, 0)
+    if status != 0:
+        raise RuntimeError(f"Benchmark child for {fn.__name__} failed")
+    return json.loads(payload), usage.ru_maxrss
+
+
+def summarize(rows, peak_rss_kib):
+    """Aggregates per-page rows into the per-function summary."""
+    summary = {"pages": len(rows), "peak_rss_kib": peak_rss_kib}
+    for key in TIMINGS:
+        values = [row[key] for row in rows if row[key] is not None]
+        summary[key] = round(sum(values), 3) if values else None
+    summary["alloc_peak_kib"] = max(row["alloc_peak_kib"] for row in rows)
+    summary["alloc_mean_kib"] = round(sum(row["alloc_peak_kib"] for row in rows) / len(rows), 1)
+    summary["field_completion"] = round(sum(row["field_completion"] for row in rows) / len(rows), 3)
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Prints a per-function diff against a baseline; returns True if anything regressed."""
+    regressed = False
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} (threshold {threshold:.0%}):")
+    for name, now in current["functions"].items():
+        before = baseline["functions"].get(name)
+        if before is None:
+            print(f"  {name}: no baseline")
+            continue
+        for key in TIMINGS + ("alloc_mean_kib", "field_completion"):
+            if now.get(key) is None or before.get(key) is None:
+                continue  # Not measured, or a baseline from before the metric existed
+            change = (now[key] - before[key]) / before[key] if before[key] else 0.0
+            if key == "field_completion":
+                bad = now[key] < before[key]
+            else:
+                bad = change > threshold
+            regressed |= bad
+            flag = "  REGRESSION" if bad else ""
+            print(f"  {name:<16} {key:<17} {before[key]:>10} -> {now[key]:>10} ({change:+.1%}){flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--version", required=True, help="Corpus version to replay, e.g. v1")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per page (best is kept)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier --output run")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative slowdown that counts as a regression (default 0.10)")
+    args = parser.parse_args()
+
+    version_dir = os.path.join(CORPUS_DIR, args.version)
+    manifest = load_manifest(version_dir)
+    if not manifest["pages"]:
+        parser.error(f"Corpus {args.version} is empty; record it with python -m benchmarks.record_corpus")
+    pages = []
+    for page in manifest["pages"]:
+        with open(os.path.join(version_dir, page["path"]), encoding="utf-8") as f:
+            pages.append(dict(page, html=f.read()))
+
+    results = {
+        "corpus": args.version,
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "parser_backend": DEFAULT_BACKEND,
+        "repeat": args.repeat,
+        "functions": {},
+        "pages": [],
+    }
+
+    groups = [(f"scrape_{site}", bench_site_pages, (f"scrape_{site}", scrape,
+                                                    [p for p in pages if p["site"] == site], args.repeat))
+              for site, scrape in SITE_SCRAPERS.items()]
+    groups.append(("scrape_product", bench_scrape_product, (pages, args.repeat)))
+
+    print(f"{'function':<16} {'pages':>5} {'parse ms':>10} {'extract ms':>11} "
+          f"{'alloc KiB':>10} {'RSS KiB':>9} {'fields':>7}")
+    for name, bench, bench_args in groups:
+        if not bench_args[-2]:
+            continue
+        rows, peak_rss = run_isolated(bench, *bench_args)
+        summary = summarize(rows, peak_rss)
+        results["functions"][name] = summary
+        results["pages"] += rows
+        parse_ms = "-" if summary["parse_ms"] is None else f"{summary['parse_ms']:.1f}"
+        print(f"{name:<16} {summary['pages']:>5} {parse_ms:>10} "
+              f"{summary['extract_ms']:>11.1f} {summary['alloc_peak_kib']:>10.0f} "
+              f"{summary['peak_rss_kib'] or 0:>9} {summary['field_completion']:>7.1%}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Records live product pages into a versioned fixture corpus for offline benchmarks.
+
+Run from the repository root:
+
+    python -m benchmarks.record_corpus --version v1 [URL ...] [--urls-file FILE]
+
+With no URLs, the seed product pages from the search index are recorded.
+Pages are written to ``benchmarks/corpus/<version>/<site>/<slug>.html`` and
+listed in that version's ``manifest.json`` together with their SHA-256, so a
+corpus can be replayed (and compared between commits) without the network.
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import urlsplit
+
+from scraper.extractors import site_for
+from scraper.http_client import fetch
+from scraper.search_index import SEED_URLS
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+
+def slug_for(url):
+    """Turns a URL path into a file-system friendly page name."""
+    path = urlsplit(url).path.strip("/") or "index"
+    return re.sub(r"[^A-Za-z0-9._-]+", "_", path)[:120]
+
+
+def load_manifest(version_dir):
+    path = os.path.join(version_dir, "manifest.json")
+    if not os.path.exists(path):
+        return {"pages": []}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record(urls, version):
+    """Fetches each URL and adds it to the corpus version; returns the manifest."""
+    version_dir = os.path.join(CORPUS_DIR, version)
+    manifest = load_manifest(version_dir)
+    pages = {page["url"]: page for page in manifest["pages"]}
+
+    for url in urls:
+        site = site_for(url)
+        if site is None:
+            print(f"Skipping {url}: no scraper for this site")
+            continue
+        try:
+            r = fetch(url, use_cache=False)
+            r.raise_for_status()
+        except Exception as e:
+            print(f"Skipping {url}: {e}")
+            continue
+
+        relative = os.path.join(site, slug_for(url) + ".html")
+        os.makedirs(os.path.join(version_dir, site), exist_ok=True)
+        body = r.text.encode("utf-8")
+        with open(os.path.join(version_dir, relative), "wb") as f:
+            f.write(body)
+
+        pages[url] = {
+            "url": url,
+            "site": site,
+            "path": relative.replace(os.sep, "/"),
+            "sha256": hashlib.sha256(body).hexdigest(),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        print(f"Recorded {url} -> {relative} ({len(body) / 1024:.0f} KiB)")
+
+    manifest = {"version": version, "pages": sorted(pages.values(), key=lambda page: page["path"])}
+    os.makedirs(version_dir, exist_ok=True)
+    with open(os.path.join(version_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("urls", nargs="*", help="Product page URLs to record")
+    parser.add_argument("--urls-file", help="File with one URL per line")
+    parser.add_argument("--version", required=True, help="Corpus version to add the pages to, e.g. v1")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, encoding="utf-8") as f:
+            urls += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    if not urls:
+        urls = [url for site_urls in SEED_URLS.values() for url in site_urls.values()]
+
+    manifest = record(urls, args.version)
+    print(f"Corpus {args.version}: {len(manifest['pages'])} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Scraping core for the medicine scraper: HTTP access, caching and extraction.
+
+Nothing in this package depends on Streamlit, so it can be used from the
+batch CLI (``python -m scraper.batch``) or any other script. Every entry
+point has an ``*_async`` coroutine version for callers with their own event
+loop; the plain functions block until it finishes.
+"""
+from scraper.extractors import scrape_1mg, scrape_apollo, scrape_truemeds
+from scraper.pipeline import (ASYNC_SEARCHERS, SEARCHERS, lookup, lookup_async, run_pipeline,
+                              run_pipeline_async, scrape_product, scrape_product_async)
+from scraper.search import (race_candidates, race_candidates_async, search_1mg, search_1mg_async,
+                            search_apollo, search_apollo_async, search_truemeds,
+                            search_truemeds_async)
+
+__all__ = [
+    "ASYNC_SEARCHERS",
+    "SEARCHERS",
+    "lookup",
+    "lookup_async",
+    "race_candidates",
+    "race_candidates_async",
+    "run_pipeline",
+    "run_pipeline_async",
+    "scrape_1mg",
+    "scrape_apollo",
+    "scrape_product",
+    "scrape_product_async",
+    "scrape_truemeds",
+    "search_1mg",
+    "search_1mg_async",
+    "search_apollo",
+    "search_apollo_async",
+    "search_truemeds",
+    "search_truemeds_async",
+]
@@ -0,0 +1,432 @@
+"""asyncio core: one event loop and one async HTTP client shared by every lookup.
+
+The search and scrape helpers used to block a thread per request, so a few
+hundred concurrent lookups meant a few hundred threads. Their ``*_async``
+versions run as coroutines instead, all on one event loop:
+
+* network I/O goes through a shared ``httpx.AsyncClient`` when httpx is
+  installed (``pip install httpx``); without it each request falls back to
+  the blocking ``http_client.fetch`` on a bounded thread pool, so behaviour is
+  the same, only less scalable;
+* HTML parsing is CPU-bound, so it runs on a separate executor
+  (``run_parse``) and never stalls the loop while other requests are in
+  flight;
+* responses are handed around as ``requests.Response`` objects either way, so
+  the response cache, the rate limiter and every check/extractor work
+  unchanged.
+
+The sync functions are thin wrappers: ``run_sync`` submits the coroutine to a
+background loop thread and waits for it, so Streamlit and other blocking
+callers keep working, from any number of threads.
+"""
+import asyncio
+import contextlib
+import contextvars
+import functools
+import os
+import queue
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from scraper.http_cache import get_cache
+from scraper.http_client import (BACKOFF_FACTOR, CHUNK_SIZE, HEADERS, MAX_RESPONSE_BYTES,
+                                 MAX_SCAN_BYTES, POOL_CONNECTIONS, POOL_MAXSIZE, READ_REST,
+                                 REQUEST_TIMEOUT, RETRIES, RETRY_STATUSES, ResponseTooLarge, cache_response,
+                                 close_response, fetch, read_body, record_cache, record_download,
+                                 record_response, scan_body)
+from scraper import tracing
+from scraper.rate_limiter import get_limiter
+
+try:
+    import httpx
+except ImportError:  # Optional: falls back to the blocking client on threads
+    httpx = None
+
+IO_WORKERS = 32                      # Threads for blocking fetches and disk access
+PARSE_WORKERS = os.cpu_count() or 2  # Threads for HTML parsing
+
+_loop = None
+_loop_lock = threading.Lock()
+_executors = {}
+_clients = weakref.WeakKeyDictionary()  # Event loop -> its httpx client
+_flights = {}  # (function, key) -> its call in flight; only used on the loop thread
+
+
+def _reset_after_fork():
+    """Forgets the parent's loop thread and executors, which don't exist in a forked child."""
+    global _loop, _loop_lock
+    _loop, _loop_lock = None, threading.Lock()
+    _executors.clear()
+    _clients.clear()
+    _flights.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+# ---------- Event Loop ----------
+
+def get_loop():
+    """Returns the background event loop used by the sync wrappers, starting it on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="scraper-aio", daemon=True).start()
+                _loop = loop
+    return _loop
+
+
+def _bind_context(coro):
+    """Runs coro with the caller's context variables (e.g. its open trace span)
+    rather than the loop thread's."""
+    context = contextvars.copy_context()
+
+    async def bound():
+        for var, value in context.items():
+            var.set(value)
+        return await coro
+    return bound()
+
+
+def run_sync(coro):
+    """Runs a coroutine on the background loop and blocks until it returns."""
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("Blocking scraper call made from the scraper event loop; "
+                           "await the *_async version instead")
+
+    future = asyncio.run_coroutine_threadsafe(_bind_context(coro), loop)
+    try:
+        return future.result()
+    except BaseException:
+        future.cancel()  # e.g. KeyboardInterrupt: don't leave the work running
+        raise
+
+
+def iter_sync(agen):
+    """Iterates an async generator from blocking code, via the background loop."""
+    items = queue.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except Exception as e:
+            items.put((done, e))
+        else:
+            items.put((done, None))
+
+    future = asyncio.run_coroutine_threadsafe(_bind_context(pump()), get_loop())
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        future.cancel()
+
+
+# ---------- Executors ----------
+
+def _executor(kind, workers):
+    executor = _executors.get(kind)
+    if executor is None:
+        with _loop_lock:
+            executor = _executors.get(kind)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"scraper-{kind}")
+                _executors[kind] = executor
+    return executor
+
+
+async def _in_executor(executor, fn, *args, on_cancel=None, **kwargs):
+    """Runs fn in an executor; if the caller is cancelled mid-call, on_cancel
+    gets fn's result once the thread is done with it."""
+    context = contextvars.copy_context()  # Spans opened in fn nest under the caller's
+    future = executor.submit(context.run, functools.partial(fn, *args, **kwargs))
+    try:
+        return await asyncio.wrap_future(future)
+    except asyncio.CancelledError:
+        if on_cancel is not None:
+            future.add_done_callback(
+                lambda f: f.cancelled() or f.exception() is not None or on_cancel(f.result()))
+        raise
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Runs blocking I/O (a sync fetch, a SQLite call) off the event loop."""
+    return await _in_executor(_executor("io", IO_WORKERS), fn, *args, **kwargs)
+
+
+async def run_parse(fn, *args, **kwargs):
+    """Runs CPU-bound parsing off the event loop."""
+    return await _in_executor(_executor("parse", PARSE_WORKERS), fn, *args, **kwargs)
+
+
+# ---------- Single Flight ----------
+# Concurrent lookups of one medicine (app sessions, batch workers) would
+# each run the same searches and scrape the same pages. The first call for a
+# key does the work; calls made while it runs wait for the same result.
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+def coalesce(key):
+    """Decorates a coroutine function so concurrent calls with equal keys share one call.
+
+    ``key`` maps the call's arguments to the key of the work it does. Every
+    caller gets the same result object, so results must be treated as
+    read-only. The shared call is cancelled only once all of its callers
+    have been; a finished call is forgotten, so later calls run again.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            flight_key = (fn, key(*args, **kwargs))
+            flight = _flights.get(flight_key)
+            if flight is None:
+                flight = _flights[flight_key] = _Flight(asyncio.ensure_future(fn(*args, **kwargs)))
+                flight.task.add_done_callback(
+                    lambda _: _flights.get(flight_key) is flight and _flights.pop(flight_key))
+                waiting = contextlib.nullcontext()
+            else:
+                tracing.inc("scraper_coalesced_total", function=fn.__name__)
+                waiting = tracing.span("coalesced", function=fn.__name__)
+
+            flight.waiters += 1
+            try:
+                with waiting:
+                    return await asyncio.shield(flight.task)
+            finally:
+                flight.waiters -= 1
+                if not flight.waiters and not flight.task.done():
+                    # Every caller gave up: stop the work, and let the next call start afresh
+                    flight.task.cancel()
+                    if _flights.get(flight_key) is flight:
+                        del _flights[flight_key]
+        return wrapper
+    return decorator
+
+
+# ---------- Async HTTP ----------
+
+def _client():
+    """Returns the httpx client for the running loop (clients can't be shared across loops)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        limits = httpx.Limits(max_connections=POOL_CONNECTIONS * POOL_MAXSIZE,
+                              max_keepalive_connections=POOL_CONNECTIONS * POOL_MAXSIZE)
+        # httpx advertises the encodings it can actually decode
+        headers = {k: v for k, v in HEADERS.items() if k != "Accept-Encoding"}
+        client = httpx.AsyncClient(headers=headers, limits=limits, follow_redirects=True,
+                                   transport=httpx.AsyncHTTPTransport(retries=RETRIES, limits=limits))
+        _clients[loop] = client
+    return client
+
+
+def _to_response(resp, content):
+    """Converts an httpx response into the ``requests.Response`` the rest of the core expects."""
+    r = requests.Response()
+    r.status_code = resp.status_code
+    r.reason = resp.reason_phrase
+    r.url = str(resp.url)
+    r.headers = CaseInsensitiveDict(resp.headers)
+    r.encoding = get_encoding_from_headers(r.headers)
+    r._content = content
+    r._content_consumed = True
+    return r
+
+
+async def _read_httpx(resp, max_bytes=MAX_RESPONSE_BYTES):
+    """Reads a streamed httpx body, raising ResponseTooLarge past max_bytes."""
+    length = resp.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        raise ResponseTooLarge(f"{resp.url} is {length} bytes, over the {max_bytes} byte cap")
+    chunks, size = [], 0
+    with tracing.span("http.download") as download:
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                record_download(str(resp.url), size, download)
+                raise ResponseTooLarge(f"{resp.url} is over the {max_bytes} byte cap")
+            chunks.append(chunk)
+        record_download(str(resp.url), size, download)
+    return _to_response(resp, b"".join(chunks))
+
+
+async def _scan_httpx(resp, consume, max_bytes=MAX_SCAN_BYTES):
+    """Async ``http_client.scan_body`` for a streamed httpx response."""
+    if resp.status_code != 200:
+        return await _read_httpx(resp)
+    chunks, size = [], 0
+    truncated = False
+    scanning = True
+    with tracing.span("http.download", scanned=True) as download:
+        async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+            chunks.append(chunk)
+            size += len(chunk)
+            if scanning:
+                result = await run_parse(consume, chunk)
+                if result is READ_REST:
+                    scanning = False
+                elif result or size >= max_bytes:
+                    truncated = True  # Leaving the stream early drops the rest with the connection
+                    break
+            if size > MAX_RESPONSE_BYTES:
+                record_download(str(resp.url), size, download)
+                raise ResponseTooLarge(f"{resp.url} is over the {MAX_RESPONSE_BYTES} byte cap")
+        record_download(str(resp.url), size, download)
+    r = _to_response(resp, b"".join(chunks))
+    if truncated:
+        r.truncated = True
+    return r
+
+
+def _trace_hook():
+    """httpx trace extension: connection and request steps become ``http.*`` spans.
+
+    DNS resolution is part of ``http.connect_tcp``. The body is timed by the
+    readers as ``http.download``.
+    """
+    steps = {}
+
+    async def hook(event, info):
+        step, _, phase = event.rpartition(".")
+        if step.endswith(("receive_response_body", "response_closed")):
+            return
+        if phase == "started":
+            steps[step] = tracing.start_span("http." + step.rpartition(".")[2])
+        elif step in steps:
+            steps.pop(step).end()
+    return hook
+
+
+async def _send_httpx(url, timeout, headers, read):
+    """GETs a URL once with httpx.
+
+    The body is streamed; ``read(resp)`` consumes it and returns the
+    ``requests.Response``.
+    """
+    try:
+        async with _client().stream("GET", url, headers=headers, timeout=timeout,
+                                    extensions={"trace": _trace_hook()}) as resp:
+            record_response(url, resp.status_code)
+            return await read(resp)
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+async def _send(url, timeout, headers, read):
+    """Sends a GET with httpx, paced by the per-host rate limiter.
+
+    5xx responses are retried with backoff like the blocking session does;
+    the host's slot is given back while waiting to retry.
+    """
+    limiter = get_limiter()
+    send = functools.partial(_send_httpx, url, timeout, headers, read)
+    for attempt in range(RETRIES + 1):
+        r = await (send() if limiter is None else limiter.request_async(url, send))
+        if r.status_code not in RETRY_STATUSES or attempt == RETRIES:
+            return r
+        await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+
+
+def _read_body(url, r, use_cache, consume):
+    if getattr(r, "from_cache", False):
+        return r
+    if consume is not None and r.status_code == 200:
+        scan_body(r, consume)
+    else:
+        read_body(r)
+    if use_cache:
+        cache_response(url, r)
+    return r
+
+
+async def _fetch_blocking(url, timeout, use_cache, consume, headers):
+    """Fetches with the blocking client on the I/O pool.
+
+    Headers and body are read in two steps so that a cancelled probe (a lost
+    race) never downloads its body.
+    """
+    r = await run_blocking(fetch, url, timeout=timeout, use_cache=use_cache, stream=True,
+                           headers=headers, on_cancel=close_response)
+    try:
+        return await run_blocking(_read_body, url, r, use_cache, consume, on_cancel=close_response)
+    except BaseException:
+        close_response(r)
+        raise
+
+
+async def fetch_async(url, timeout=REQUEST_TIMEOUT, use_cache=True, consume=None, headers=None):
+    """Async ``http_client.fetch``: response cache, rate limiter, then the network.
+
+    Returns a ``requests.Response`` with its body already read. Bodies over
+    ``MAX_RESPONSE_BYTES`` raise ResponseTooLarge. ``headers`` are added to
+    the request.
+
+    With ``consume``, the body of a 200 response is handed to
+    ``consume(chunk)`` as it downloads (off the event loop) and reading stops
+    as soon as it returns True, or after ``MAX_SCAN_BYTES``. The response
+    then holds only the bytes read and is marked ``truncated``; truncated
+    responses are not cached. If it returns ``http_client.READ_REST`` the
+    rest of the body is read (and cached) without it. Cached responses are returned whole without
+    calling ``consume``.
+    """
+    headers = dict(headers or {})
+    with tracing.span("fetch", url=url) as fetch_span:
+        if httpx is None:
+            r = await _fetch_blocking(url, timeout, use_cache, consume, headers)
+        else:
+            r = await _fetch_httpx(url, timeout, use_cache, consume, headers)
+        fetch_span.attributes["status"] = r.status_code
+        fetch_span.attributes["bytes"] = len(r.content)
+        return r
+
+
+async def _fetch_httpx(url, timeout, use_cache, consume, headers):
+    read = _read_httpx if consume is None else functools.partial(_scan_httpx, consume=consume)
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        return await _send(url, timeout, headers, read)
+
+    entry = await run_blocking(cache.lookup, url)
+    if entry is not None and entry.fresh:
+        record_cache("hit")
+        return entry.to_response()
+
+    if entry is not None:
+        headers.update(entry.validators())
+    r = await _send(url, timeout, headers, read)
+    if entry is not None and r.status_code == 304:
+        record_cache("revalidated")
+        await run_blocking(cache.refresh, entry)
+        return entry.to_response()
+    record_cache("miss")
+    await run_blocking(cache.store, url, r)
+    return r
@@ -0,0 +1,185 @@
+"""Headless batch entry point: scrape many medicine names without the UI.
+
+Reads one medicine name per line from a file (or stdin) and writes one JSON
+record per line, as produced by ``scraper.pipeline.lookup``:
+
+    python -m scraper.batch names.txt --output results.jsonl --workers 8
+    cat names.txt | python -m scraper.batch - > results.jsonl
+
+With ``--canonical`` every site result is written in the cross-site schema
+of ``scraper.records`` instead of the site's own detail keys.
+
+With ``--export FILE`` the site results are also written to a Parquet,
+Arrow or JSON Lines file in that schema while the job runs (see
+``scraper.export``). A resumed job keeps the earlier export: JSON Lines is
+appended to, Parquet and Arrow rows go to the next numbered file beside it
+(``results.1.parquet``). Parquet and Arrow files are only complete once
+the job ends; after a hard crash the interrupted run's ``FILE.part`` can't
+be read. It is left in place (the resumed rows go to the next numbered
+file), and its rows are rebuilt from the JSON Lines output with
+``python -m scraper.export``.
+
+With ``--checkpoint FILE`` every finished name is appended to FILE right
+after its result line is written. Re-running the same command after a crash
+skips those names, so a long job picks up where it stopped. A name that
+finished just before the crash may be written twice; the ``query`` field
+identifies duplicates.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from scraper import tracing
+from scraper.export import Exporter
+from scraper.pipeline import lookup
+from scraper.records import MedicineRecord
+
+
+def read_names(source):
+    """Yields the non-empty, non-comment lines of a name list."""
+    for line in source:
+        name = line.strip()
+        if name and not name.startswith("#"):
+            yield name
+
+
+def load_checkpoint(path):
+    """Returns the set of names recorded as finished in a checkpoint file."""
+    done = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line))
+                except json.JSONDecodeError:
+                    continue  # Partial line from an interrupted write
+    except FileNotFoundError:
+        pass
+    return done
+
+
+def canonical(record):
+    """A lookup record with every site result mapped into the canonical schema."""
+    results = {site: MedicineRecord.from_product(result).to_dict()
+               for site, result in record.get("results", {}).items()}
+    return {**record, "results": results}
+
+
+def run_batch(names, out, workers=4, checkpoint=None, done=(), log=sys.stderr, schema=None,
+              exporter=None):
+    """Looks up every name with a bounded worker pool, streaming JSON lines to out.
+
+    At most ``workers * 2`` names are queued at any time, so memory stays flat
+    however long the input is. ``schema`` (e.g. ``canonical``) transforms each
+    lookup record before it is written, and ``exporter`` (a ``scraper.export.Exporter``)
+    also gets every site result. Returns (processed, failed) counts.
+    """
+    lock = threading.Lock()
+    processed = failed = 0
+    started = time.time()
+
+    def emit(name, record):
+        if schema is not None and "error" not in record:
+            record = schema(record)
+        with lock:
+            if exporter is not None and "error" not in record:
+                exporter.write_lookup(record)
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if checkpoint is not None:
+                checkpoint.write(json.dumps(name, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+        seen = set(done)
+        for name in names:
+            if name in seen:
+                continue
+            seen.add(name)
+
+            # Keep the queue bounded: wait for a slot before submitting more
+            while len(pending) >= workers * 2:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    failed += _collect(future, pending.pop(future), emit, log)
+                    processed += 1
+            pending[executor.submit(lookup, name)] = name
+
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                failed += _collect(future, pending.pop(future), emit, log)
+                processed += 1
+
+    elapsed = time.time() - started
+    print(f"Processed {processed} names in {elapsed:.1f}s ({failed} failed)", file=log)
+    return processed, failed
+
+
+def _collect(future, name, emit, log):
+    """Writes one finished lookup; returns 1 if it failed, else 0."""
+    try:
+        record = future.result()
+    except Exception as e:
+        print(f"{name}: {e}", file=log)
+        emit(name, {"query": name, "error": str(e)})
+        return 1
+    emit(name, record)
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape medicine data for a list of names.")
+    parser.add_argument("input", help="File with one medicine name per line, or - for stdin")
+    parser.add_argument("--output", help="JSON Lines output file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=4, help="Names processed concurrently")
+    parser.add_argument("--checkpoint", help="File recording finished names, used to resume")
+    parser.add_argument("--canonical", action="store_true",
+                        help="Write site results in the cross-site record schema")
+    parser.add_argument("--export", help="Also write the site results to this Parquet, Arrow or "
+                                         "JSON Lines file (format from the extension)")
+    parser.add_argument("--verbose", action="store_true", help="Log every failed probe")
+    parser.add_argument("--metrics", help="Write Prometheus text metrics to this file at the end")
+    args = parser.parse_args()
+
+    # Diagnostics go to stderr so they never mix with JSON Lines on stdout
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if not args.verbose:
+        logging.getLogger("urllib3").setLevel(logging.ERROR)  # One line per connection retry
+
+    done = load_checkpoint(args.checkpoint) if args.checkpoint else set()
+    if done:
+        print(f"Resuming: skipping {len(done)} names already in {args.checkpoint}", file=sys.stderr)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    # Append when resuming so earlier results are kept
+    out = open(args.output, "a" if done else "w", encoding="utf-8") if args.output else sys.stdout
+    checkpoint = open(args.checkpoint, "a", encoding="utf-8") if args.checkpoint else None
+    exporter = None
+    if args.export:
+        if os.path.exists(args.export + ".part"):
+            print(f"{args.export}.part is left from an interrupted run and can't be read; rebuild its "
+                  f"rows from the output with python -m scraper.export", file=sys.stderr)
+        exporter = Exporter(args.export, append=bool(done))
+    try:
+        _, failed = run_batch(read_names(source), out, args.workers, checkpoint, done,
+                              schema=canonical if args.canonical else None, exporter=exporter)
+    finally:
+        for f in (source, out, checkpoint, exporter):
+            if f not in (None, sys.stdin, sys.stdout):
+                f.close()
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            f.write(tracing.metrics.prometheus())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
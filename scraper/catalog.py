@@ -0,0 +1,321 @@
+"""Persistent catalog of scraped product records.
+
+Every successful ``scrape_product`` result is stored here, normalized to a
+few indexed columns next to the full record:
+
+* medicine name, composition (one row per active ingredient) and
+  manufacturer, each indexed for lookups by their leading words;
+* an FTS5 full-text index over name, composition, uses and side effects.
+
+``scrape_product`` answers from the catalog while a record is younger than
+``RECORD_TTL``; together with the search index a repeated query is answered
+without touching the network or the parser. Stored records can be queried
+directly:
+
+    python -m scraper.catalog ingredient levocetirizine
+    python -m scraper.catalog search "drowsiness"
+    python -m scraper.catalog import results.jsonl    # scraper.batch output
+"""
+import argparse
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+from scraper.extractors import site_for
+from scraper.search_index import normalize_query
+from scraper.settings import data_path
+
+# ---------- Defaults ----------
+RECORD_TTL = 24 * 3600
+LIMIT = 50
+
+# Detail fields holding each full-text column, per site
+SITE_TEXT_FIELDS = {
+    "1mg": {"uses": ["uses_and_benefits", "overview"], "side_effects": ["side_effects"]},
+    "apollo": {"uses": ["uses_and_benefits", "about_medicine"], "side_effects": ["side_effects"]},
+    "truemeds": {"uses": ["uses"], "side_effects": ["side_effects"]},
+}
+
+# Label-value pairs such as "Composition: Levocetirizine (5mg) | Manufacturer: ..."
+# end at the next label, a " | " separator or the end of the text
+_LABELS = ["salt composition", "composition", "manufacturer", "manufactured by", "marketed by",
+           "therapeutic class", "habit forming"]
+_NEXT_LABEL = r"(?=\s*(?:\||\b(?:" + "|".join(_LABELS) + r")\b|$))"
+_COMPOSITION = re.compile(r"\b(?:salt composition|composition)\s*:?\s*(.+?)" + _NEXT_LABEL,
+                          re.IGNORECASE)
+# "... contains Amoxycillin and Clavulanic Acid." (ingredient names are capitalized)
+_INGREDIENT = r"[A-Z][\w-]*(?:\s+(?:[A-Z][\w-]*|acid|sodium|potassium|calcium|hydrochloride))*"
+_CONTAINS = re.compile(r"\bcontains\s+(?:the\s+)?(?:active\s+ingredients?\s+)?"
+                       rf"({_INGREDIENT}(?:\s*(?:\+|,|and)\s*{_INGREDIENT})*)")
+_MANUFACTURER = re.compile(r"\b(?:manufacturer|manufactured by|marketed by)\s*:?\s*(.+?)"
+                           + _NEXT_LABEL, re.IGNORECASE)
+_INGREDIENT_SPLIT = re.compile(r"\s*(?:\+|,|\band\b)\s*", re.IGNORECASE)
+_PARENTHESES = re.compile(r"\([^)]*\)")
+MAX_VALUE = 200  # Longer "values" are prose the patterns ran into
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY,
+    site TEXT NOT NULL,
+    name TEXT,
+    name_key TEXT,
+    composition TEXT,
+    manufacturer TEXT,
+    manufacturer_key TEXT,
+    record TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_name ON products (name_key);
+CREATE INDEX IF NOT EXISTS products_manufacturer ON products (manufacturer_key);
+CREATE TABLE IF NOT EXISTS ingredients (
+    ingredient TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (ingredient, url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ingredients_url ON ingredients (url);
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, composition, uses, side_effects, tokenize = 'porter unicode61'
+);
+"""
+
+
+# ---------- Normalization ----------
+
+def _details_text(details):
+    return " | ".join(value for value in details.values() if isinstance(value, str))
+
+
+def _labelled(pattern, text):
+    match = pattern.search(text)
+    if match is None:
+        return None
+    value = match.group(1).strip(" :;.|")
+    return value if 0 < len(value) <= MAX_VALUE else None
+
+
+def ingredient_keys(composition):
+    """Splits a composition into normalized ingredient names, parenthesized strengths dropped."""
+    keys = []
+    for part in _INGREDIENT_SPLIT.split(_PARENTHESES.sub(" ", composition or "")):
+        key = normalize_query(part)
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+
+def normalize_record(site, record):
+    """Maps a product record onto the catalog's indexed columns."""
+    details = record.get("details") or {}
+    text = _details_text(details)
+    columns = {
+        "name": record.get("medicine_name"),
+        "composition": _labelled(_COMPOSITION, text) or _labelled(_CONTAINS, text),
+        "manufacturer": _labelled(_MANUFACTURER, text),
+    }
+    for column, fields in SITE_TEXT_FIELDS[site].items():
+        columns[column] = " | ".join(details[field] for field in fields
+                                     if isinstance(details.get(field), str)) or None
+    return columns
+
+
+def _match_query(text):
+    """Quotes every word so user input can't be read as FTS5 query syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def _word_prefix(column, key):
+    """An index-friendly condition for values equal to key or starting with key and a space."""
+    return f"({column} = ? OR ({column} > ? AND {column} < ?))", (key, key + " ", key + " \U0010ffff")
+
+
+# ---------- Catalog Store ----------
+
+class Catalog:
+    """SQLite store of product records with name/ingredient/manufacturer indexes and FTS5."""
+
+    def __init__(self, path=None, ttl=RECORD_TTL):
+        self.path = path or data_path("catalog.sqlite")
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def add(self, record, site=None):
+        """Stores (or replaces) a product record; error results are ignored."""
+        url = record.get("url")
+        site = site or site_for(url or "")
+        if not url or site is None or "error" in record:
+            return False
+        columns = normalize_record(site, record)
+        name_key = normalize_query(columns["name"] or "")
+        manufacturer_key = normalize_query(columns["manufacturer"] or "")
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET site = excluded.site, name = excluded.name, "
+                "name_key = excluded.name_key, composition = excluded.composition, "
+                "manufacturer = excluded.manufacturer, manufacturer_key = excluded.manufacturer_key, "
+                "record = excluded.record, scraped_at = excluded.scraped_at",
+                (url, site, columns["name"], name_key or None, columns["composition"],
+                 columns["manufacturer"], manufacturer_key or None,
+                 json.dumps(record, ensure_ascii=False), time.time()))
+            # The upsert keeps the row's rowid, which is also its FTS row id
+            rowid = self._db.execute("SELECT rowid FROM products WHERE url = ?", (url,)).fetchone()[0]
+            self._db.execute("DELETE FROM products_fts WHERE rowid = ?", (rowid,))
+            self._db.execute(
+                "INSERT INTO products_fts (rowid, name, composition, uses, side_effects) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (rowid, columns["name"], columns["composition"], columns["uses"],
+                 columns["side_effects"]))
+            self._db.execute("DELETE FROM ingredients WHERE url = ?", (url,))
+            self._db.executemany("INSERT INTO ingredients VALUES (?, ?)",
+                                 [(key, url) for key in ingredient_keys(columns["composition"])])
+            self._db.commit()
+        return True
+
+    def touch(self, url):
+        """Marks a stored record as confirmed current, e.g. after an unchanged refresh."""
+        with self._lock:
+            self._db.execute("UPDATE products SET scraped_at = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+
+    def get(self, url, max_age=None):
+        """Returns the stored record for a URL, or None if absent or older than max_age."""
+        with self._lock:
+            row = self._db.execute("SELECT record, scraped_at FROM products WHERE url = ?",
+                                   (url,)).fetchone()
+        if row is None or (max_age is not None and row[1] < time.time() - max_age):
+            return None
+        return json.loads(row[0])
+
+    def fresh(self, url):
+        """Returns the stored record for a URL while it is younger than the catalog's TTL."""
+        return self.get(url, self.ttl)
+
+    def _records(self, sql, params, site, limit):
+        if site is not None:
+            sql += " AND p.site = ?"
+            params += (site,)
+        with self._lock:
+            rows = self._db.execute(sql + " LIMIT ?", params + (limit,)).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def find(self, name, site=None, limit=LIMIT):
+        """Records whose medicine name starts with the words of ``name`` (normalized like search queries)."""
+        key = normalize_query(name)
+        if not key:
+            return []
+        condition, params = _word_prefix("p.name_key", key)
+        return self._records("SELECT p.record FROM products p WHERE " + condition,
+                             params, site, limit)
+
+    def containing(self, ingredient, site=None, limit=LIMIT):
+        """Records whose composition lists ``ingredient`` ("clavulanic" finds "Clavulanic Acid")."""
+        key = normalize_query(ingredient)
+        if not key:
+            return []
+        condition, params = _word_prefix("ingredient", key)
+        return self._records(
+            "SELECT p.record FROM products p WHERE p.url IN (SELECT url FROM ingredients WHERE "
+            + condition + ")", params, site, limit)
+
+    def by_manufacturer(self, manufacturer, site=None, limit=LIMIT):
+        """Records whose manufacturer name starts with the words of ``manufacturer``."""
+        key = normalize_query(manufacturer)
+        if not key:
+            return []
+        condition, params = _word_prefix("p.manufacturer_key", key)
+        return self._records("SELECT p.record FROM products p WHERE " + condition,
+                             params, site, limit)
+
+    def search(self, text, site=None, limit=LIMIT):
+        """Full-text search over names, compositions, uses and side effects, best match first."""
+        query = _match_query(text)
+        if not query:
+            return []
+        sql = ("SELECT p.record FROM products_fts JOIN products p ON p.rowid = products_fts.rowid "
+               "WHERE products_fts MATCH ?")
+        params = (query,)
+        if site is not None:
+            sql += " AND p.site = ?"
+            params += (site,)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY bm25(products_fts) LIMIT ?",
+                                    params + (limit,)).fetchall()
+        return [json.loads(record) for record, in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM products")
+            self._db.execute("DELETE FROM ingredients")
+            self._db.execute("DELETE FROM products_fts")
+            self._db.commit()
+
+
+_catalog = None
+_catalog_enabled = True
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Returns the shared catalog, or None when it is disabled."""
+    global _catalog
+    if not _catalog_enabled:
+        return None
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = Catalog()
+    return _catalog
+
+
+def set_catalog(catalog):
+    """Installs a catalog instance for all scrapes; pass None to disable it."""
+    global _catalog, _catalog_enabled
+    with _catalog_lock:
+        _catalog = catalog
+        _catalog_enabled = catalog is not None
+
+
+def import_file(catalog, path):
+    """Adds the records of a JSON Lines file: ``scraper.batch`` output or bare product records."""
+    added = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            records = entry["results"].values() if "results" in entry else [entry]
+            added += sum(catalog.add(record) for record in records)
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or fill the product catalog.")
+    parser.add_argument("action", choices=["name", "ingredient", "manufacturer", "search", "import"])
+    parser.add_argument("value", help="Text to look up, or the JSON Lines file to import")
+    parser.add_argument("--site", choices=sorted(SITE_TEXT_FIELDS), help="Only records from this site")
+    parser.add_argument("--limit", type=int, default=LIMIT)
+    args = parser.parse_args()
+
+    catalog = get_catalog()
+    if args.action == "import":
+        print(f"Imported {import_file(catalog, args.value)} records into {catalog.path}")
+        sys.exit(0)
+
+    query = {"name": catalog.find, "ingredient": catalog.containing,
+             "manufacturer": catalog.by_manufacturer, "search": catalog.search}[args.action]
+    started = time.perf_counter()
+    records = query(args.value, args.site, args.limit)
+    for record in records:
+        print(json.dumps(record, ensure_ascii=False))
+    print(f"{len(records)} records in {(time.perf_counter() - started) * 1000:.1f} ms",
+          file=sys.stderr)
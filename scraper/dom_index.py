@@ -0,0 +1,86 @@
+"""Single-pass text index over a parsed page.
+
+Calling ``get_text`` on every container re-walks and re-joins the same nested
+subtrees over and over. ``DomIndex`` walks the tree once instead: every
+stripped text string goes into one shared buffer in document order, each
+element remembers the slice of that buffer it covers, and the elements the
+scrapers care about are collected by tag name along the way. An element's
+text is then just a join over its slice, and its length is known from prefix
+sums without building the string at all.
+"""
+from bs4.element import CData, NavigableString, Tag
+
+# String types get_text() includes for ordinary tags; script/style/template
+# contents are stored as their own NavigableString subclasses and skipped.
+TEXT_TYPES = (NavigableString, CData)
+
+
+class DomIndex:
+    """Text spans and per-name element lists for one parsed page."""
+
+    def __init__(self, root, names=()):
+        self.strings = []       # Stripped, non-empty strings in document order
+        self._offsets = [0]     # Prefix sums of string lengths
+        self._spans = {}        # id(tag) -> (first string, one past last string)
+        self.by_name = {name: [] for name in names}
+        self._order = {}        # id(tag) -> pre-order position, for tags in by_name
+        self._walk(root)
+
+    def _walk(self, root):
+        strings, offsets, spans, by_name, order = (
+            self.strings, self._offsets, self._spans, self.by_name, self._order)
+        open_tags = [root]
+        starts = [0]
+        iterators = [iter(root.contents)]
+
+        while iterators:
+            for child in iterators[-1]:
+                if isinstance(child, Tag):
+                    # Record in pre-order, matching find_all()'s document order
+                    if child.name in by_name:
+                        by_name[child.name].append(child)
+                        order[id(child)] = len(order)
+                    open_tags.append(child)
+                    starts.append(len(strings))
+                    iterators.append(iter(child.contents))
+                    break
+                if type(child) in TEXT_TYPES:
+                    text = child.strip()
+                    if text:
+                        strings.append(text)
+                        offsets.append(offsets[-1] + len(text))
+            else:
+                # Every child visited: close the element's span
+                iterators.pop()
+                spans[id(open_tags.pop())] = (starts.pop(), len(strings))
+
+    def find_all(self, *names):
+        """Indexed elements with any of the given names, in document order."""
+        if len(names) == 1:
+            return list(self.by_name[names[0]])
+        tags = [tag for name in names for tag in self.by_name[name]]
+        return sorted(tags, key=lambda tag: self._order[id(tag)])
+
+    def _span(self, tag):
+        # Tags whose own strings are special (script, style, ...) keep their
+        # get_text() semantics, as do tags from outside the indexed tree
+        if tag.interesting_string_types != TEXT_TYPES:
+            return None
+        return self._spans.get(id(tag))
+
+    def text(self, tag, separator=" "):
+        """Same as ``tag.get_text(separator, strip=True)``, served from the shared buffer."""
+        span = self._span(tag)
+        if span is None:
+            return tag.get_text(separator, strip=True)
+        return separator.join(self.strings[span[0]:span[1]])
+
+    def text_length(self, tag, separator=" "):
+        """Length of ``text(tag, separator)`` without building the string."""
+        span = self._span(tag)
+        if span is None:
+            return len(tag.get_text(separator, strip=True))
+        start, end = span
+        if start == end:
+            return 0
+        return self._offsets[end] - self._offsets[start] + len(separator) * (end - start - 1)
@@ -0,0 +1,226 @@
+"""Streaming export of scrape results to Parquet, Arrow or JSON Lines.
+
+Analytics load hundreds of thousands of records, and the app's
+pretty-printed JSON download is slow to write and slow to read. An
+``Exporter`` writes canonical records (``scraper.records``) as they arrive:
+
+* one column per canonical field plus the ``query`` that found the product,
+  with the same Arrow schema (``SCHEMA``) for every site: text fields are
+  strings, ``images``/``substitutes`` lists of strings, ``faqs`` a list of
+  ``{q, a}`` structs and ``extra`` a JSON string;
+* rows are buffered per column and written out every ``row_group_size``
+  rows (one Parquet row group or Arrow record batch each), so memory stays
+  flat however long the job runs;
+* Parquet and Arrow IPC files are compressed (zstd by default). They are
+  written to ``<path>.part`` and only renamed to ``path`` by ``close()``,
+  once the footer is written, so a file under its final name is always
+  readable.
+
+With ``append=True`` (a resumed batch job) earlier rows are kept: JSON
+Lines is appended to, and as Parquet and Arrow files can't be, the new rows
+go to the next free numbered file beside it (``results.1.parquet``,
+``results.2.parquet``, ...). Read them together with
+``pyarrow.dataset.dataset([...])``.
+
+Parquet and Arrow need pyarrow (``pip install pyarrow``). Without it a
+``.parquet`` or ``.arrow`` path is an error rather than a file of another
+format under that name; other extensions get compact JSON Lines instead. Batch jobs export while
+they run (``python -m scraper.batch names.txt --export results.parquet``),
+and earlier batch output converts without scraping again:
+
+    python -m scraper.export results.jsonl results.parquet
+"""
+import argparse
+import json
+import os
+import sys
+
+from scraper.records import FIELDS, TUPLE_FIELDS, MedicineRecord
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: exports fall back to JSON Lines
+    pa = pq = None
+
+# ---------- Defaults ----------
+ROW_GROUP_SIZE = 10000
+COMPRESSION = "zstd"
+FORMATS = ("parquet", "arrow", "jsonl")
+EXTENSIONS = {".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow", ".ipc": "arrow",
+              ".jsonl": "jsonl", ".json": "jsonl"}
+
+COLUMNS = ("query",) + FIELDS
+
+
+def _schema():
+    if pa is None:
+        return None
+    types = {field: pa.string() for field in COLUMNS}
+    types["images"] = types["substitutes"] = pa.list_(pa.string())
+    types["faqs"] = pa.list_(pa.struct([("q", pa.string()), ("a", pa.string())]))
+    return pa.schema([(column, types[column]) for column in COLUMNS])
+
+
+SCHEMA = _schema()
+
+
+def format_for(path, format="auto"):
+    """Resolves ``auto`` from the file extension (an unknown one without pyarrow becomes JSON Lines)."""
+    if format == "auto":
+        format = EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if format is None:
+            format = "parquet" if pa is not None else "jsonl"
+    if format not in FORMATS:
+        raise ValueError(f"Unknown export format {format!r}; expected one of {', '.join(FORMATS)}")
+    if format != "jsonl" and pa is None:
+        raise RuntimeError(f"Writing {format} needs pyarrow (pip install pyarrow)")
+    return format
+
+
+def next_part(path):
+    """``path`` if it is free, else the first free ``<stem>.<n><ext>`` beside it.
+
+    A path is taken while either it or its ``.part`` file exists, so the rows
+    an interrupted run left in ``<path>.part`` are never overwritten.
+    """
+    stem, ext = os.path.splitext(path)
+    part = 0
+    while os.path.exists(path) or os.path.exists(f"{path}.part"):
+        part += 1
+        path = f"{stem}.{part}{ext}"
+    return path
+
+
+class Exporter:
+    """Writes canonical records to one file, flushing every ``row_group_size`` rows.
+
+    Use as a context manager, or call ``close()``: the last rows and the
+    Parquet footer are written there.
+    """
+
+    def __init__(self, path, format="auto", row_group_size=ROW_GROUP_SIZE, compression=COMPRESSION,
+                 append=False):
+        self.format = format_for(path, format)
+        if self.format == "jsonl" and EXTENSIONS.get(os.path.splitext(path)[1].lower()) != "jsonl":
+            path = os.path.splitext(path)[0] + ".jsonl"  # pyarrow is missing: say what the file holds
+        if append and self.format != "jsonl":
+            path = next_part(path)
+        self.path = path
+        self._partial = f"{path}.part"
+        if compression == "none":
+            compression = None
+        self.row_group_size = row_group_size
+        self.rows = 0
+        self._columns = {column: [] for column in COLUMNS}
+        self._buffered = 0
+        if self.format == "parquet":
+            self._writer = pq.ParquetWriter(self._partial, SCHEMA, compression=compression)
+        elif self.format == "arrow":
+            options = pa.ipc.IpcWriteOptions(compression=compression)
+            self._sink = pa.OSFile(self._partial, "wb")
+            self._writer = pa.ipc.new_file(self._sink, SCHEMA, options=options)
+        else:
+            self._writer = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record, query=None):
+        """Adds one MedicineRecord, found by ``query`` (if any)."""
+        self.rows += 1
+        if self.format == "jsonl":
+            row = record.to_dict()
+            if query is not None:
+                row = {"query": query, **row}
+            self._writer.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")))
+            self._writer.write("\n")
+            return
+
+        self._columns["query"].append(query)
+        for field in FIELDS:
+            value = getattr(record, field)
+            if field == "faqs":
+                value = [{"q": question, "a": answer} for question, answer in value]
+            elif field in TUPLE_FIELDS:
+                value = list(value)
+            elif field == "extra" and value is not None:
+                value = json.dumps(value, ensure_ascii=False)
+            elif value is not None and not isinstance(value, str):
+                value = str(value)
+            self._columns[field].append(value)
+        self._buffered += 1
+        if self._buffered >= self.row_group_size:
+            self.flush()
+
+    def write_lookup(self, lookup):
+        """Adds every site result of a ``scraper.pipeline.lookup`` record."""
+        for result in (lookup.get("results") or {}).values():
+            self.write(_record(result), lookup.get("query"))
+
+    def flush(self):
+        """Writes the buffered rows out as one row group (record batch)."""
+        if self.format == "jsonl":
+            self._writer.flush()
+            return
+        if not self._buffered:
+            return
+        self._writer.write_table(pa.Table.from_pydict(self._columns, schema=SCHEMA))
+        for values in self._columns.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if self.format == "arrow":
+            self._sink.close()
+        if self.format != "jsonl":
+            os.replace(self._partial, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _record(data):
+    """A MedicineRecord from a product record or a canonical dict."""
+    if "details" in data:
+        return MedicineRecord.from_product(data)
+    return MedicineRecord.from_dict(data)
+
+
+def export_file(source, exporter):
+    """Exports every record of a JSON Lines file of batch lookups, product records
+    or canonical records; returns how many rows were written."""
+    before = exporter.rows
+    for line in source:
+        if not line.strip():
+            continue
+        data = json.loads(line)
+        if "error" in data:
+            continue
+        if "results" in data:
+            exporter.write_lookup(data)
+        else:
+            exporter.write(_record(data), data.get("query"))
+    return exporter.rows - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert scrape results to Parquet, Arrow or JSON Lines.")
+    parser.add_argument("input", help="JSON Lines file from scraper.batch (or of product records), - for stdin")
+    parser.add_argument("output", help="Output file; the extension picks the format")
+    parser.add_argument("--format", choices=("auto",) + FORMATS, default="auto")
+    parser.add_argument("--row-group-size", type=int, default=ROW_GROUP_SIZE,
+                        help="Rows per Parquet row group / Arrow record batch")
+    parser.add_argument("--compression", default=COMPRESSION, help="Parquet/Arrow codec, e.g. zstd, lz4, none")
+    args = parser.parse_args()
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source, Exporter(args.output, args.format, args.row_group_size, args.compression) as exporter:
+        rows = export_file(source, exporter)
+    print(f"Wrote {rows} records to {exporter.path} ({exporter.format})", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
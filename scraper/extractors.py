@@ -0,0 +1,640 @@
+"""Site-specific extractors that turn a parsed product page into a details dict."""
+from bs4.element import Script, Tag
+
+from scraper.dom_index import TEXT_TYPES, DomIndex
+from scraper.images import find_images
+from scraper.keyword_matcher import KeywordClassifier, keyword_set
+from scraper.parsing import make_soup, prune_page
+from scraper.structured_data import extract_structured
+from scraper.tracing import stage, staged
+
+# Bump whenever a change here alters the records extracted from the same page,
+# so that scraper.refresh re-extracts pages whose content did not change
+EXTRACTOR_VERSION = 1
+
+# ---------- Site-Specific Scrapers ----------
+# Each function is tailored to the specific HTML structure of the website.
+# Fields found in the page's embedded JSON (see structured_data) are filled
+# first; the DOM stages below only run for fields that are still empty.
+# Text blocks are sorted into fields by keyword. Each site's keyword table is
+# compiled once here, in the priority order its if/elif chain checks fields.
+
+ONEMG_CLASSIFIER = KeywordClassifier({
+    "uses_and_benefits": ["treatment of", "used for", "indication"],
+    "side_effects": ["side effects", "adverse effects", "most side effects"],
+    "how_to_use": ["take this medicine", "dose and duration", "how to take"],
+    "how_drug_works": ["works by", "mechanism", "blocks", "antihistamine"],
+    "safety_advice": ["alcohol", "pregnancy", "breastfeeding", "driving", "unsafe", "caution"],
+    "overview": ["belongs to", "class of", "antihistamine", "description"],
+    "quick_tips": ["quick tip", "tip", "remember", "important"],
+    "missed_dose": ["missed dose", "forget to take", "skip"],
+})
+ONEMG_INTERACTION_KEYWORDS = keyword_set(["interaction", "drug interaction", "contraindication"])
+ONEMG_FACT_BOX_KEYWORDS = keyword_set(["composition", "manufacturer", "therapeutic", "habit forming"])
+ONEMG_SECTION_FIELDS = ["patient_concerns", "user_feedback", "overview"]  # Filled from H2 sections
+
+
+def _missing(data, fields):
+    """True if any of the given fields is still empty."""
+    return any(not data[field] for field in fields)
+
+
+@staged("scrape_1mg")
+def scrape_1mg(soup):
+    """Scrapes data from a Tata 1mg product page."""
+    stage("structured")
+    data = {
+        "overview": None, "uses_and_benefits": None, "side_effects": None,
+        "how_to_use": None, "how_drug_works": None, "safety_advice": None,
+        "missed_dose": None, "all_substitutes": [], "quick_tips": None,
+        "fact_box": None, "interaction_with_drugs": None,
+        "patient_concerns": None, "user_feedback": None, "faqs": []
+    }
+    data.update(extract_structured("1mg", soup))
+    if not _missing(data, data):
+        return data
+
+    # Walk the page once; every text lookup below is served from this index
+    stage("index")
+    index = DomIndex(soup, names=("div", "ul", "h2", "h3", "h4", "a"))
+
+    # Method 1: Extract content from div elements with substantial text
+    content_texts = []
+
+    if _missing(data, ONEMG_CLASSIFIER.fields + ["interaction_with_drugs"]):
+        for div in index.by_name["div"]:
+            length = index.text_length(div)
+            if length > 50 and length < 2000:  # Reasonable content length
+                content_texts.append(index.text(div))
+    
+    # Method 2: Categorize content based on keywords and context
+    stage("classify")
+    for text in content_texts:
+        text_lower = text.lower()
+        field = ONEMG_CLASSIFIER.classify(text_lower, data)
+        
+        # Uses and benefits
+        if field == "uses_and_benefits":
+            if len(text) > len(data["uses_and_benefits"] or ""):
+                data["uses_and_benefits"] = text
+        
+        # Side effects
+        elif field == "side_effects":
+            if len(text) > len(data["side_effects"] or ""):
+                data["side_effects"] = text
+        
+        # How to use
+        elif field == "how_to_use":
+            data["how_to_use"] = text
+        
+        # How drug works
+        elif field == "how_drug_works":
+            if 'take this medicine' not in text_lower:  # Avoid duplicate with how_to_use
+                data["how_drug_works"] = text
+        
+        # Safety advice
+        elif field == "safety_advice":
+            if len(text) > 100:  # Ensure substantial safety content
+                data["safety_advice"] = text
+        
+        # Overview/About
+        elif field == "overview":
+            if len(text) > 100:
+                data["overview"] = text
+        
+        # Quick tips
+        elif field == "quick_tips":
+            data["quick_tips"] = text
+        
+        # Missed dose
+        elif field == "missed_dose":
+            data["missed_dose"] = text
+
+    # Method 3: Extract structured information from specific sections
+    stage("sections")
+
+    # Extract substitutes
+    if not data["all_substitutes"]:
+        substitute_links = [a for a in index.by_name["a"] if "/drugs/" in (a.get("href") or "")]
+        substitutes = []
+        for link in substitute_links[:10]:  # Limit to 10 substitutes
+            substitute_name = link.get_text(strip=True)
+            if substitute_name and len(substitute_name) < 100:
+                substitutes.append(substitute_name)
+        data["all_substitutes"] = list(dict.fromkeys(substitutes))  # Remove duplicates, keep page order
+    
+    # Extract fact box from lists or structured content
+    if not data["fact_box"]:
+        for ul in index.by_name["ul"]:
+            list_text = index.text(ul, " | ")
+            if ONEMG_FACT_BOX_KEYWORDS.any(list_text.lower()):
+                if not data["fact_box"] or len(list_text) > len(data["fact_box"]):
+                    data["fact_box"] = list_text
+
+    # Method 4: Extract FAQs
+    stage("faqs")
+    if not data["faqs"]:
+        faq_elements = [tag for tag in index.find_all('h3', 'h4') if tag.string and '?' in tag.string]
+        faqs = []
+        for faq_q in faq_elements[:5]:  # Limit to 5 FAQs
+            question = index.text(faq_q, "")
+            answer_elem = faq_q.find_next_sibling()
+            if answer_elem:
+                answer = index.text(answer_elem)
+                if len(answer) > 20:
+                    faqs.append({"q": question, "a": answer})
+        data["faqs"] = faqs
+
+    # Method 5: Extract specific 1mg sections based on H2 headings
+    stage("headings")
+    if _missing(data, ONEMG_SECTION_FIELDS):
+        for h2 in index.by_name["h2"]:
+            heading_text = h2.get_text().strip().lower()
+        
+            # Find content after this heading
+            content_elem = h2.find_next_sibling()
+            while content_elem and content_elem.name in ['div', 'p', 'section']:
+                content = index.text(content_elem)
+                if len(content) > 30:
+                
+                    # Patient concerns
+                    if 'patient concerns' in heading_text and not data["patient_concerns"]:
+                        data["patient_concerns"] = content
+                        break
+                
+                    # User feedback
+                    elif 'user feedback' in heading_text and not data["user_feedback"]:
+                        data["user_feedback"] = content
+                        break
+                
+                    # Overview (Product introduction)
+                    elif 'product introduction' in heading_text and not data["overview"]:
+                        data["overview"] = content
+                        break
+            
+                content_elem = content_elem.find_next_sibling()
+
+    # Method 6: Extract drug interactions
+    stage("interactions")
+    for text in content_texts:
+        if ONEMG_INTERACTION_KEYWORDS.any(text.lower()) and not data["interaction_with_drugs"]:
+            if len(text) > 50:
+                data["interaction_with_drugs"] = text
+                break
+
+    return data
+
+
+APOLLO_CLASSIFIER = KeywordClassifier({
+    "about_medicine": ["belongs to", "class of", "antihistamine", "medication used", "drug that"],
+    "side_effects": ["side effect", "adverse effect", "may cause", "common side"],
+    "uses_and_benefits": ["used to treat", "treatment of", "prescribed for", "indication", "treats"],
+    "directions_for_use": ["directions for use", "how to take", "dosage", "administration"],
+    "how_it_works": ["how it works", "works by", "mechanism of action", "action"],
+    "drug_warnings": ["should not be taken", "contraindicated", "warning", "caution"],
+    "storage": ["store in", "storage", "keep out", "temperature"],
+    "drug_interactions": ["drug interaction", "avoid taking", "concurrent use"],
+    "diet_and_lifestyle": ["diet", "lifestyle", "food", "alcohol", "exercise"],
+    "overdose": ["overdose", "too much", "excess dose"],
+    "therapeutic": ["therapeutic", "pharmacological", "category"],
+})
+APOLLO_SAFETY_KEYWORDS = keyword_set(["alcohol", "pregnancy", "breastfeeding", "driving"])
+APOLLO_SUBSTITUTE_KEYWORDS = keyword_set(["tablet", "capsule", "mg", "ml"])
+APOLLO_NAVIGATION_KEYWORDS = keyword_set(["search", "category", "home", "cart", "login"])
+APOLLO_BLOCK_TAGS = frozenset(["div", "section", "p", "span"])
+
+
+def _has_class(tag, name):
+    """Same test as ``find_all(class_=name)``."""
+    classes = tag.get("class")
+    if isinstance(classes, str):
+        return classes == name
+    return bool(classes) and (name in classes or " ".join(classes) == name)
+
+
+def _apollo_pass(soup):
+    """Walks an Apollo page once and collects everything scrape_apollo reads.
+
+    Returns ``(content_texts, all_strings, links)``: the candidate text blocks
+    ('wj' content divs first, then every div/section/p/span of a useful
+    size, deduplicated), every string node (script and comment contents
+    included, like ``find_all(string=...)``) and every link, in document order.
+
+    A block's text is only built when the element closes and its length is
+    known to qualify. Nested elements that cover exactly the same strings
+    share one built string instead of each re-joining the same text.
+    """
+    strings = []      # Non-blank strings get_text() would include, stripped when joined
+    total = 0         # Running length of those strings
+    all_strings, links = [], []
+    wj_texts, blocks = [], []  # One slot per element in document order, filled on close
+    last_range = last_text = None
+
+    open_tags = [(-1, -1, 0, 0)]  # (wj slot, block slot, first string, length so far)
+    iterators = [iter(soup.contents)]
+    while iterators:
+        for child in iterators[-1]:
+            if isinstance(child, Tag):
+                wj_slot = block_slot = -1
+                if child.name in APOLLO_BLOCK_TAGS:
+                    block_slot = len(blocks)
+                    blocks.append(None)
+                    if child.name == "div" and _has_class(child, "wj"):
+                        wj_slot = len(wj_texts)
+                        wj_texts.append(None)
+                elif child.name == "a":
+                    links.append(child)
+                open_tags.append((wj_slot, block_slot, len(strings), total))
+                iterators.append(iter(child.contents))
+                break
+            all_strings.append(child)
+            if type(child) in TEXT_TYPES:
+                length = len(child.strip())
+                if length:
+                    strings.append(child)
+                    total += length
+        else:
+            iterators.pop()
+            wj_slot, block_slot, first, length_before = open_tags.pop()
+            if block_slot < 0:
+                continue
+            count = len(strings) - first
+            # Length of get_text(" ", strip=True): the strings plus separators
+            length = total - length_before + count - 1 if count else 0
+            keep_wj = wj_slot >= 0 and length > 30
+            keep_block = 50 < length < 1000
+            if keep_wj or keep_block:
+                # Elements covering the same strings are nested and close one
+                # after another, so the last built text is the only candidate
+                span = (first, len(strings))
+                if span != last_range:
+                    last_range = span
+                    last_text = " ".join([string.strip() for string in strings[first:]])
+                text = last_text
+                if keep_wj:
+                    wj_texts[wj_slot] = text
+                if keep_block:
+                    blocks[block_slot] = text
+
+    content_texts = [text for text in wj_texts if text] + [text for text in blocks if text]
+    return list(dict.fromkeys(content_texts)), all_strings, links
+
+
+@staged("scrape_apollo")
+def scrape_apollo(soup):
+    """Scrapes data from an Apollo Pharmacy product page.
+
+    The page is walked once; every stage below reads the shared results.
+    """
+    stage("structured")
+    data = {
+        "about_medicine": None, "side_effects": None, "uses_and_benefits": None,
+        "directions_for_use": None, "how_it_works": None, "storage": None,
+        "overdose": None, "drug_warnings": None, "drug_interactions": None,
+        "diet_and_lifestyle": None, "therapeutic": None, "safety_advice": None,
+        "faqs": [], "product_substitutes": []
+    }
+    data.update(extract_structured("apollo", soup))
+    if not _missing(data, data):
+        return data
+
+    # Stage 1: text blocks, string nodes and links
+    stage("walk")
+    content_texts, all_strings, links = _apollo_pass(soup)
+
+    # Stage 2: sort the blocks into fields by keyword
+    stage("classify")
+    for text in content_texts:
+        field = APOLLO_CLASSIFIER.classify(text.lower(), data)
+        if field == "therapeutic" and len(text) >= 300:
+            continue  # Keep therapeutic info concise
+        if field:
+            data[field] = text
+
+    # Stage 3: safety advice from short safety strings. Script strings are
+    # skipped: after prune_page only JSON scripts are left, their warnings were
+    # read by extract_structured, and their raw text isn't advice. (Before the
+    # structured tier, a JSON-LD script starting with '{"@context"' was parsed
+    # here and any other script string of a safe length was kept verbatim.)
+    stage("safety")
+    safety_content = []
+    faq_strings = []
+    for string in all_strings:
+        if not data["faqs"] and '?' in string and len(string) > 10:
+            faq_strings.append(string)
+        if data["safety_advice"] or type(string) is Script:
+            continue
+        if APOLLO_SAFETY_KEYWORDS.any(string.lower()):
+            text = string.strip()
+            if len(text) > 20 and len(text) < 300:
+                safety_content.append(text)
+
+    if safety_content:
+        data["safety_advice"] = " | ".join(safety_content[:4])
+
+    # Stage 4: FAQs, a question string followed by its answer element
+    stage("faqs")
+    faqs = []
+    for faq_text in faq_strings[:8]:  # Limit to 8 FAQs
+        if faq_text.strip().endswith('?') and faq_text.parent:
+            # Look for answer in next siblings
+            next_elem = faq_text.parent.find_next_sibling()
+            if next_elem:
+                answer = next_elem.get_text(" ", strip=True)
+                if len(answer) > 20 and len(answer) < 500:
+                    faqs.append({"q": faq_text.strip(), "a": answer})
+
+    if faqs:
+        data["faqs"] = faqs
+
+    # Stage 5: product substitutes, from links whose text names a product
+    stage("substitutes")
+    if not data["product_substitutes"]:
+        substitute_links = [link for link in links
+                            if link.string and APOLLO_SUBSTITUTE_KEYWORDS.any(link.string.lower())]
+        substitutes = []
+
+        for link in substitute_links[:15]:  # Limit to 15 substitutes
+            substitute_name = link.get_text(strip=True)
+            if substitute_name and len(substitute_name) < 100 and substitute_name not in substitutes:
+                # Filter out navigation and non-medicine links
+                if not APOLLO_NAVIGATION_KEYWORDS.any(substitute_name.lower()):
+                    substitutes.append(substitute_name)
+
+        if substitutes:
+            data["product_substitutes"] = substitutes
+
+    # Stage 6: fill empty fields with the remaining blocks (fallback)
+    stage("fallback")
+    empty_fields = [k for k, v in data.items() if not v and k not in ['faqs', 'product_substitutes']]
+    available_texts = [text for text in content_texts if len(text) > 80 and len(text) < 400]
+
+    for field, text in zip(empty_fields, available_texts):
+        data[field] = text
+
+    return data
+
+
+TRUEMEDS_CLASSIFIER = KeywordClassifier({
+    "uses": ["used for", "treats", "prescribed for", "allergy", "allergic", "histamine", "antihistamine", "indication"],
+    "side_effects": ["side effect", "adverse effect", "drowsiness", "nausea", "headache", "dry mouth", "may cause"],
+    "directions_for_use": ["take with", "swallow", "dosage", "once daily", "how to take", "administration"],
+    "medicine_activity": ["blocks", "prevents", "inhibits", "mechanism", "works by", "action"],
+    "precautions_and_warnings": ["precaution", "warning", "caution", "avoid", "should not"],
+    "interactions": ["interaction", "concurrent", "combination", "avoid taking with"],
+    "storage": ["store", "storage", "temperature", "keep out", "room temperature"],
+    "route_of_administration": ["oral", "by mouth", "route of administration", "take orally"],
+    "diet_and_lifestyle_guidance": ["diet", "lifestyle", "food", "alcohol", "exercise", "driving"],
+})
+TRUEMEDS_HEADING_SKIP_KEYWORDS = keyword_set(["login", "sign up", "cart", "wishlist"])
+TRUEMEDS_CONTENT_SKIP_KEYWORDS = keyword_set(["login", "sign up", "cart", "wishlist", "search", "menu"])
+
+# Looser keywords used to fill fields that are still empty at the end
+TRUEMEDS_FALLBACK_CLASSIFIER = KeywordClassifier({
+    "dosage_information": ["mg", "dose", "tablet", "capsule", "daily"],
+    "uses": ["treatment", "condition", "disease", "symptom"],
+    "medicine_activity": ["receptor", "protein", "enzyme", "pathway"],
+    "precautions_and_warnings": ["pregnancy", "liver", "kidney", "elderly"],
+})
+
+
+def _truemeds_heading_field(heading_text):
+    """Maps a Truemeds h2 heading to the field its section fills, or None."""
+    if 'about' in heading_text or 'introduction' in heading_text:
+        return "uses"  # "About" section often contains usage info
+    elif 'uses' in heading_text or 'indication' in heading_text:
+        return "uses"
+    elif 'directions' in heading_text or 'how to use' in heading_text or 'administration' in heading_text:
+        return "directions_for_use"
+    elif 'route' in heading_text and 'administration' in heading_text:
+        return "route_of_administration"
+    elif 'side effects' in heading_text or 'adverse effects' in heading_text:
+        return "side_effects"
+    elif ('how' in heading_text and 'works' in heading_text) or 'mechanism' in heading_text:
+        return "medicine_activity"
+    elif 'safety' in heading_text or 'warnings' in heading_text or 'precautions' in heading_text:
+        return "precautions_and_warnings"
+    elif 'interactions' in heading_text or 'contraindications' in heading_text:
+        return "interactions"
+    elif 'storage' in heading_text or 'store' in heading_text:
+        return "storage"
+    elif 'dosage' in heading_text or 'dose' in heading_text:
+        return "dosage_information"
+    return None
+
+
+@staged("scrape_truemeds")
+def scrape_truemeds(soup):
+    """Scrapes data from a Truemeds product page."""
+    stage("structured")
+    data = {
+        "uses": None, "directions_for_use": None, "route_of_administration": None,
+        "side_effects": None, "medicine_activity": None, "precautions_and_warnings": None,
+        "interactions": None, "dosage_information": None, "storage": None,
+        "diet_and_lifestyle_guidance": None, "fact_box": None, "faqs": []
+    }
+    known = extract_structured("truemeds", soup)
+    data.update(known)
+    if not _missing(data, data):
+        return data
+    
+    # Method 1: Extract content based on h2 headings and their following content
+    stage("headings")
+    h2_headings = soup.find_all('h2')
+    
+    for h2 in h2_headings:
+        heading_text = h2.get_text().strip().lower()
+        field = _truemeds_heading_field(heading_text)
+        if field is None or field in known:
+            continue  # Nothing to look for under this heading
+        
+        # Find content after this heading
+        content = None
+        current = h2.find_next_sibling()
+        
+        # Look for the first substantial content element
+        while current and current.name != 'h2':
+            if current.name in ['p', 'div', 'section', 'ul', 'ol']:
+                text = current.get_text(" ", strip=True)
+                if len(text) > 30 and not TRUEMEDS_HEADING_SKIP_KEYWORDS.any(text.lower()):
+                    content = text
+                    break
+            current = current.find_next_sibling()
+        
+        # Alternative: look in the parent section
+        if not content:
+            parent = h2.parent
+            if parent:
+                parent_text = parent.get_text(" ", strip=True)
+                heading_clean = h2.get_text(strip=True)
+                if heading_clean in parent_text:
+                    remaining_text = parent_text.replace(heading_clean, "", 1).strip()
+                    if len(remaining_text) > 50:
+                        content = remaining_text[:600]  # Increased limit for more content
+        
+        if content:
+            data[field] = content
+
+    # Method 2: Enhanced content extraction from all elements
+    stage("blocks")
+    content_texts = []
+    if _missing(data, TRUEMEDS_CLASSIFIER.fields + TRUEMEDS_FALLBACK_CLASSIFIER.fields):
+        # Find all content containers
+        all_elements = soup.find_all(['p', 'div', 'section', 'span', 'li'])
+    
+        for elem in all_elements:
+            text = elem.get_text(" ", strip=True)
+            if text and len(text) > 40 and len(text) < 800:
+                # Filter out navigation and unwanted content
+                if not TRUEMEDS_CONTENT_SKIP_KEYWORDS.any(text.lower()):
+                    content_texts.append(text)
+    
+    # Remove duplicates
+    content_texts = list(dict.fromkeys(content_texts))
+    
+    # Method 3: Content categorization using enhanced keywords
+    stage("classify")
+    for text in content_texts:
+        text_lower = text.lower()
+        field = TRUEMEDS_CLASSIFIER.classify(text_lower, data)
+        
+        # Uses (enhanced keywords)
+        if field == "uses":
+            data["uses"] = text
+        
+        # Side effects
+        elif field == "side_effects":
+            data["side_effects"] = text
+        
+        # Directions for use
+        elif field == "directions_for_use":
+            data["directions_for_use"] = text
+        
+        # Medicine activity (how it works)
+        elif field == "medicine_activity":
+            data["medicine_activity"] = text
+        
+        # Precautions and warnings
+        elif field == "precautions_and_warnings":
+            data["precautions_and_warnings"] = text
+        
+        # Interactions
+        elif field == "interactions":
+            data["interactions"] = text
+        
+        # Storage
+        elif field == "storage":
+            data["storage"] = text
+        
+        # Route of administration
+        elif field == "route_of_administration":
+            data["route_of_administration"] = text
+        
+        # Diet and lifestyle guidance
+        elif field == "diet_and_lifestyle_guidance":
+            data["diet_and_lifestyle_guidance"] = text
+
+    # Method 4: Extract fact box information from structured sections
+    stage("fact_box")
+    if not data["fact_box"]:
+        fact_elements = soup.find_all(['div', 'section'], class_=lambda x: x and ('fact' in str(x).lower() or 'key' in str(x).lower() or 'info' in str(x).lower()))
+        if fact_elements:
+            fact_content = []
+            for elem in fact_elements:
+                text = elem.get_text(" ", strip=True)
+                if len(text) > 20 and len(text) < 300:
+                    fact_content.append(text)
+            if fact_content:
+                data["fact_box"] = " | ".join(fact_content[:3])
+
+    # Method 5: Extract FAQs
+    stage("faqs")
+    if not data["faqs"]:
+        faq_elements = soup.find_all(string=lambda text: text and '?' in text and len(text) > 10)
+        faqs = []
+    
+        for faq_text in faq_elements[:6]:  # Limit to 6 FAQs
+            if faq_text.strip().endswith('?'):
+                question = faq_text.strip()
+                parent = faq_text.parent
+            
+                if parent:
+                    # Look for answer in next siblings
+                    next_elem = parent.find_next_sibling()
+                    if next_elem:
+                        answer = next_elem.get_text(" ", strip=True)
+                        if len(answer) > 15 and len(answer) < 400:
+                            faqs.append({"q": question, "a": answer})
+    
+        if faqs:
+            data["faqs"] = faqs
+
+    # Method 6: Fill empty fields with available relevant content (fallback strategy)
+    stage("fallback")
+    empty_fields = [k for k, v in data.items() if not v and k != 'faqs']
+    # Classify each candidate text once; TRUEMEDS_FALLBACK_CLASSIFIER holds
+    # the looser keywords for better field assignment
+    available_texts = [(text, TRUEMEDS_FALLBACK_CLASSIFIER.match(text.lower()))
+                       for text in content_texts if len(text) > 60 and len(text) < 400]
+
+    for field in empty_fields:
+        if field in TRUEMEDS_FALLBACK_CLASSIFIER.fields:
+            for candidate in available_texts:
+                if field in candidate[1]:
+                    data[field] = candidate[0]
+                    available_texts.remove(candidate)  # Don't reuse this text
+                    break
+
+    return data
+
+
+# ---------- Product Pages ----------
+# Site ids are the keys used by the search index and the benchmarks.
+
+SITE_EXTRACTORS = {
+    "1mg": scrape_1mg,
+    "apollo": scrape_apollo,
+    "truemeds": scrape_truemeds,
+}
+SITE_DOMAINS = {
+    "1mg.com": "1mg",
+    "apollopharmacy.in": "apollo",
+    "truemeds.in": "truemeds",
+}
+
+
+def site_for(url):
+    """Returns the site id whose extractor handles url, or None."""
+    for domain, site in SITE_DOMAINS.items():
+        if domain in url:
+            return site
+    return None
+
+
+@staged("extract_product")
+def extract_product(site, url, html):
+    """Builds the full product record (title, images, site details) from a page's HTML."""
+    stage("parse")
+    soup = prune_page(make_soup(html))
+    
+    # --- Common Data Extraction ---
+    data = {
+        "url": url,
+        "medicine_name": None,
+        "product_images": [],
+        "details": {} # To store site-specific data
+    }
+
+    # Title (common across sites)
+    title = soup.find("h1")
+    if title:
+        data["medicine_name"] = title.get_text(strip=True)
+
+    # Images (common across sites)
+    stage("images")
+    data["product_images"] = find_images(soup, url, data["medicine_name"])
+
+    # --- Site-Specific Extraction ---
+    stage("details")
+    data["details"] = SITE_EXTRACTORS[site](soup)
+    return data
@@ -0,0 +1,247 @@
+"""Persistent on-disk cache for fetched pages.
+
+Responses are stored in SQLite keyed by a normalized URL. Each host gets its
+own freshness lifetime; once an entry goes stale it is revalidated with the
+ETag/Last-Modified validators the upstream sent, so an unchanged page costs a
+304 instead of a full download. The cache is bounded in size and evicts the
+least recently used entries first.
+
+Cache-Control is honoured: ``no-store`` and ``private`` responses are not
+stored, ``no-cache`` ones are stored stale (revalidated on every use) and
+``max-age`` shortens the host's lifetime. Hits stay read-only: an entry's
+access time is only rewritten once it is ACCESS_RESOLUTION old, and the
+stored size is kept as a running total instead of summed on every store.
+"""
+import json
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from scraper.settings import data_path
+
+# ---------- Defaults ----------
+DEFAULT_TTL = 24 * 3600
+HOST_TTLS = {
+    "www.1mg.com": 12 * 3600,
+    "www.apollopharmacy.in": 12 * 3600,
+    "www.truemeds.in": 12 * 3600,
+}
+MAX_BYTES = 256 * 1024 * 1024
+ACCESS_RESOLUTION = 300  # LRU order is kept to this many seconds
+
+# Headers that describe the wire encoding rather than the stored (decoded) body
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at);
+"""
+
+
+def cache_control(headers):
+    """Parses a Cache-Control header into ``{directive: value or None}`` (names lowercased)."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.partition("=")
+        name = name.strip().lower()
+        if name:
+            directives[name] = value.strip().strip('"') or None
+    return directives
+
+
+def normalize_url(url):
+    """Returns a canonical cache key for a URL.
+
+    Scheme and host are lowercased, default ports and fragments are dropped and
+    query parameters are sorted, so trivially different spellings of the same
+    page share one entry.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+class CacheEntry:
+    """A stored response, plus the validators needed to revalidate it."""
+
+    def __init__(self, key, url, status, headers, body, etag, last_modified, expires_at):
+        self.key = key
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self):
+        return self.expires_at > time.time()
+
+    def validators(self):
+        """Returns the conditional request headers for revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self):
+        """Rebuilds a ``requests.Response`` so callers can't tell it came from disk."""
+        r = requests.Response()
+        r.status_code = self.status
+        r.reason = "OK"
+        r.url = self.url
+        r.headers = CaseInsensitiveDict(self.headers)
+        r.encoding = get_encoding_from_headers(r.headers)
+        r._content = self.body
+        r._content_consumed = True  # No connection behind it, so close() is a no-op
+        r.from_cache = True
+        return r
+
+
+class ResponseCache:
+    """SQLite-backed response store with per-host TTLs and LRU eviction."""
+
+    def __init__(self, path=None, host_ttls=None, default_ttl=DEFAULT_TTL, max_bytes=MAX_BYTES):
+        self.path = path or data_path("http_cache.sqlite")
+        self.host_ttls = HOST_TTLS if host_ttls is None else host_ttls
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        self._total = self._stored_bytes()  # Running total of stored body bytes
+
+    def ttl_for(self, url, headers=None):
+        """Freshness lifetime of a response: the host's TTL, shortened by its
+        Cache-Control (0 for ``no-cache``)."""
+        ttl = self.host_ttls.get(urlsplit(url).hostname or "", self.default_ttl)
+        directives = cache_control(headers or {})
+        if "no-cache" in directives:
+            return 0
+        max_age = directives.get("max-age")
+        if max_age is not None and max_age.isdigit():
+            ttl = min(ttl, int(max_age))
+        return ttl
+
+    def lookup(self, url):
+        """Returns the stored entry for a URL (fresh or stale), or None."""
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, status, headers, body, etag, last_modified, expires_at, accessed_at "
+                "FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[7] >= ACCESS_RESOLUTION:  # Hot entries don't write on every hit
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+        url, status, headers, body, etag, last_modified, expires_at, _ = row
+        return CacheEntry(key, url, status, json.loads(headers), body, etag, last_modified, expires_at)
+
+    def store(self, url, r):
+        """Stores a successful response whose body has been read in full."""
+        directives = cache_control(r.headers)
+        if r.status_code != 200 or "no-store" in directives or "private" in directives:
+            return
+        if getattr(r, "truncated", False):  # Only part of the body was read
+            return
+        etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+        ttl = self.ttl_for(url, r.headers)
+        if not ttl and not (etag or last_modified):
+            return  # Stale on arrival and can't be revalidated: storing it gains nothing
+        headers = {k: v for k, v in r.headers.items() if k.lower() not in _DROPPED_HEADERS}
+        body = r.content
+        key = normalize_url(url)
+        now = time.time()
+        with self._lock:
+            old = self._db.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, url, status, headers, body, etag, last_modified, expires_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, r.url or url, r.status_code, json.dumps(headers), body,
+                 etag, last_modified, now + ttl, now, len(body)))
+            self._total += len(body) - (old[0] if old else 0)
+            self._evict()
+            self._db.commit()
+
+    def refresh(self, entry):
+        """Marks a revalidated (304) entry fresh again for another TTL."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("UPDATE responses SET expires_at = ?, accessed_at = ? WHERE key = ?",
+                             (now + self.ttl_for(entry.url, entry.headers), now, entry.key))
+            self._db.commit()
+
+    def _stored_bytes(self):
+        return self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def _evict(self):
+        """Drops least recently used entries until the cache fits in max_bytes."""
+        if self._total <= self.max_bytes:
+            return
+        self._total = self._stored_bytes()  # Other processes may share the file
+        if self._total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if self._total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total -= size
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+            self._total = 0
+
+
+_cache = None
+_cache_enabled = True
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Returns the shared response cache, or None when caching is disabled."""
+    global _cache
+    if not _cache_enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
+
+
+def set_cache(cache):
+    """Installs a cache instance for all fetches; pass None to disable caching."""
+    global _cache, _cache_enabled
+    with _cache_lock:
+        _cache = cache
+        _cache_enabled = cache is not None
@@ -0,0 +1,264 @@
+"""Shared HTTP session layer used by every search and scrape fetch.
+
+All fetches go through one ``requests.Session`` so that connections to 1mg,
+Apollo and Truemeds are pooled per host and kept alive between requests,
+instead of paying a new TCP+TLS handshake for every page.
+"""
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry, make_headers
+
+from scraper import tracing
+from scraper.http_cache import get_cache
+from scraper.rate_limiter import get_limiter
+
+# ---------- Headers ----------
+# Using a common user-agent to mimic a real browser
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+                  "AppleWebKit/537.36 (KHTML, like Gecko) "
+                  "Chrome/113.0.0.0 Safari/537.36",
+    "Accept-Language": "en-US,en;q=0.9",
+    # Advertises gzip/deflate, plus br when a brotli decoder is installed
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+}
+
+# ---------- Defaults ----------
+REQUEST_TIMEOUT = 10
+POOL_CONNECTIONS = 10    # Number of per-host pools kept around
+POOL_MAXSIZE = 10        # Keep-alive connections per host
+RETRIES = 3
+BACKOFF_FACTOR = 0.5     # Sleeps 0.5s, 1s, 2s between retries
+RETRY_STATUSES = (500, 502, 504)  # 429/503 are paced by the rate limiter instead
+MAX_RESPONSE_BYTES = 16 * 1024 * 1024  # Hard cap on a (decoded) page body
+MAX_SCAN_BYTES = 2 * 1024 * 1024       # Scanned search probes stop reading here
+CHUNK_SIZE = 16 * 1024
+
+# Returned by a scan_body consume() that is done scanning but wants the whole body read
+READ_REST = object()
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ResponseTooLarge(requests.exceptions.RequestException):
+    """A response body went over the byte cap."""
+
+
+def create_session(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                   retries=RETRIES, backoff_factor=BACKOFF_FACTOR):
+    """Builds a session with pooled keep-alive connections and retry with backoff.
+
+    Retries cover connection errors and resets as well as 5xx responses; once
+    the retries run out the last response is returned as-is so callers can
+    still inspect its status code.
+    """
+    retry = Retry(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=False,  # Else 429/503 with Retry-After bypass the rate limiter
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                          max_retries=retry)
+
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """Returns the process-wide shared session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+    return _session
+
+
+def configure(**kwargs):
+    """Replaces the shared session with one built from the given pool/retry settings."""
+    global _session
+    with _session_lock:
+        old, _session = _session, create_session(**kwargs)
+    if old is not None:
+        old.close()
+
+
+# ---------- Instrumentation ----------
+
+def record_response(url, status):
+    """Counts a response received from the network."""
+    tracing.inc("scraper_http_responses_total", host=urlsplit(url).hostname or "", status=status)
+
+
+def record_download(url, size, download=None):
+    """Counts body bytes read from the network, tagging the download span if given."""
+    tracing.inc("scraper_downloaded_bytes_total", size, host=urlsplit(url).hostname or "")
+    if download is not None:
+        download.attributes["bytes"] = size
+
+
+def record_cache(result):
+    """Counts a response cache lookup (hit, revalidated or miss) and tags the open fetch span."""
+    tracing.inc("scraper_cache_lookups_total", result=result)
+    current = tracing.current_span()
+    if current is not None:
+        current.attributes["cache"] = result
+
+
+def _get(url, timeout, **kwargs):
+    # Time to response headers: connection setup (DNS, TCP, TLS) included
+    with tracing.span("http.request"):
+        r = get_session().get(url, timeout=timeout, **kwargs)
+    record_response(url, r.status_code)
+    return r
+
+
+def _send(url, timeout, **kwargs):
+    """Sends a GET through the shared session, paced by the per-host rate limiter."""
+    limiter = get_limiter()
+    if limiter is None:
+        return _get(url, timeout, **kwargs)
+    # Streamed bodies count against the host's concurrency cap until read
+    return limiter.request(url, lambda: _get(url, timeout, **kwargs), hold=kwargs.get("stream", False))
+
+
+def release_slot(r):
+    """Gives back the rate limiter slot a streamed response holds (once; a no-op otherwise)."""
+    release = r.__dict__.pop("release_slot", None)
+    if release is not None:
+        release()
+
+
+def close_response(r):
+    """Closes a streamed response whose body won't be read, releasing its slot."""
+    try:
+        r.close()
+    finally:
+        release_slot(r)
+
+
+def _check_length(r, max_bytes):
+    length = r.headers.get("Content-Length", "")
+    if length.isdigit() and int(length) > max_bytes:
+        r.close()
+        raise ResponseTooLarge(f"{r.url} is {length} bytes, over the {max_bytes} byte cap", response=r)
+
+
+def read_body(r, max_bytes=MAX_RESPONSE_BYTES):
+    """Reads a streamed response's body, raising ResponseTooLarge past max_bytes."""
+    try:
+        _check_length(r, max_bytes)
+        chunks, size = [], 0
+        with tracing.span("http.download") as download:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    r.close()
+                    record_download(r.url, size, download)
+                    raise ResponseTooLarge(f"{r.url} is over the {max_bytes} byte cap", response=r)
+                chunks.append(chunk)
+            record_download(r.url, size, download)
+    finally:
+        release_slot(r)
+    r._content = b"".join(chunks)
+    r._content_consumed = True
+    return r
+
+
+def scan_body(r, consume, max_bytes=MAX_SCAN_BYTES):
+    """Reads a streamed response chunk by chunk, passing each to ``consume``.
+
+    Reading stops as soon as ``consume(chunk)`` returns True or max_bytes have
+    been read; the response then keeps only the bytes read, is marked
+    ``truncated`` and its connection is closed. When ``consume`` returns
+    READ_REST it has its answer but the page is still wanted: the rest is read
+    without it, up to MAX_RESPONSE_BYTES like ``read_body``.
+    """
+    chunks, size = [], 0
+    truncated = False
+    scanning = True
+    try:
+        with tracing.span("http.download", scanned=True) as download:
+            for chunk in r.iter_content(CHUNK_SIZE):
+                chunks.append(chunk)
+                size += len(chunk)
+                if scanning:
+                    result = consume(chunk)
+                    if result is READ_REST:
+                        scanning = False
+                    elif result or size >= max_bytes:
+                        truncated = True
+                        break
+                if size > MAX_RESPONSE_BYTES:
+                    r.close()
+                    record_download(r.url, size, download)
+                    raise ResponseTooLarge(f"{r.url} is over the {MAX_RESPONSE_BYTES} byte cap",
+                                           response=r)
+            record_download(r.url, size, download)
+        r._content = b"".join(chunks)
+        if truncated:
+            r.close()
+            r.truncated = True
+    finally:
+        release_slot(r)
+    r._content_consumed = True
+    return r
+
+
+def fetch(url, timeout=REQUEST_TIMEOUT, use_cache=True, max_bytes=MAX_RESPONSE_BYTES, **kwargs):
+    """GETs a URL through the shared session, the on-disk response cache and the rate limiter.
+
+    Fresh cache entries are returned without touching the network; stale ones
+    are revalidated with a conditional request. Bodies over max_bytes raise
+    ResponseTooLarge. With ``stream=True`` the body is left unread, so the
+    caller should read it (``read_body``/``scan_body``) and then pass the
+    response to ``cache_response``, or discard it with ``close_response``:
+    until then it holds its host's rate limiter slot.
+    """
+    stream = kwargs.pop("stream", False)
+    cache = get_cache() if use_cache else None
+    if cache is None:
+        r = _send(url, timeout, stream=True, **kwargs)
+        return r if stream else read_body(r, max_bytes)
+
+    entry = cache.lookup(url)
+    if entry is not None and entry.fresh:
+        record_cache("hit")
+        return entry.to_response()
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        headers.update(entry.validators())
+    r = _send(url, timeout, headers=headers, stream=True, **kwargs)
+
+    if entry is not None and r.status_code == 304:
+        close_response(r)
+        record_cache("revalidated")
+        cache.refresh(entry)
+        return entry.to_response()
+    record_cache("miss")
+    if not stream:
+        cache.store(url, read_body(r, max_bytes))
+    return r
+
+
+def cache_response(url, r):
+    """Stores a streamed response in the cache after its body has been read."""
+    if getattr(r, "from_cache", False):
+        return
+    cache = get_cache()
+    if cache is not None:
+        cache.store(url, r)
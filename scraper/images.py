@@ -0,0 +1,161 @@
+"""Product image discovery for a parsed product page.
+
+``find_images(soup, url, name)`` returns the page's product photos as
+absolute URLs, in page order:
+
+* an ``<img>``'s own URL is the first of ``src``/``data-src``/``data-lazy``
+  that isn't an inline ``data:`` placeholder; when the image (or the
+  ``<picture>`` around it) offers a ``srcset``, the largest candidate wins;
+* an image counts when its URL looks like a product shot, or its alt text
+  names a dosage form or the medicine, and it isn't page chrome (logos,
+  icons, banners, payment badges);
+* URLs are resolved with ``urljoin`` against the page (or its ``<base>``);
+* every matching image is returned unless a ``limit`` is given (the walk
+  then stops once it is reached); records keep them all and a UI shows as
+  many as it has room for. Pages without a matching ``<img>`` fall back to
+  their ``og:image``.
+
+The filters are compiled once here, and the only per-page pattern (the
+medicine's name in alt text) once per page.
+"""
+import re
+from urllib.parse import urljoin
+
+from bs4.element import Tag
+
+# Matched against lowercased text: much cheaper than re.IGNORECASE
+_PRODUCT_URL = re.compile(r"product|medicine|tablet|capsule|drug")
+_CHROME_URL = re.compile(r"logo|icon|banner|nav|header|footer|visa|mastercard|amex")
+ALT_KEYWORDS = ("tablet", "capsule", "medicine", "drug")
+SRC_ATTRIBUTES = ("src", "data-src", "data-lazy")
+SRCSET_ATTRIBUTES = ("srcset", "data-srcset")
+META_IMAGES = (("property", "og:image"), ("property", "og:image:secure_url"),
+               ("name", "twitter:image"))
+
+_SRCSET_URL = re.compile(r"[\s,]*(\S+)")
+_SRCSET_DESCRIPTOR = re.compile(r"([^,]*),?")
+
+
+def srcset_candidates(srcset):
+    """Yields ``(url, descriptor)`` pairs of a srcset attribute, e.g. ``("a.jpg", "300w")``."""
+    pos = 0
+    while True:
+        match = _SRCSET_URL.match(srcset, pos)
+        if match is None:
+            return
+        url, pos = match.group(1), match.end()
+        if url.endswith(","):  # No descriptor
+            yield url.rstrip(","), ""
+            continue
+        match = _SRCSET_DESCRIPTOR.match(srcset, pos)
+        pos = match.end()
+        yield url, match.group(1).strip()
+
+
+def _size(descriptor):
+    """Sort key of a srcset descriptor: widths beat densities, larger beats smaller."""
+    try:
+        if descriptor.endswith("w"):
+            return 1, float(descriptor[:-1])
+        if descriptor.endswith("x"):
+            return 0, float(descriptor[:-1])
+    except ValueError:
+        pass
+    return 0, 1.0  # No (or an unknown) descriptor means 1x
+
+
+def best_srcset(*srcsets):
+    """The largest candidate URL across srcset attributes, or None."""
+    best, best_size = None, None
+    for srcset in srcsets:
+        for url, descriptor in srcset_candidates(srcset):
+            size = _size(descriptor)
+            if not url.startswith("data:") and (best_size is None or size > best_size):
+                best, best_size = url, size
+    return best
+
+
+def _srcsets(img):
+    srcsets = [img.attrs[attribute] for attribute in SRCSET_ATTRIBUTES if img.attrs.get(attribute)]
+    # Parsers nest a <picture>'s <img> directly under it or under its <source>s
+    picture = img.parent
+    while picture is not None and picture.name == "source":
+        picture = picture.parent
+    if picture is not None and picture.name == "picture":
+        srcsets += [source[attribute] for source in picture.find_all("source")
+                    for attribute in SRCSET_ATTRIBUTES if source.get(attribute)]
+    return srcsets
+
+
+def _absolute(base, src):
+    src = urljoin(base, src.strip())
+    return src if src.startswith(("http://", "https://")) else None
+
+
+def _alt_pattern(name):
+    """Alt text naming a dosage form or the first word of the medicine's name.
+
+    Without a name every alt text matches, as the image filter always did.
+    """
+    words = name.split() if name else None
+    if not words:
+        return re.compile("")
+    return re.compile("|".join(re.escape(word) for word in ALT_KEYWORDS + (words[0].lower(),)))
+
+
+def find_images(soup, url, name=None, limit=None):
+    """Returns the absolute product image URLs of a page (up to ``limit``), without duplicates."""
+    base = url
+    alt_pattern = _alt_pattern(name)
+    images = {}  # Ordered set
+    meta_images = {}
+
+    # One walk for <base>, <meta> and <img>: find_all() would walk the tree once per name
+    for tag in soup.descendants:
+        if not isinstance(tag, Tag):
+            continue
+        if tag.name == "meta":
+            for key in META_IMAGES:
+                if tag.get(key[0]) == key[1] and tag.get("content"):
+                    meta_images.setdefault(key, tag["content"])
+            continue
+        if tag.name == "base":
+            if tag.get("href") and base is url:
+                base = urljoin(url, tag["href"])
+            continue
+        if tag.name != "img":
+            continue
+
+        attrs = tag.attrs
+        src = None
+        for attribute in SRC_ATTRIBUTES:
+            value = attrs.get(attribute)
+            if value and not value.startswith("data:"):
+                src = value
+                break
+        srcsets = _srcsets(tag)
+        best = best_srcset(*srcsets) if srcsets else None
+        if src is None and best is None:
+            continue
+
+        # Filter for actual product images, not logos or general website images
+        target = (src if best is None else best if src is None else f"{src} {best}").lower()
+        if _CHROME_URL.search(target):
+            continue
+        if not (_PRODUCT_URL.search(target) or alt_pattern.search(attrs.get("alt", "").lower())):
+            continue
+
+        absolute = _absolute(base, best or src)
+        if absolute is not None:
+            images[absolute] = None
+            if limit is not None and len(images) >= limit:
+                break
+
+    if not images:
+        for key in META_IMAGES:
+            content = meta_images.get(key)
+            if content and not _CHROME_URL.search(content.lower()):
+                absolute = _absolute(base, content)
+                if absolute is not None:
+                    return [absolute]
+    return list(images)
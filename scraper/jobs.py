@@ -0,0 +1,148 @@
+"""Background lookups shared by every user of one long-running process.
+
+A UI that redraws itself on every interaction (the Streamlit app reruns
+its whole script) must neither redo a lookup on each redraw nor wait for
+one to finish. ``Jobs`` runs each lookup on a background thread and keeps
+it by query:
+
+* asking for a query that is already being looked up joins that job, so
+  concurrent users of one server share a single search and scrape;
+* callers read a job's progress (the pipeline events so far) and return at
+  once, instead of blocking until the network work is done;
+* a finished job is kept for JOB_TTL, then the next request for the query
+  starts a fresh lookup. Failed jobs are retried after FAILED_TTL.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scraper import tracing
+from scraper.pipeline import SEARCHERS, run_pipeline
+from scraper.search import query_key
+from scraper.thumbnails import thumbnails
+
+# ---------- Defaults ----------
+WORKERS = 4
+JOB_TTL = 10 * 60
+FAILED_TTL = 30  # Long enough for every waiting caller to see the error
+GALLERY_IMAGES = 5  # Photos the app shows per site; only these get thumbnails
+
+
+class Job:
+    """One lookup running (or finished) in the background.
+
+    ``events`` is the list of ``(site, stage, payload)`` pipeline events so
+    far and only ever grows; ``record`` is built up the same way as the
+    ``scraper.pipeline.lookup`` result. Once the job has finished,
+    ``thumbnails`` maps the product image URLs to local thumbnail files
+    (None where there is none) and ``trace`` holds the lookup's spans.
+    """
+
+    def __init__(self, query):
+        self.key = query_key(query)
+        self.query = query
+        self.events = []
+        self.record = {"query": query, "urls": {site: None for site in SEARCHERS},
+                       "results": {}, "errors": {}}
+        self.thumbnails = {}
+        self.error = None
+        self.trace = None
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the job has finished; returns whether it has."""
+        return self._done.wait(timeout)
+
+    def expired(self, now=None):
+        ttl = JOB_TTL if self.error is None else FAILED_TTL
+        return self.done and (now or time.time()) - self.finished_at > ttl
+
+    def run(self):
+        self.started_at = time.time()
+        try:
+            with tracing.trace("lookup", query=self.query) as recording:
+                self.trace = recording
+                for site, stage, payload in run_pipeline(self.query):
+                    if stage == "search":
+                        self.record["urls"][site] = payload
+                    elif "error" in payload:
+                        self.record["errors"][site] = payload["error"]
+                    else:
+                        self.record["results"][site] = payload
+                    self.events.append((site, stage, payload))
+                self._make_thumbnails()
+        except Exception as e:
+            tracing.inc("scraper_errors_total", stage="job")
+            self.error = str(e)
+        finally:
+            self.finished_at = time.time()
+            self._done.set()
+
+    def _make_thumbnails(self):
+        shown = [(result.get("product_images") or [])[:GALLERY_IMAGES]
+                 for result in self.record["results"].values()]
+        images = list(dict.fromkeys(image for site_images in shown for image in site_images))
+        if not images:
+            return
+        with tracing.span("thumbnails", images=len(images)):
+            try:
+                self.thumbnails = dict(zip(images, thumbnails(images)))
+            except Exception:  # The gallery falls back to the remote images
+                tracing.inc("scraper_errors_total", stage="thumbnails")
+
+
+class Jobs:
+    """Background lookups by query key, with at most ``workers`` running at once."""
+
+    def __init__(self, workers=WORKERS):
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="lookup-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def start(self, query):
+        """Returns the job for a query, starting one unless it is running or recently finished."""
+        key = query_key(query)
+        with self._lock:
+            self._prune()
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = Job(query)
+                self._executor.submit(job.run)
+            return job
+
+    def get(self, query):
+        """Returns the current job for a query without starting one, or None."""
+        with self._lock:
+            job = self._jobs.get(query_key(query))
+        return None if job is None or job.expired() else job
+
+    def running(self):
+        """Jobs that have not finished yet."""
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.done]
+
+    def _prune(self):
+        now = time.time()
+        for key in [key for key, job in self._jobs.items() if job.expired(now)]:
+            del self._jobs[key]
+
+
+# ---------- Shared Instance ----------
+_jobs = None
+_jobs_lock = threading.Lock()
+
+
+def get_jobs():
+    """Returns the process-wide job registry."""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = Jobs()
+    return _jobs
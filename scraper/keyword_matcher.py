@@ -0,0 +1,81 @@
+"""Compiled keyword tables for classifying text blocks into fields.
+
+The scrapers decide which field a block of text belongs to by looking for
+keywords in it. ``KeywordClassifier`` compiles a ``{field: [keywords]}`` table
+once at import time instead of rebuilding keyword lists for every block.
+
+With ``pyahocorasick`` (in requirements.txt) the table becomes an
+Aho-Corasick automaton and every matching field comes out of a single scan
+of the text. Where it can't be installed, each distinct keyword is looked up with ``in`` (a C-level
+substring search); CPython's ``re`` tries a big alternation at every
+position, which is slower than these scans, so no regex is used.
+"""
+try:
+    import ahocorasick
+except ImportError:  # Fallback: one substring search per keyword
+    ahocorasick = None
+
+
+class KeywordClassifier:
+    """Matches text against an ordered ``{field: [keywords]}`` table."""
+
+    def __init__(self, table):
+        self.fields = list(table)
+        self._keywords = {field: tuple(words) for field, words in table.items()}
+
+        # Keyword -> fields it belongs to (a keyword may serve several fields)
+        self._fields_for = {}
+        for field, words in self._keywords.items():
+            for word in words:
+                self._fields_for.setdefault(word, set()).add(field)
+
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for word, fields in self._fields_for.items():
+                self._automaton.add_word(word, frozenset(fields))
+            self._automaton.make_automaton()
+
+    def match(self, text):
+        """Returns the set of fields with at least one keyword occurring in text."""
+        found = set()
+        if self._automaton is not None:
+            for _, fields in self._automaton.iter(text):
+                found |= fields
+            return found
+
+        for word, fields in self._fields_for.items():
+            if word in text and not fields <= found:
+                found |= fields
+        return found
+
+    def classify(self, text, data):
+        """Returns the first field, in table order, that is still empty in data
+        and has a keyword in text; None if there is no such field.
+
+        This is the ``if ... elif ...`` chain the scrapers use to fill each
+        field with the first block that mentions it. Filled fields are skipped
+        before any scanning, so the work shrinks as the record fills up.
+        """
+        if self._automaton is not None:
+            found = self.match(text)
+            for field in self.fields:
+                if field in found and not data.get(field):
+                    return field
+            return None
+
+        for field in self.fields:
+            if not data.get(field) and any(word in text for word in self._keywords[field]):
+                return field
+        return None
+
+    def any(self, text):
+        """True if any keyword of any field occurs in text."""
+        if self._automaton is not None:
+            return next(self._automaton.iter(text), None) is not None
+        return any(word in text for word in self._fields_for)
+
+
+def keyword_set(words):
+    """Builds a single-field classifier for plain "does any of these occur" checks."""
+    return KeywordClassifier({"match": words})
@@ -0,0 +1,162 @@
+"""Process pool for the CPU-bound extraction stage of scraping.
+
+With fetches running concurrently, parsing and the keyword loops of the
+extractors become the bottleneck, and being pure Python they hold the GIL:
+more threads do not help. ``extract_async`` ships a page's raw bytes and its
+site id to a pool of worker processes and gets the finished product record
+back, so extraction runs on every core.
+
+* Each event loop keeps at most ``max_pending`` pages queued or in flight;
+  further pages wait before being pickled, so a fast fetch stage cannot pile
+  up page bodies in memory.
+* Workers are replaced after ``pages_per_worker`` pages (Python 3.11+), which
+  bounds the memory a long batch run can accumulate in one process.
+* If a worker dies the pool is rebuilt and the page is extracted in-process
+  on the parse threads instead.
+
+On a single-core machine the pool is off by default and pages are extracted
+on the parse threads, as before.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import requests
+
+from scraper import tracing
+from scraper.aio import run_parse
+from scraper.extractors import extract_product
+
+logger = logging.getLogger(__name__)
+
+# ---------- Defaults ----------
+PROCESSES = os.cpu_count() or 1
+PAGES_PER_WORKER = 200
+
+
+def decode(body, encoding):
+    """Decodes a page body exactly like ``requests.Response.text``."""
+    r = requests.Response()
+    r._content = body
+    r.encoding = encoding
+    return r.text
+
+
+def extract_page(site, url, body, encoding):
+    """Worker entry point: raw page bytes in, product record out."""
+    return extract_product(site, url, decode(body, encoding))
+
+
+def extract_page_traced(site, url, body, encoding):
+    """``extract_page`` that also returns the worker's spans for ``tracing.adopt``."""
+    with tracing.trace("worker") as recorded:
+        record = extract_page(site, url, body, encoding)
+    return record, [span.export() for span in recorded.spans]
+
+
+class ParsePool:
+    """A recycling process pool with per-event-loop backpressure."""
+
+    def __init__(self, processes=PROCESSES, pages_per_worker=PAGES_PER_WORKER, max_pending=None):
+        self.processes = processes
+        self.pages_per_worker = pages_per_worker
+        self.max_pending = max_pending or processes * 2
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = weakref.WeakKeyDictionary()  # Event loop -> its semaphore
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                kwargs = {}
+                if sys.version_info >= (3, 11):
+                    kwargs["max_tasks_per_child"] = self.pages_per_worker
+                # Workers start from a clean interpreter, not a copy of a threaded parent
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                    **kwargs)
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _loop_slots(self):
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_pending)
+        return slots
+
+    async def extract(self, site, url, body, encoding):
+        """Extracts one page in a worker process."""
+        async with self._loop_slots():
+            executor = self._get_executor()
+            try:
+                record, spans = await asyncio.get_running_loop().run_in_executor(
+                    executor, extract_page_traced, site, url, body, encoding)
+                tracing.adopt(spans)
+                return record
+            except BrokenProcessPool as e:
+                logger.warning("Parse worker died (%s); restarting the pool", e)
+                self._discard(executor)
+        return await run_parse(extract_page, site, url, body, encoding)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+
+_pool = None
+_pool_enabled = PROCESSES > 1
+_pool_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    global _pool, _pool_lock
+    _pool, _pool_lock = None, threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_pool():
+    """Returns the shared parse pool, or None when pages are extracted in-process."""
+    global _pool
+    if not _pool_enabled:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ParsePool()
+    return _pool
+
+
+def set_pool(pool):
+    """Installs a parse pool for all scrapes; pass None to extract in-process."""
+    global _pool, _pool_enabled
+    with _pool_lock:
+        old, _pool = _pool, pool
+        _pool_enabled = pool is not None
+    if old is not None and old is not pool:
+        old.shutdown()
+
+
+async def extract_async(site, url, body, encoding):
+    """Turns a fetched product page into its record, in the pool if there is one."""
+    with tracing.span("extract", site=site):
+        pool = get_pool()
+        if pool is None:
+            return await run_parse(extract_page, site, url, body, encoding)
+        return await pool.extract(site, url, body, encoding)
@@ -0,0 +1,66 @@
+"""Pluggable HTML parser backend and per-call-site parse limits.
+
+Every page used to be parsed in full with the pure-Python ``html.parser``.
+``make_soup`` picks the fastest BeautifulSoup tree builder installed (lxml,
+falling back to html.parser) and lets each call site say how much of the
+tree it actually needs:
+
+* search probes only look at links and the page heading, so they parse
+  through ``SEARCH_PAGE``, a SoupStrainer that keeps just those subtrees;
+* product scrapers need the full tree but not the page chrome, so
+  ``prune_page`` drops script/style/nav/footer subtrees right after parsing.
+  Structured-data scripts (JSON-LD, ``__NEXT_DATA__``) are kept for
+  ``structured_data``, which reads product fields from them.
+
+selectolax is not offered as a backend: it builds its own tree type, while
+every extractor here is written against the BeautifulSoup API.
+"""
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+try:
+    import lxml  # noqa: F401  (only needed for BeautifulSoup's "lxml" builder)
+    DEFAULT_BACKEND = "lxml"
+except ImportError:  # Optional speedup
+    DEFAULT_BACKEND = "html.parser"
+
+BACKENDS = ("lxml", "html.parser") if DEFAULT_BACKEND == "lxml" else ("html.parser",)
+
+_PRODUCT_CARD_CLASSES = ("style__product-card", "style__product-name")
+
+
+def _is_search_element(name, attrs):
+    """Keeps links, the page heading and 1mg's product card containers."""
+    if name in ("a", "h1"):
+        return True
+    classes = attrs.get("class") or ""
+    if not isinstance(classes, str):
+        classes = " ".join(classes)
+    return (attrs.get("data-testid") == "product-card"
+            or any(card in classes for card in _PRODUCT_CARD_CLASSES))
+
+
+# Search pages: only the elements the search_* selectors can hit
+SEARCH_PAGE = SoupStrainer(_is_search_element)
+
+# Product pages: subtrees no extractor reads
+PRUNED_TAGS = frozenset(["style", "noscript", "nav", "footer", "script"])
+_DATA_SCRIPT_TYPES = ("application/ld+json", "application/json")
+
+
+def make_soup(markup, strainer=None, backend=None):
+    """Parses markup with the chosen (or best available) backend."""
+    return BeautifulSoup(markup, backend or DEFAULT_BACKEND, parse_only=strainer)
+
+
+def prune_page(soup, tags=PRUNED_TAGS):
+    """Removes page-chrome subtrees in place, keeping structured-data scripts."""
+    # A plain walk is far cheaper than find_all() with a list of names, which
+    # runs a SoupStrainer over every element
+    found = [node for node in soup.descendants if isinstance(node, Tag) and node.name in tags]
+    for tag in found:
+        if tag.name == "script" and (tag.get("type") in _DATA_SCRIPT_TYPES
+                                     or tag.get("id") == "__NEXT_DATA__"):
+            continue
+        tag.decompose()
+    return soup
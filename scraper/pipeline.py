@@ -0,0 +1,139 @@
+"""Product scraping entry point and the concurrent search+scrape pipeline."""
+import asyncio
+import logging
+
+import requests
+
+from scraper import tracing
+from scraper.aio import coalesce, fetch_async, iter_sync, run_blocking, run_sync
+from scraper.catalog import get_catalog
+from scraper.extractors import site_for
+from scraper.parse_pool import extract_async
+from scraper.search import (search_1mg, search_1mg_async, search_apollo, search_apollo_async,
+                            search_truemeds, search_truemeds_async)
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- Main Scraper Function ----------
+@coalesce(lambda url: url)
+async def scrape_product_async(url: str):
+    """Main function to dispatch scraping task based on URL."""
+    if not url:
+        return {"error": "No product URL provided"}
+    site = site_for(url)
+    if site is None:
+        return {"error": f"Scraper not implemented for this domain: {url}"}
+
+    with tracing.span("scrape", site=site, url=url) as scrape_span:
+        catalog = get_catalog()
+        if catalog is not None:
+            record = await run_blocking(catalog.fresh, url)
+            result = "miss" if record is None else "hit"
+            tracing.inc("scraper_catalog_lookups_total", result=result)
+            scrape_span.attributes["catalog"] = result
+            if record is not None:
+                return record
+
+        try:
+            r = await fetch_async(url)
+            r.raise_for_status()
+            record = await extract_async(site, url, r.content, r.encoding)
+            if catalog is not None:
+                await run_blocking(catalog.add, record, site)
+            return record
+
+        except requests.exceptions.RequestException as e:
+            tracing.inc("scraper_errors_total", stage="scrape", site=site)
+            return {"error": f"Failed to fetch {url}. Reason: {e}"}
+
+
+def scrape_product(url: str):
+    """Blocking ``scrape_product_async``."""
+    return run_sync(scrape_product_async(url))
+
+
+# ---------- Concurrent Pipeline ----------
+# Searches run in parallel and each site's scrape starts as soon as its URL is
+# known, so a query takes as long as the slowest site instead of the sum.
+
+SEARCHERS = {
+    "1mg": search_1mg,
+    "Apollo": search_apollo,
+    "Truemeds": search_truemeds,
+}
+
+ASYNC_SEARCHERS = {
+    "1mg": search_1mg_async,
+    "Apollo": search_apollo_async,
+    "Truemeds": search_truemeds_async,
+}
+
+
+async def run_pipeline_async(product_name, searchers=None):
+    """Searches and scrapes every site concurrently, yielding events as they finish.
+
+    Yields ``(site, stage, payload)`` tuples in completion order: a ``"search"``
+    event with the found URL (or None) for each site, then a ``"scrape"`` event
+    with the ``scrape_product`` result for every site whose URL was found.
+    Searchers may be coroutine functions or blocking functions; the latter run
+    on the I/O thread pool.
+    """
+    searchers = searchers or ASYNC_SEARCHERS
+    pending = {}
+    for site, search in searchers.items():
+        if asyncio.iscoroutinefunction(search):
+            task = asyncio.ensure_future(search(product_name))
+        else:
+            task = asyncio.ensure_future(run_blocking(search, product_name))
+        pending[task] = (site, "search")
+
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                site, stage = pending.pop(task)
+                try:
+                    payload = task.result()
+                except Exception as e:
+                    tracing.inc("scraper_errors_total", stage=stage, site=site)
+                    logger.warning("%s %s error: %s", site, stage, e)
+                    payload = None if stage == "search" else {"error": str(e)}
+
+                # Chain the scrape onto the search as soon as a URL comes back
+                if stage == "search" and payload:
+                    pending[asyncio.ensure_future(scrape_product_async(payload))] = (site, "scrape")
+                yield site, stage, payload
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def run_pipeline(product_name, searchers=None):
+    """Blocking ``run_pipeline_async``: a plain generator of the same events."""
+    return iter_sync(run_pipeline_async(product_name, searchers))
+
+
+async def lookup_async(product_name, searchers=None):
+    """Runs the whole pipeline for one medicine and returns a single JSON-ready record.
+
+    ``urls`` holds every site's search result, ``results`` the successful
+    scrapes and ``errors`` the sites whose page could not be scraped.
+    """
+    searchers = searchers or ASYNC_SEARCHERS
+    record = {"query": product_name, "urls": {site: None for site in searchers},
+              "results": {}, "errors": {}}
+    with tracing.span("lookup", query=product_name):
+        async for site, stage, payload in run_pipeline_async(product_name, searchers):
+            if stage == "search":
+                record["urls"][site] = payload
+            elif "error" in payload:
+                record["errors"][site] = payload["error"]
+            else:
+                record["results"][site] = payload
+    return record
+
+
+def lookup(product_name, searchers=None):
+    """Blocking ``lookup_async``."""
+    return run_sync(lookup_async(product_name, searchers))
@@ -0,0 +1,272 @@
+"""Per-host politeness scheduler that sits in front of every network fetch.
+
+Bulk runs against 1mg, Apollo and Truemeds get throttled or blocked quickly,
+and once that happens throughput drops to zero. Every host gets its own
+limiter with:
+
+* a token bucket (implemented as a GCRA schedule), so requests are spaced at
+  the host's rate with a small burst allowance;
+* a cap on concurrent in-flight requests;
+* adaptive slowdown (AIMD): a 429/503 halves the host's rate and honours
+  Retry-After, every other response nudges the rate back up towards the
+  configured maximum, so the scheduler settles at the highest rate the
+  host tolerates.
+
+Callers wait for their slot in arrival order: a freed slot is handed
+straight to the longest waiting thread or coroutine. A slot covers the whole
+request, body download included. Hosts are limited independently, so a
+throttled host never holds up requests to the others. Threads and coroutines
+(``request_async``) share the same per-host limits.
+"""
+import asyncio
+import collections
+import email.utils
+import logging
+import threading
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+class HostPolicy:
+    """Rate settings for one host."""
+
+    def __init__(self, rate=2.0, burst=4, max_concurrency=4, min_rate=0.1, max_attempts=3):
+        self.rate = rate                        # Requests per second at full speed
+        self.burst = burst                      # Requests allowed back to back
+        self.max_concurrency = max_concurrency  # Requests in flight at once
+        self.min_rate = min_rate                # Floor for adaptive slowdown
+        self.max_attempts = max_attempts        # Tries per request when throttled
+
+
+DEFAULT_POLICY = HostPolicy()
+HOST_POLICIES = {
+    "www.1mg.com": HostPolicy(rate=3.0, burst=6),
+    "www.apollopharmacy.in": HostPolicy(rate=2.0, burst=4),
+    "www.truemeds.in": HostPolicy(rate=2.0, burst=4),
+}
+
+
+def parse_retry_after(value):
+    """Returns the delay in seconds from a Retry-After header (seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Waiter:
+    """A thread or coroutine queued for a concurrency slot."""
+
+    __slots__ = ("wake", "granted")
+
+    def __init__(self, wake):
+        self.wake = wake
+        self.granted = False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class HostLimiter:
+    """Token bucket, concurrency cap and adaptive rate for a single host."""
+
+    def __init__(self, host, policy):
+        self.host = host
+        self.policy = policy
+        self.rate = policy.rate
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters = collections.deque()  # FIFO of _Waiters for a slot
+        self._tat = 0.0            # Theoretical arrival time of the next request
+        self._blocked_until = 0.0  # Set by Retry-After / throttling responses
+
+    def _reserve(self):
+        """Books the next send time on the schedule; returns how long to wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            tolerance = (self.policy.burst - 1) * interval
+            start = max(now, self._tat - tolerance, self._blocked_until)
+            # Reserving the slot under the lock keeps waiters in arrival order
+            self._tat = max(self._tat, start) + interval
+        return start - now
+
+    def _take_slot(self, wake):
+        """Takes a free slot (returns None) or queues ``wake`` for the next one (returns its _Waiter)."""
+        with self._lock:
+            if self._in_flight < self.policy.max_concurrency and not self._waiters:
+                self._in_flight += 1
+                return None
+            waiter = _Waiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+
+    def _abandon(self, waiter):
+        """Leaves the queue; a slot already handed to the waiter is passed on."""
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                return
+        self.release()
+
+    def acquire(self):
+        """Blocks until this host may be sent another request."""
+        event = threading.Event()
+        waiter = self._take_slot(event.set)
+        try:
+            if waiter is not None:
+                event.wait()
+            delay = self._reserve()
+            if delay > 0:
+                time.sleep(delay)
+        except BaseException:
+            if waiter is None:
+                self.release()
+            else:
+                self._abandon(waiter)
+            raise
+
+    async def acquire_async(self):
+        """Waits, without blocking the event loop, until this host may be sent another request."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._take_slot(lambda: loop.call_soon_threadsafe(_resolve, future))
+        try:
+            if waiter is not None:
+                await future
+            delay = self._reserve()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        except BaseException:  # Cancelled while queued or waiting for the schedule
+            if waiter is None:
+                self.release()
+            else:
+                self._abandon(waiter)
+            raise
+
+    def release(self):
+        """Frees a slot, handing it straight to the longest waiting caller if there is one."""
+        while True:
+            with self._lock:
+                if not self._waiters:
+                    self._in_flight -= 1
+                    return
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+            try:
+                waiter.wake()
+                return
+            except RuntimeError:  # The waiter's event loop is closed: try the next one
+                continue
+
+    def feedback(self, status, headers):
+        """Adapts the rate to the host's response."""
+        with self._lock:
+            if status in THROTTLE_STATUSES:
+                self.rate = max(self.policy.min_rate, self.rate / 2)
+                delay = parse_retry_after(headers.get("Retry-After"))
+                if delay is None:
+                    delay = 1.0 / self.rate
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+                logger.warning("%s answered %s; slowing to %.2f req/s and pausing %.1fs",
+                               self.host, status, self.rate, delay)
+            elif self.rate < self.policy.rate:
+                # Additive increase: recover a twentieth of the full rate per success
+                self.rate = min(self.policy.rate, self.rate + self.policy.rate / 20)
+
+
+class RateLimiter:
+    """Routes each request through its host's limiter."""
+
+    def __init__(self, policies=None, default_policy=DEFAULT_POLICY):
+        self.policies = HOST_POLICIES if policies is None else policies
+        self.default_policy = default_policy
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def for_host(self, host):
+        with self._lock:
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, self.policies.get(host, self.default_policy))
+                self._hosts[host] = limiter
+            return limiter
+
+    def request(self, url, send, hold=False):
+        """Calls ``send()`` within the host's limits, retrying throttled responses.
+
+        A 429/503 slows the host down and the request is retried once its
+        pause is over, up to the policy's max_attempts; the last response is
+        returned whatever its status. With ``hold=True`` (a streamed
+        response) the returned response keeps the host's slot until its
+        ``release_slot()`` is called, once the body has been read.
+        """
+        limiter = self.for_host(urlsplit(url).hostname or "")
+        for attempt in range(1, limiter.policy.max_attempts + 1):
+            limiter.acquire()
+            try:
+                r = send()
+            except BaseException:
+                limiter.release()
+                raise
+            limiter.feedback(r.status_code, r.headers)
+            last = r.status_code not in THROTTLE_STATUSES or attempt == limiter.policy.max_attempts
+            if last and hold:
+                r.release_slot = limiter.release
+                return r
+            if not last:
+                r.close()
+            limiter.release()
+            if last:
+                return r
+
+    async def request_async(self, url, send):
+        """Async ``request``: awaits ``send()``, which must return a ``requests.Response``
+        with its body read."""
+        limiter = self.for_host(urlsplit(url).hostname or "")
+        for attempt in range(1, limiter.policy.max_attempts + 1):
+            await limiter.acquire_async()
+            try:
+                r = await send()
+            finally:
+                limiter.release()
+            limiter.feedback(r.status_code, r.headers)
+            if r.status_code not in THROTTLE_STATUSES or attempt == limiter.policy.max_attempts:
+                return r
+
+
+_limiter = None
+_limiter_enabled = True
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    """Returns the shared rate limiter, or None when limiting is disabled."""
+    global _limiter
+    if not _limiter_enabled:
+        return None
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def set_limiter(limiter):
+    """Installs a limiter for all fetches; pass None to disable rate limiting."""
+    global _limiter, _limiter_enabled
+    with _limiter_lock:
+        _limiter = limiter
+        _limiter_enabled = limiter is not None
@@ -0,0 +1,246 @@
+"""Canonical medicine records: one compact, typed schema for every site.
+
+Each site extractor returns its own ``details`` keys (``side_effects`` next
+to ``drug_warnings`` on Apollo and ``precautions_and_warnings`` on Truemeds,
+and so on), wrapped in ``extract_product``'s envelope. That suits the app,
+but a batch job holding tens of thousands of records pays for a dict per
+record and per FAQ, plus a copy of every key string in every record parsed
+from JSON.
+
+``MedicineRecord`` is a ``__slots__`` class with one attribute per
+canonical field (``FIELDS``), so field names are stored once per class
+rather than per record. FAQs are ``(question, answer)`` tuples and lists are
+tuples. ``SITE_FIELDS`` maps each site's detail keys onto the canonical
+fields, and the mapping runs both ways:
+
+    record = MedicineRecord.from_product(scrape_product(url))
+    record.to_product()          # the original envelope again
+
+``to_product`` writes every detail key of the site, unset ones as None (or
+an empty list), as the extractors do; an extractor's output comes back
+exactly, while a hand-made envelope missing some keys comes back with them.
+
+Serialization:
+
+* JSON Lines, with one canonical object per record and empty fields left
+  out (``dump_jsonl`` / ``load_jsonl``);
+* columns, with one list per field (``to_columns`` / ``from_columns``).
+  This is the layout columnar formats store, and as JSON it writes every
+  field name once per file instead of once per record.
+
+``python -m benchmarks.bench_records`` compares memory and speed against
+the plain dicts.
+"""
+import json
+import sys
+
+from scraper.extractors import site_for
+
+# Canonical fields, in output order
+FIELDS = (
+    "url", "site", "name", "images",
+    "overview", "uses", "how_it_works", "directions", "route", "dosage", "missed_dose",
+    "overdose", "side_effects", "warnings", "safety_advice", "interactions", "storage",
+    "diet_and_lifestyle", "therapeutic_class", "fact_box", "quick_tips", "patient_concerns",
+    "user_feedback", "substitutes", "faqs", "extra",
+)
+TUPLE_FIELDS = frozenset(["images", "substitutes", "faqs"])
+
+# Per site: its detail keys, in extractor order, and the canonical field each one fills
+SITE_FIELDS = {
+    "1mg": {
+        "overview": "overview",
+        "uses_and_benefits": "uses",
+        "side_effects": "side_effects",
+        "how_to_use": "directions",
+        "how_drug_works": "how_it_works",
+        "safety_advice": "safety_advice",
+        "missed_dose": "missed_dose",
+        "all_substitutes": "substitutes",
+        "quick_tips": "quick_tips",
+        "fact_box": "fact_box",
+        "interaction_with_drugs": "interactions",
+        "patient_concerns": "patient_concerns",
+        "user_feedback": "user_feedback",
+        "faqs": "faqs",
+    },
+    "apollo": {
+        "about_medicine": "overview",
+        "side_effects": "side_effects",
+        "uses_and_benefits": "uses",
+        "directions_for_use": "directions",
+        "how_it_works": "how_it_works",
+        "storage": "storage",
+        "overdose": "overdose",
+        "drug_warnings": "warnings",
+        "drug_interactions": "interactions",
+        "diet_and_lifestyle": "diet_and_lifestyle",
+        "therapeutic": "therapeutic_class",
+        "safety_advice": "safety_advice",
+        "faqs": "faqs",
+        "product_substitutes": "substitutes",
+    },
+    "truemeds": {
+        "uses": "uses",
+        "directions_for_use": "directions",
+        "route_of_administration": "route",
+        "side_effects": "side_effects",
+        "medicine_activity": "how_it_works",
+        "precautions_and_warnings": "warnings",
+        "interactions": "interactions",
+        "dosage_information": "dosage",
+        "storage": "storage",
+        "diet_and_lifestyle_guidance": "diet_and_lifestyle",
+        "fact_box": "fact_box",
+        "faqs": "faqs",
+    },
+}
+
+
+def _tuple(values):
+    return tuple(values) if values else ()
+
+
+def _faqs(faqs):
+    """FAQs as (question, answer) tuples, from ``{"q", "a"}`` objects or pairs."""
+    if not faqs:
+        return ()
+    return tuple((faq["q"], faq["a"]) if isinstance(faq, dict) else tuple(faq) for faq in faqs)
+
+
+class MedicineRecord:
+    """One product page in the canonical schema; unset fields are None (or ``()``).
+
+    ``extra`` holds detail keys the site's mapping doesn't know (None when
+    there are none), so no extracted data is lost on the way in.
+    """
+
+    __slots__ = FIELDS
+
+    def __init__(self, **fields):
+        for field in FIELDS:
+            setattr(self, field, fields.pop(field, () if field in TUPLE_FIELDS else None))
+        if fields:
+            raise TypeError(f"Unknown record fields: {', '.join(sorted(fields))}")
+
+    def __eq__(self, other):
+        if not isinstance(other, MedicineRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in FIELDS)
+
+    def __repr__(self):
+        return f"MedicineRecord(site={self.site!r}, name={self.name!r}, url={self.url!r})"
+
+    # ---------- Site Records ----------
+
+    @classmethod
+    def from_product(cls, product, site=None):
+        """Maps an ``extract_product`` / ``scrape_product`` result into the canonical schema."""
+        url = product.get("url")
+        site = site or site_for(url or "")
+        if site not in SITE_FIELDS:
+            raise ValueError(f"No field mapping for site {site!r}")
+        record = cls(url=url, site=sys.intern(site), name=product.get("medicine_name"),
+                     images=_tuple(product.get("product_images")))
+        keys = SITE_FIELDS[site]
+        extra = None
+        for key, value in (product.get("details") or {}).items():
+            field = keys.get(key)
+            if field is None:
+                if extra is None:
+                    extra = {}
+                extra[sys.intern(key)] = value
+            elif field == "faqs":
+                record.faqs = _faqs(value)
+            elif field in TUPLE_FIELDS:
+                setattr(record, field, _tuple(value))
+            else:
+                setattr(record, field, value)
+        record.extra = extra
+        return record
+
+    def to_product(self):
+        """The ``extract_product`` envelope with the site's own detail keys, in extractor order.
+
+        Every key of the site is present, unset ones as None (lists empty), as
+        the extractors return them; canonical fields the site has no key for
+        are not part of it.
+        """
+        details = {}
+        for key, field in SITE_FIELDS[self.site].items():
+            value = getattr(self, field)
+            if field == "faqs":
+                value = [{"q": question, "a": answer} for question, answer in value]
+            elif field in TUPLE_FIELDS:
+                value = list(value)
+            details[key] = value
+        if self.extra:
+            details.update(self.extra)
+        return {"url": self.url, "medicine_name": self.name, "product_images": list(self.images),
+                "details": details}
+
+    # ---------- Serialization ----------
+
+    def to_dict(self):
+        """The set fields as a JSON-ready dict (FAQs as ``{"q", "a"}`` objects)."""
+        data = {}
+        for field in FIELDS:
+            value = getattr(self, field)
+            if value is None or value == ():
+                continue
+            if field == "faqs":
+                value = [{"q": question, "a": answer} for question, answer in value]
+            data[field] = value
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuilds a record from ``to_dict`` output."""
+        record = cls.__new__(cls)
+        for field in FIELDS:
+            value = data.get(field)
+            if field == "faqs":
+                value = _faqs(value)
+            elif field in TUPLE_FIELDS:
+                value = _tuple(value)
+            elif field == "site" and value is not None:
+                value = sys.intern(value)
+            setattr(record, field, value)
+        return record
+
+
+def dump_jsonl(records, out):
+    """Writes records to a text file as JSON Lines; returns how many were written."""
+    count = 0
+    for record in records:
+        out.write(json.dumps(record.to_dict(), ensure_ascii=False))
+        out.write("\n")
+        count += 1
+    return count
+
+
+def load_jsonl(source):
+    """Yields the records of a JSON Lines file written by ``dump_jsonl``."""
+    for line in source:
+        if line.strip():
+            yield MedicineRecord.from_dict(json.loads(line))
+
+
+def to_columns(records):
+    """Returns ``{field: [value per record]}`` for every canonical field."""
+    columns = {field: [] for field in FIELDS}
+    appends = [(field, columns[field].append) for field in FIELDS]
+    for record in records:
+        for field, append in appends:
+            append(getattr(record, field))
+    return columns
+
+
+def from_columns(columns):
+    """Rebuilds the records of ``to_columns`` output (tuples may come back as lists)."""
+    length = len(columns["url"])
+    records = []
+    for row in range(length):
+        records.append(MedicineRecord.from_dict(
+            {field: values[row] for field, values in columns.items() if field in FIELDS}))
+    return records
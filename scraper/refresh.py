@@ -0,0 +1,346 @@
+"""Incremental refresh of known product pages.
+
+A nightly catalog refresh used to re-scrape every product URL, although
+most pages don't change from one night to the next. ``refresh`` keeps a
+fingerprint per URL instead:
+
+* the ETag / Last-Modified validators the site sent, so an unchanged page
+  is answered with a bodyless 304 and costs neither download nor parse;
+* a hash of the page's main content (the page without the chrome
+  ``prune_page`` drops, with each tag reduced to its name, class tokens and
+  link and image targets), so a page sent again in full but with the same
+  content isn't parsed again;
+* the ``EXTRACTOR_VERSION`` its record was extracted with: after an
+  extractor change every page is fetched in full and extracted again,
+  whatever its validators and content hash say.
+
+Only pages whose content hash changed are extracted, and the new record is
+diffed field by field against the stored one. Every run ends with a
+changeset report:
+
+    python -m scraper.refresh urls.txt --output changed.jsonl --report changes.json
+    python -m scraper.refresh --report changes.json     # every URL refreshed before
+
+Fetches bypass the response cache, which would otherwise answer from its
+own copy for up to a day. Extracted records also update the product catalog.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import sys
+import threading
+import time
+
+import requests
+
+from scraper.aio import fetch_async, iter_sync, run_blocking, run_parse
+from scraper.catalog import get_catalog
+from scraper.extractors import EXTRACTOR_VERSION, site_for
+from scraper.parse_pool import extract_async
+from scraper.settings import data_path
+
+# ---------- Defaults ----------
+WORKERS = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    content_hash TEXT NOT NULL,
+    record TEXT NOT NULL,
+    checked_at REAL NOT NULL,
+    changed_at REAL NOT NULL,
+    extractor_version INTEGER
+);
+"""
+
+# ---------- Content Fingerprint ----------
+# Work on the raw bytes with regexes: this runs for every page, including the
+# unchanged ones whose parse it is there to save.
+
+# Subtrees prune_page drops (except structured-data scripts) and comments
+_CHROME = re.compile(
+    rb"<script\b(?![^>]*(?:application/ld\+json|__NEXT_DATA__))[^>]*>.*?</script\s*>"
+    rb"|<(style|noscript|nav|footer)\b.*?</\1\s*>"
+    rb"|<!--.*?-->",
+    re.IGNORECASE | re.DOTALL)
+# Next.js stamps every page with the id of the deploy that rendered it
+_BUILD_ID = re.compile(rb'"buildId"\s*:\s*"[^"]*"')
+_TAG = re.compile(rb"<(/?[a-zA-Z][\w:-]*)[^>]*>")
+_CLASS = re.compile(rb"""(?<![\w-])class\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+_TARGET = re.compile(rb"""\b(?:href|src|srcset|data-src|data-lazy)\s*=\s*("[^"]*"|'[^']*')""",
+                     re.IGNORECASE)
+
+
+def _reduce_tag(match):
+    """Reduces a tag to its name, class tokens and link/image targets: what the
+    extractors select and read. Ids, styles and the like are dropped."""
+    tag = match.group(0)
+    parts = [match.group(1).lower()]
+    for classes in _CLASS.finditer(tag):
+        parts += (classes.group(1) or classes.group(2) or b"").split()
+    parts += [target.group(1) for target in _TARGET.finditer(tag)]
+    return b" <" + b" ".join(parts) + b"> "
+
+
+def content_hash(body):
+    """Returns the fingerprint of a page's main content."""
+    content = _CHROME.sub(b" ", body)
+    content = _BUILD_ID.sub(b"", content)
+    content = _TAG.sub(_reduce_tag, content)
+    return hashlib.sha256(b" ".join(content.split())).hexdigest()
+
+
+def changed_fields(old, new):
+    """Names the fields that differ between two product records (details as ``details.<field>``)."""
+    fields = []
+    for key in sorted(set(old) | set(new)):
+        if key == "details":
+            old_details, new_details = old.get(key) or {}, new.get(key) or {}
+            fields += [f"details.{field}" for field in sorted(set(old_details) | set(new_details))
+                       if old_details.get(field) != new_details.get(field)]
+        elif old.get(key) != new.get(key):
+            fields.append(key)
+    return fields
+
+
+# ---------- Fingerprint Store ----------
+
+class RefreshStore:
+    """SQLite table of per-URL validators, content hashes and last records."""
+
+    def __init__(self, path=None):
+        self.path = path or data_path("refresh.sqlite")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pages)")}
+        if "extractor_version" not in columns:  # A store from before versioned records
+            self._db.execute("ALTER TABLE pages ADD COLUMN extractor_version INTEGER")
+            self._db.commit()
+
+    def get(self, url):
+        """Returns the stored fingerprint and record for a URL as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_hash, record, extractor_version "
+                "FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, digest, record, version = row
+        return {"etag": etag, "last_modified": last_modified, "content_hash": digest,
+                "record": json.loads(record), "extractor_version": version}
+
+    def urls(self):
+        """Every URL with a stored fingerprint, oldest check first."""
+        with self._lock:
+            rows = self._db.execute("SELECT url FROM pages ORDER BY checked_at").fetchall()
+        return [url for url, in rows]
+
+    def touch(self, url, etag=None, last_modified=None):
+        """Records an unchanged check, keeping the old validators unless new ones came."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE pages SET checked_at = ?, etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), etag, last_modified, url))
+            self._db.commit()
+
+    def save(self, url, etag, last_modified, digest, record, changed=True,
+             version=EXTRACTOR_VERSION):
+        """Stores a freshly extracted page; ``changed`` moves its changed_at forward."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET etag = excluded.etag, "
+                "last_modified = excluded.last_modified, content_hash = excluded.content_hash, "
+                "record = excluded.record, checked_at = excluded.checked_at, "
+                "changed_at = CASE WHEN ? THEN excluded.changed_at ELSE pages.changed_at END, "
+                "extractor_version = excluded.extractor_version",
+                (url, etag, last_modified, digest, json.dumps(record, ensure_ascii=False),
+                 now, now, version, changed))
+            self._db.commit()
+
+
+# ---------- Refresh ----------
+
+def _touch(store, url, etag, last_modified):
+    store.touch(url, etag, last_modified)
+    catalog = get_catalog()
+    if catalog is not None:
+        catalog.touch(url)
+
+
+def _validators(old):
+    headers = {}
+    if old and old["etag"]:
+        headers["If-None-Match"] = old["etag"]
+    if old and old["last_modified"]:
+        headers["If-Modified-Since"] = old["last_modified"]
+    return headers
+
+
+async def refresh_url_async(url, store):
+    """Re-checks one product page.
+
+    Returns ``(entry, record)``: the page's changeset entry, and its new record
+    when it was extracted (None when it was skipped or failed). The entry's
+    status is ``new``, ``changed``, ``unchanged`` or ``failed``; unchanged
+    entries say ``by`` which check caught them (``validators``, ``content``
+    or ``record``), changed ones list their changed ``fields``.
+    """
+    site = site_for(url)
+    if site is None:
+        return {"url": url, "status": "failed", "error": "No scraper for this domain"}, None
+
+    old = await run_blocking(store.get, url)
+    # A record from an older extractor is redone even if the page is unchanged
+    current = old is not None and old["extractor_version"] == EXTRACTOR_VERSION
+    try:
+        r = await fetch_async(url, use_cache=False, headers=_validators(old) if current else None)
+        if current and r.status_code == 304:
+            await run_blocking(_touch, store, url, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+            return {"url": url, "status": "unchanged", "by": "validators"}, None
+        r.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        return {"url": url, "status": "failed", "error": str(e)}, None
+
+    etag, last_modified = r.headers.get("ETag"), r.headers.get("Last-Modified")
+    digest = await run_parse(content_hash, r.content)
+    if current and digest == old["content_hash"]:
+        await run_blocking(_touch, store, url, etag, last_modified)
+        return {"url": url, "status": "unchanged", "by": "content"}, None
+
+    record = await extract_async(site, url, r.content, r.encoding)
+    if old is None:
+        entry = {"url": url, "status": "new"}
+    else:
+        fields = changed_fields(old["record"], record)
+        if fields:
+            entry = {"url": url, "status": "changed", "fields": fields}
+        else:
+            entry = {"url": url, "status": "unchanged", "by": "record"}
+    await run_blocking(store.save, url, etag, last_modified, digest, record,
+                       entry["status"] != "unchanged")
+    catalog = get_catalog()
+    if catalog is not None:
+        await run_blocking(catalog.add, record, site)
+    return entry, (record if entry["status"] != "unchanged" else None)
+
+
+async def refresh_async(urls, store=None, workers=WORKERS):
+    """Refreshes every URL with at most ``workers`` pages in flight.
+
+    Yields ``(entry, record)`` pairs from ``refresh_url_async`` in completion
+    order; duplicate URLs are checked once.
+    """
+    store = store or RefreshStore()
+    pending = {}
+    seen = set()
+
+    def collect(done):
+        for task in done:
+            url = pending.pop(task)
+            try:
+                yield task.result()
+            except Exception as e:
+                yield {"url": url, "status": "failed", "error": str(e)}, None
+
+    try:
+        for url in urls:
+            if url in seen:
+                continue
+            seen.add(url)
+            # Keep the queue bounded: wait for a slot before starting more
+            while len(pending) >= workers:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for result in collect(done):
+                    yield result
+            pending[asyncio.ensure_future(refresh_url_async(url, store))] = url
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for result in collect(done):
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def refresh(urls, store=None, workers=WORKERS):
+    """Blocking ``refresh_async``: a plain generator of the same pairs."""
+    return iter_sync(refresh_async(urls, store, workers))
+
+
+def run_refresh(urls, store=None, workers=WORKERS, out=None):
+    """Refreshes the URLs and returns the changeset report.
+
+    Records of new and changed pages are written to ``out`` as JSON Lines
+    while the run progresses. The report counts every status and lists every
+    page that is not unchanged.
+    """
+    started = time.time()
+    counts = {"new": 0, "changed": 0, "unchanged": 0, "failed": 0}
+    changes = []
+    for entry, record in refresh(urls, store, workers):
+        counts[entry["status"]] += 1
+        if entry["status"] != "unchanged":
+            changes.append(entry)
+        if record is not None and out is not None:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+    return {
+        "started_at": started,
+        "elapsed_s": round(time.time() - started, 3),
+        "checked": sum(counts.values()),
+        "counts": counts,
+        "changes": sorted(changes, key=lambda entry: entry["url"]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-scrape known product pages that changed.")
+    parser.add_argument("input", nargs="?",
+                        help="File with one product URL per line, or - for stdin "
+                             "(default: every URL refreshed before)")
+    parser.add_argument("--output", help="JSON Lines file for the records of new and changed pages")
+    parser.add_argument("--report", help="Changeset report file (default: stdout)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Pages refreshed concurrently")
+    args = parser.parse_args()
+
+    store = RefreshStore()
+    if args.input is None:
+        urls = store.urls()
+    else:
+        source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+        with source:
+            urls = [line.strip() for line in source if line.strip() and not line.startswith("#")]
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        report = run_refresh(urls, store, args.workers, out)
+    finally:
+        if out is not None:
+            out.close()
+
+    counts = report["counts"]
+    print(f"Refreshed {report['checked']} pages in {report['elapsed_s']:.1f}s: "
+          f"{counts['changed']} changed, {counts['new']} new, {counts['unchanged']} unchanged, "
+          f"{counts['failed']} failed", file=sys.stderr)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    else:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    sys.exit(1 if counts["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
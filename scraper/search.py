@@ -0,0 +1,358 @@
+"""Product URL discovery for each pharmacy site.
+
+Each ``search_*_async`` coroutine has a blocking ``search_*`` twin that runs
+it on the shared event loop (see ``scraper.aio``).
+"""
+import asyncio
+import logging
+from urllib.parse import quote
+
+from scraper import tracing
+from scraper.aio import coalesce, fetch_async, run_parse, run_sync
+from scraper.parsing import SEARCH_PAGE, make_soup
+from scraper.search_index import indexed, note_answered
+from scraper.streaming import PageScanner, ScanRule
+
+logger = logging.getLogger(__name__)
+
+# ---------- Candidate Racing ----------
+# Each site has several candidate URLs that might lead to the product. Instead
+# of probing them one after another (up to one timeout each), they are all
+# fired at once and the first one that passes the site's check wins.
+# Candidates with a ScanRule are scanned while they download and stop reading
+# as soon as a search listing's link decides; a product page recognised by
+# its heading is read whole so the scrape finds it cached (see scraper.streaming).
+
+_PENDING = object()
+
+
+def _unanswered(status):
+    """Throttled or failing servers say nothing about whether the product exists."""
+    return status == 429 or status >= 500
+
+
+async def _probe_candidate(slots, url, check, rule=None):
+    """Fetches one candidate URL and runs its check on the parse executor."""
+    scanner = PageScanner(url, rule) if rule is not None else None
+    async with slots:
+        r = await fetch_async(url, consume=scanner and scanner.feed_bytes)
+    try:
+        if _unanswered(r.status_code):
+            r.raise_for_status()
+        note_answered()  # A 404 says "not here" as clearly as a page without links
+        if scanner is not None and getattr(r, "from_cache", False):
+            await run_parse(scanner.scan, r.content)  # Cached pages can still stop early
+        if scanner is not None and scanner.decided:
+            return scanner.result
+        with tracing.span("check"):
+            return await run_parse(check, url, r)
+    finally:
+        r.close()
+
+
+async def _traced_probe(label, slots, url, check, rule=None):
+    """Runs ``_probe_candidate`` as a ``probe`` span and counts its outcome."""
+    outcome = "error"
+    try:
+        with tracing.span("probe", url=url) as probe_span:
+            result = await _probe_candidate(slots, url, check, rule)
+            outcome = "hit" if result else "miss"
+            probe_span.attributes["outcome"] = outcome
+            return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"  # Lost the race
+        raise
+    finally:
+        tracing.inc("scraper_probes_total", search=label, outcome=outcome)
+
+
+async def race_candidates_async(candidates, ordered=True, max_workers=None, label="race"):
+    """Probes every (url, check[, rule]) candidate concurrently and returns the winning URL.
+
+    ``check(url, response)`` returns the resolved product URL or None. An
+    optional ``ScanRule`` lets the probe decide before the page has finished
+    downloading; pages it can't decide go through ``check`` as usual.
+    The list order is the priority order: with ``ordered=True`` a hit is only
+    accepted once every higher-priority candidate has missed, which gives the
+    same answer as a serial scan; with ``ordered=False`` the fastest hit wins.
+    ``max_workers`` caps the probes in flight at once. Outstanding probes are
+    cancelled as soon as the race is decided. ``label`` names the race in the
+    probe metrics. Probes that fail (including 429 and 5xx responses) count
+    as misses; any other response marks the search as answered for the
+    search index.
+    """
+    if not candidates:
+        return None
+
+    slots = asyncio.Semaphore(max_workers or len(candidates))
+    tasks = [asyncio.ensure_future(_traced_probe(label, slots, *candidate))
+             for candidate in candidates]
+    index = {task: i for i, task in enumerate(tasks)}
+    results = [_PENDING] * len(tasks)
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                i = index[task]
+                try:
+                    results[i] = task.result()
+                except Exception as e:
+                    tracing.inc("scraper_errors_total", stage="probe")
+                    logger.debug("Candidate %s failed: %s", candidates[i][0], e)
+                    results[i] = None  # Failed probes count as misses
+
+                if not ordered and results[i]:
+                    return results[i]
+
+            if ordered:
+                # Walk the priority list up to the first candidate still in flight
+                for result in results:
+                    if result is _PENDING:
+                        break
+                    if result:
+                        return result
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def race_candidates(candidates, ordered=True, max_workers=None, label="race"):
+    """Blocking ``race_candidates_async``."""
+    return run_sync(race_candidates_async(candidates, ordered, max_workers, label))
+
+
+def _absolute(href, base):
+    """Returns href as an absolute URL on the given site."""
+    return href if href.startswith("http") else base + href
+
+
+def _heading_matches(text, product_name):
+    """Checks whether a page heading looks like a product page for the query."""
+    text = text.lower()
+    return any(keyword in text for keyword in [product_name.lower(), 'tablet', 'capsule'])
+
+
+def _h1_matches(soup, product_name):
+    """Checks whether the page heading looks like a product page for the query."""
+    h1 = soup.find("h1")
+    return bool(h1) and _heading_matches(h1.get_text(), product_name)
+
+
+def _link_rule(fragments, base):
+    """ScanRule link test: hrefs containing any fragment, made absolute on base."""
+    def link(href):
+        if any(fragment in href for fragment in fragments):
+            return _absolute(href, base)
+        return None
+    return link
+
+
+# ---------- Search Helpers ----------
+def query_key(product_name):
+    """The key under which concurrent searches for a name are shared: case and spacing don't matter."""
+    return " ".join(product_name.casefold().split())
+
+
+# These functions find the most relevant product page URL from a search query.
+# Candidate URL patterns are listed in priority order; reorder them to change
+# which candidate wins when several of them match.
+
+ONEMG_SEARCH_PATTERNS = [
+    "https://www.1mg.com/search/all?name={query}",
+    "https://www.1mg.com/search/drugs?name={query}",
+    "https://www.1mg.com/drugs?search={query}",
+]
+ONEMG_GENERAL_SEARCH_PATTERN = "https://www.1mg.com/search?name={query}"
+
+APOLLO_SEARCH_PATTERNS = [
+    "https://www.apollopharmacy.in/otc/{query}",
+    "https://www.apollopharmacy.in/medicine/{query}",
+    "https://www.apollopharmacy.in/search-medicines/{query}",
+    "https://www.apollopharmacy.in/drugs/{query}",
+    "https://www.apollopharmacy.in/products?search={query}",
+]
+
+TRUEMEDS_SLUG_PATTERNS = [
+    "https://www.truemeds.in/medicine/{slug}-tablet",
+    "https://www.truemeds.in/medicine/{slug}",
+    "https://www.truemeds.in/drug/{slug}",
+    "https://www.truemeds.in/products/{slug}",
+]
+TRUEMEDS_SEARCH_PATTERNS = [
+    "https://www.truemeds.in/search?q={query}",
+    "https://www.truemeds.in/search/{query}",
+    "https://www.truemeds.in/medicines?search={query}",
+]
+
+
+def _check_1mg_search(url, r):
+    """Returns the first drug link on a 1mg search page."""
+    r.raise_for_status()
+    soup = make_soup(r.text, SEARCH_PAGE)
+
+    # Try multiple selectors for drug links
+    selectors = [
+        "a[href*='/drugs/']",
+        "a[href*='/otc/']",
+        ".style__product-card a",
+        ".style__product-name a",
+        "[data-testid='product-card'] a"
+    ]
+
+    for selector in selectors:
+        links = soup.select(selector)
+        if links:
+            href = links[0].get("href")
+            if href:
+                return _absolute(href, "https://www.1mg.com")
+    return None
+
+
+def _check_1mg_general_search(url, r):
+    """Returns any drug or OTC link on the general 1mg search page."""
+    r.raise_for_status()
+    soup = make_soup(r.text, SEARCH_PAGE)
+
+    for link in soup.find_all("a", href=True):
+        href = link.get("href")
+        if href and ("/drugs/" in href or "/otc/" in href):
+            return _absolute(href, "https://www.1mg.com")
+    return None
+
+
+# Scan rules: the first link of each check's top-priority selector
+ONEMG_SEARCH_RULE = ScanRule(link=_link_rule(["/drugs/"], "https://www.1mg.com"))
+ONEMG_GENERAL_SEARCH_RULE = ScanRule(link=_link_rule(["/drugs/", "/otc/"], "https://www.1mg.com"))
+
+
+@coalesce(query_key)
+@indexed("1mg")
+async def search_1mg_async(product_name):
+    """Searches Tata 1mg and returns the top product URL."""
+    try:
+        query = quote(product_name)
+
+        # Try different search URLs, with the general search as a last resort
+        candidates = [(pattern.format(query=query), _check_1mg_search, ONEMG_SEARCH_RULE)
+                      for pattern in ONEMG_SEARCH_PATTERNS]
+        candidates.append((ONEMG_GENERAL_SEARCH_PATTERN.format(query=query),
+                           _check_1mg_general_search, ONEMG_GENERAL_SEARCH_RULE))
+        return await race_candidates_async(candidates, label="search_1mg")
+
+    except Exception as e:
+        tracing.inc("scraper_errors_total", stage="search", site="1mg")
+        logger.warning("1mg search error: %s", e)
+    return None
+
+
+def search_1mg(product_name):
+    """Searches Tata 1mg and returns the top product URL."""
+    return run_sync(search_1mg_async(product_name))
+
+
+@coalesce(query_key)
+@indexed("apollo")
+async def search_apollo_async(product_name):
+    """Searches Apollo Pharmacy and returns the top product URL."""
+    try:
+        query = quote(product_name)
+
+        def check(url, r):
+            if r.status_code != 200:
+                return None
+            soup = make_soup(r.text, SEARCH_PAGE)
+
+            # Check if this is a direct product page
+            if _h1_matches(soup, product_name):
+                return url
+
+            # Look for product links in search results
+            selectors = [
+                "a[href*='/medicine/']",
+                "a[href*='/product/']",
+                "a[href*='/otc/']",
+                "a[href*='/drugs/']"
+            ]
+
+            for selector in selectors:
+                for link in soup.select(selector):
+                    href = link.get("href")
+                    if href:
+                        return _absolute(href, "https://www.apollopharmacy.in")
+            return None
+
+        rule = ScanRule(link=_link_rule(["/medicine/"], "https://www.apollopharmacy.in"),
+                        heading=lambda text: _heading_matches(text, product_name))
+
+        # Try different search URL patterns - Apollo might have changed their URLs
+        return await race_candidates_async([(pattern.format(query=query), check, rule)
+                                            for pattern in APOLLO_SEARCH_PATTERNS],
+                                           label="search_apollo")
+
+    except Exception as e:
+        tracing.inc("scraper_errors_total", stage="search", site="apollo")
+        logger.warning("Apollo search error: %s", e)
+    return None
+
+
+def search_apollo(product_name):
+    """Searches Apollo Pharmacy and returns the top product URL."""
+    return run_sync(search_apollo_async(product_name))
+
+
+@coalesce(query_key)
+@indexed("truemeds")
+async def search_truemeds_async(product_name):
+    """Searches Truemeds and returns the top product URL."""
+    try:
+        query = quote(product_name)
+        slug = query.replace('%20', '-').lower()
+
+        def check_product_page(url, r):
+            # Check if this looks like a valid product page
+            if r.status_code != 200:
+                return None
+            soup = make_soup(r.text, SEARCH_PAGE)
+            return url if _h1_matches(soup, product_name) else None
+
+        def check_search_page(url, r):
+            # Search pages might load content via JavaScript
+            if r.status_code != 200:
+                return None
+            soup = make_soup(r.text, SEARCH_PAGE)
+
+            # Try multiple selectors for product links
+            selectors = [
+                "a[href*='/medicine/']",
+                "a[href*='/product/']",
+                "a[href*='/drug/']"
+            ]
+
+            for selector in selectors:
+                for link in soup.select(selector):
+                    href = link.get("href")
+                    if href and ('/medicine/' in href or '/product/' in href or '/drug/' in href):
+                        return _absolute(href, "https://www.truemeds.in")
+            return None
+
+        product_rule = ScanRule(heading=lambda text: _heading_matches(text, product_name))
+        search_rule = ScanRule(link=_link_rule(["/medicine/"], "https://www.truemeds.in"))
+
+        # Direct medicine URLs take priority over the search pages
+        candidates = [(pattern.format(slug=slug), check_product_page, product_rule)
+                      for pattern in TRUEMEDS_SLUG_PATTERNS]
+        candidates += [(pattern.format(query=query), check_search_page, search_rule)
+                       for pattern in TRUEMEDS_SEARCH_PATTERNS]
+        return await race_candidates_async(candidates, label="search_truemeds")
+
+    except Exception as e:
+        tracing.inc("scraper_errors_total", stage="search", site="truemeds")
+        logger.warning("Truemeds search error: %s", e)
+    return None
+
+
+def search_truemeds(product_name):
+    """Searches Truemeds and returns the top product URL."""
+    return run_sync(search_truemeds_async(product_name))
@@ -0,0 +1,246 @@
+"""Persistent medicine name -> product URL resolution index.
+
+Searching is the slowest and most repeated step of a lookup, so every
+search result is remembered per site: positive results (a product URL) for
+a long time, negative ones (nothing found) only briefly. The index is
+consulted before any network search and starts out seeded with the URLs of
+a few common medicines. A search is only remembered as a miss when at
+least one of its probes got a real answer: if every probe failed (network
+down, timeouts, throttling) nothing is recorded, so an outage doesn't read
+as "not found" for NEGATIVE_TTL.
+"""
+import argparse
+import contextvars
+import functools
+import json
+import re
+import sqlite3
+import threading
+import time
+
+from scraper import tracing
+from scraper.aio import run_blocking
+from scraper.settings import data_path
+
+# ---------- Defaults ----------
+POSITIVE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 6 * 3600
+
+# Known product pages for common medicines. A seed matches any query that
+# contains its key, e.g. "crocin advance" resolves through "crocin".
+SEED_URLS = {
+    "1mg": {
+        "levocetrizen": "https://www.1mg.com/drugs/levocetrizen-5mg-tablet-542407",
+    },
+    "apollo": {
+        "paracetamol": "https://www.apollopharmacy.in/medicine/dolo-650mg-tablet",
+        "crocin": "https://www.apollopharmacy.in/medicine/crocin-advance-tablet",
+        "aspirin": "https://www.apollopharmacy.in/medicine/aspirin-tablet",
+        "ibuprofen": "https://www.apollopharmacy.in/medicine/brufen-400mg-tablet",
+        "cetirizine": "https://www.apollopharmacy.in/medicine/zyrtec-10mg-tablet",
+        "levocetrizen": "https://www.apollopharmacy.in/medicine/levocetrizen-10-tablet-10-s",
+    },
+    "truemeds": {
+        "paracetamol": "https://www.truemeds.in/medicine/dolo-650-tablet",
+        "crocin": "https://www.truemeds.in/medicine/crocin-advance-tablet",
+        "aspirin": "https://www.truemeds.in/medicine/aspirin-tablet",
+        "ibuprofen": "https://www.truemeds.in/medicine/brufen-400-tablet",
+        "cetirizine": "https://www.truemeds.in/medicine/cetirizine-10mg-tablet",
+        "levocetrizen": "https://www.truemeds.in/medicine/levocetrizen-10mg-tablet-10-tm-tacr1-053283",
+    },
+}
+
+# Returned by lookup() when the index knows nothing about a query
+MISS = object()
+
+_STRENGTH = re.compile(r"\b(\d+(?:\.\d+)?)\s*(?:mg|mcg|µg|g|ml|iu|%)(?:\s*/\s*\d*\s*(?:ml|g))?(?=\W|$)", re.IGNORECASE)
+_TOKEN = re.compile(r"\d+(?:\.\d+)?|[^\W_]+")
+
+# The running indexed() search's answered flag (a one-item list); see note_answered()
+_answered = contextvars.ContextVar("search_answered", default=None)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resolutions (
+    site TEXT NOT NULL,
+    key TEXT NOT NULL,
+    url TEXT,
+    source TEXT NOT NULL,
+    resolved_at REAL NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (site, key)
+);
+"""
+
+
+def normalize_query(name):
+    """Reduces a medicine query to its index key.
+
+    Case, punctuation and repeated whitespace are ignored, and strengths are
+    reduced to their number, so "Dolo 650MG ", "dolo 650 mg" and "Dolo 650"
+    share the key "dolo 650" while "dolo 500mg" keeps a key of its own.
+    """
+    return " ".join(_TOKEN.findall(_STRENGTH.sub(r"\1", name.lower())))
+
+
+class SearchIndex:
+    """SQLite table of per-site search results with separate positive/negative TTLs."""
+
+    def __init__(self, path=None, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL,
+                 seeds=SEED_URLS):
+        self.path = path or data_path("search_index.sqlite")
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._seeds = {}
+        if seeds:
+            self._seed(seeds)
+
+    def _seed(self, seeds):
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO resolutions VALUES (?, ?, ?, 'seed', ?, NULL)",
+                [(site, normalize_query(key), url, now)
+                 for site, urls in seeds.items() for key, url in urls.items()])
+            self._db.commit()
+        self._load_seeds()
+
+    def _load_seeds(self):
+        self._seeds = {}
+        rows = self._db.execute(
+            "SELECT site, key, url FROM resolutions WHERE source = 'seed' ORDER BY rowid").fetchall()
+        for site, key, url in rows:
+            self._seeds.setdefault(site, []).append((key, url))
+
+    def lookup(self, site, name):
+        """Returns the remembered URL (None for a known miss), or MISS if unknown."""
+        key = normalize_query(name)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT url, expires_at FROM resolutions WHERE site = ? AND key = ?",
+                (site, key)).fetchone()
+        if row is not None and (row[1] is None or row[1] > time.time()):
+            return row[0]
+
+        for seed_key, url in self._seeds.get(site, []):
+            if seed_key in key:
+                return url
+        return MISS
+
+    def record(self, site, name, url):
+        """Remembers a search result; None records that nothing was found."""
+        now = time.time()
+        ttl = self.positive_ttl if url else self.negative_ttl
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO resolutions VALUES (?, ?, ?, 'search', ?, ?)",
+                (site, normalize_query(name), url, now, now + ttl))
+            self._db.commit()
+
+    def export(self, path):
+        """Writes every unexpired entry to a JSON file that import_file() can read."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT site, key, url, source, resolved_at, expires_at FROM resolutions "
+                "WHERE expires_at IS NULL OR expires_at > ?", (time.time(),)).fetchall()
+        entries = [dict(zip(["site", "key", "url", "source", "resolved_at", "expires_at"], row))
+                   for row in rows]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        return len(entries)
+
+    def import_file(self, path):
+        """Merges entries from an exported JSON file, keeping the newer of any duplicates."""
+        with open(path, encoding="utf-8") as f:
+            entries = json.load(f)
+        with self._lock:
+            for entry in entries:
+                self._db.execute(
+                    "INSERT INTO resolutions VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (site, key) DO UPDATE SET url = excluded.url, "
+                    "source = excluded.source, resolved_at = excluded.resolved_at, "
+                    "expires_at = excluded.expires_at "
+                    "WHERE excluded.resolved_at > resolutions.resolved_at",
+                    (entry["site"], entry["key"], entry["url"], entry["source"],
+                     entry["resolved_at"], entry["expires_at"]))
+            self._db.commit()
+            self._load_seeds()
+        return len(entries)
+
+
+_index = None
+_index_enabled = True
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the shared search index, or None when it is disabled."""
+    global _index
+    if not _index_enabled:
+        return None
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SearchIndex()
+    return _index
+
+
+def set_index(index):
+    """Installs an index instance for all searches; pass None to disable it."""
+    global _index, _index_enabled
+    with _index_lock:
+        _index = index
+        _index_enabled = index is not None
+
+
+def note_answered():
+    """Marks the running search as answered: one of its probes got a reply
+    (a hit or a genuine miss) rather than an error."""
+    answered = _answered.get()
+    if answered is not None:
+        answered[0] = True
+
+
+def indexed(site):
+    """Decorates an async search function so it consults and feeds the index."""
+    def decorator(search):
+        @functools.wraps(search)
+        async def wrapper(product_name):
+            with tracing.span("search", site=site) as search_span:
+                index = get_index()
+                if index is None:
+                    return await search(product_name)
+
+                url = await run_blocking(index.lookup, site, product_name)
+                result = "miss" if url is MISS else "hit"
+                tracing.inc("scraper_search_index_lookups_total", site=site, result=result)
+                search_span.attributes["index"] = result
+                if url is not MISS:
+                    return url
+                answered = [False]
+                token = _answered.set(answered)
+                try:
+                    url = await search(product_name)
+                finally:
+                    _answered.reset(token)
+                if url or answered[0]:
+                    await run_blocking(index.record, site, product_name, url)
+                else:
+                    search_span.attributes["unanswered"] = True  # Every probe failed
+                return url
+        return wrapper
+    return decorator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export or import the search index.")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    if args.action == "export":
+        print(f"Exported {get_index().export(args.path)} entries to {args.path}")
+    else:
+        print(f"Imported {get_index().import_file(args.path)} entries from {args.path}")
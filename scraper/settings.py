@@ -0,0 +1,14 @@
+"""Locations shared by the scraper's on-disk stores."""
+import os
+
+# Everything the scraper persists (HTTP cache, indexes, ...) lives under here
+DATA_DIR = os.environ.get(
+    "MEDICINE_SCRAPER_DATA",
+    os.path.join(os.path.expanduser("~"), ".cache", "medicine_scraper"),
+)
+
+
+def data_path(name):
+    """Returns the path of a file inside DATA_DIR, creating the directory if needed."""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
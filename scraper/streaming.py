@@ -0,0 +1,111 @@
+"""Incremental scanning of search pages while they download.
+
+A search probe only needs the first matching ``<a href>`` (or the page
+heading), yet used to download and parse the whole page first. A
+``PageScanner`` is fed the body chunk by chunk as it arrives (see
+``fetch_async(consume=...)``) and tokenizes it with the standard library's
+incremental ``HTMLParser``. As soon as a search listing's link decides the
+answer the download stops. A heading that makes the page itself the answer
+decides too, but the page is still read to the end: it is the product page
+the scrape fetches next, and only a whole body goes into the response cache.
+
+The scanner only decides on what it can decide exactly: the first link
+matching a check's highest-priority selector, or the text of the first
+``<h1>``. Anything else (a lower-priority selector, a page without a
+heading) is left to the check's full parse of the bytes read.
+"""
+import codecs
+from html.parser import HTMLParser
+
+from scraper.http_client import READ_REST
+
+UNDECIDED = object()
+
+
+class ScanRule:
+    """What a search check looks for, in a form that can be decided mid-page.
+
+    ``link(href)`` returns the product URL for a link the check would pick
+    first, else None. ``heading(text)`` is True when the first ``<h1>`` makes
+    the page itself the answer. When both are given the heading decides first,
+    as in the checks; with only a heading, a non-matching heading decides
+    None.
+    """
+
+    def __init__(self, link=None, heading=None):
+        self.link = link
+        self.heading = heading
+
+
+class PageScanner(HTMLParser):
+    """Feeds page bytes through an incremental tokenizer until a ``ScanRule`` is decided."""
+
+    def __init__(self, url, rule):
+        super().__init__(convert_charrefs=True)
+        self.url = url
+        self.rule = rule
+        self.result = UNDECIDED
+        self._link = None        # First link accepted by rule.link
+        self._heading = None     # Text parts of the first <h1> once it opens
+        self._heading_done = False
+        self._page = False       # The page itself is the answer
+        # Only link targets and the heading are read, so the charset doesn't
+        # matter much; the check's fallback decodes properly
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    @property
+    def decided(self):
+        return self.result is not UNDECIDED
+
+    def feed_bytes(self, chunk):
+        """Feeds one chunk of the body; returns True once reading can stop, or
+        READ_REST once the page itself is the answer and should be read whole."""
+        if not self.decided:
+            self.feed(self._decoder.decode(chunk))
+        if self._page:
+            return READ_REST
+        return self.decided
+
+    def scan(self, body, chunk_size=16 * 1024):
+        """Feeds an already downloaded body, stopping as soon as the result is known."""
+        for start in range(0, len(body), chunk_size):
+            self.feed_bytes(body[start:start + chunk_size])
+            if self.decided:
+                break
+        return self.decided
+
+    def handle_starttag(self, tag, attrs):
+        if self.decided:
+            return
+        if tag == "a" and self._link is None and self.rule.link is not None:
+            href = dict(attrs).get("href")
+            if href:
+                self._link = self.rule.link(href)
+                if self._link:
+                    self._decide()
+        elif tag == "h1" and self._heading is None:
+            self._heading = []
+
+    def handle_endtag(self, tag):
+        if tag == "h1" and self._heading is not None and not self._heading_done:
+            self._heading_done = True
+            self._decide()
+
+    def handle_data(self, data):
+        if self._heading is not None and not self._heading_done:
+            self._heading.append(data)
+
+    def _decide(self):
+        rule = self.rule
+        if rule.heading is not None:
+            if not self._heading_done:
+                return  # A heading further down would take priority
+            if rule.heading("".join(self._heading)):
+                self.result = self.url
+                self._page = True
+                return
+            if rule.link is None:
+                self.result = None
+                return
+        if self._link:
+            self.result = self._link
@@ -0,0 +1,415 @@
+"""Structured-data tier: product fields read from the JSON embedded in a page.
+
+The pharmacy sites ship most of a product's data twice: as visible HTML and
+as JSON, either schema.org JSON-LD (``<script type="application/ld+json">``)
+or the Next.js ``__NEXT_DATA__`` blob the page was rendered from. Reading the
+JSON is exact and costs one ``json.loads`` per script, while the DOM
+heuristics classify every text block on the page.
+
+``extract_structured(site, soup)`` parses those payloads once and maps them
+into the site's record schema. The scrapers start from its result and only
+run the DOM stages for fields it left empty.
+
+Generic keys such as ``description`` or ``storage`` also turn up in
+site-wide settings, SEO blocks and related-product cards, so values are only
+read from the product's own node: the node whose name matches the page's
+``<h1>`` (or ``og:title``) best, else a top-level JSON-LD ``Drug``/``Product``.
+Related products nested inside it are not descended into. Pages without a
+product node get nothing from this tier and are extracted from the DOM.
+
+Each site's ``text`` table lists, per field, the JSON keys that may hold it in
+priority order: schema.org ``Drug`` properties plus the camelCase names used
+by the sites' own payloads. Keys are matched ignoring case, ``_`` and ``-``.
+"""
+import collections
+import html
+import json
+import re
+
+from bs4.element import Tag
+
+from scraper.parsing import make_soup
+
+NEXT_DATA_ID = "__NEXT_DATA__"
+JSON_LD_TYPE = "application/ld+json"
+
+# JSON-LD nodes that describe the website rather than the product
+SKIPPED_TYPES = frozenset(["Organization", "WebSite", "SearchAction", "BreadcrumbList",
+                           "SiteNavigationElement", "ImageObject"])
+
+# JSON-LD types of the product node itself
+PRODUCT_TYPES = frozenset(["Drug", "Product", "MedicalEntity"])
+
+# Keys naming the product a payload node describes. Only the specific ones
+# mark a nested node as another product: "name" is used by manufacturers,
+# ingredients and the like too.
+NAME_KEYS = ("productName", "medicineName", "skuName", "displayName", "name")
+PRODUCT_NAME_KEYS = frozenset(map(str.lower, NAME_KEYS[:-1]))
+
+_NAME_TOKEN = re.compile(r"\w+")
+
+# Labelled fields: every key found contributes a "Label: value" part
+WARNING_LABELS = [
+    ("alcoholWarning", "Alcohol"),
+    ("pregnancyWarning", "Pregnancy"),
+    ("breastfeedingWarning", "Breastfeeding"),
+    ("drivingWarning", "Driving"),
+]
+FACT_LABELS = [
+    ("activeIngredient", "Composition"),
+    ("manufacturer", "Manufacturer"),
+    ("drugClass", "Therapeutic class"),
+    ("habitForming", "Habit forming"),
+]
+
+SITE_SCHEMAS = {
+    "1mg": {
+        "text": {
+            "overview": ["productIntroduction", "introduction", "overview", "description"],
+            "uses_and_benefits": ["usesAndBenefits", "uses", "benefits", "indication"],
+            "side_effects": ["sideEffects", "adverseEffects", "adverseOutcome"],
+            "how_to_use": ["howToUse", "directionsForUse", "doseSchedule"],
+            "how_drug_works": ["howDrugWorks", "howItWorks", "mechanismOfAction"],
+            "safety_advice": ["safetyAdvice"],
+            "missed_dose": ["missedDose", "missedDoseAdvice"],
+            "quick_tips": ["quickTips", "expertAdvice"],
+            "fact_box": ["factBox"],
+            "interaction_with_drugs": ["drugInteractions", "interactingDrug"],
+            "patient_concerns": ["patientConcerns"],
+            "user_feedback": ["userFeedback"],
+        },
+        "labelled": {"safety_advice": WARNING_LABELS, "fact_box": FACT_LABELS},
+        "substitutes": ("all_substitutes", ["substitutes", "alternatives"], 10),
+        "max_faqs": 5,
+    },
+    "apollo": {
+        "text": {
+            "about_medicine": ["aboutMedicine", "overview", "description"],
+            "side_effects": ["sideEffects", "adverseOutcome"],
+            "uses_and_benefits": ["usesAndBenefits", "uses", "indication"],
+            "directions_for_use": ["directionsForUse", "howToUse", "doseSchedule"],
+            "how_it_works": ["howItWorks", "mechanismOfAction"],
+            "storage": ["storage", "storageRequirements"],
+            "overdose": ["overdose", "overdosage"],
+            "drug_warnings": ["drugWarnings", "contraindication", "warning"],
+            "drug_interactions": ["drugInteractions", "interactingDrug"],
+            "diet_and_lifestyle": ["dietAndLifestyle", "foodWarning"],
+            "therapeutic": ["therapeuticClass", "drugClass"],
+        },
+        "labelled": {"safety_advice": WARNING_LABELS},
+        "substitutes": ("product_substitutes", ["substitutes", "alternatives"], 15),
+        "max_faqs": 8,
+    },
+    "truemeds": {
+        "text": {
+            "uses": ["uses", "indication", "description"],
+            "directions_for_use": ["directionsForUse", "howToUse"],
+            "route_of_administration": ["routeOfAdministration", "administrationRoute"],
+            "side_effects": ["sideEffects", "adverseOutcome"],
+            "medicine_activity": ["medicineActivity", "howItWorks", "mechanismOfAction"],
+            "precautions_and_warnings": ["precautionsAndWarnings", "precautions", "warning"],
+            "interactions": ["interactions", "drugInteractions", "interactingDrug"],
+            "dosage_information": ["dosageInformation", "dosage", "doseSchedule"],
+            "storage": ["storage", "storageRequirements"],
+            "diet_and_lifestyle_guidance": ["dietAndLifestyle", "foodWarning"],
+            "fact_box": ["factBox"],
+        },
+        "labelled": {"fact_box": FACT_LABELS},
+        "substitutes": None,
+        "max_faqs": 6,
+    },
+}
+
+
+def _normalize(key):
+    return key.lower().replace("_", "").replace("-", "")
+
+
+def _schema_keys(schema):
+    keys = [key for keys in schema["text"].values() for key in keys]
+    keys += [key for labels in schema["labelled"].values() for key, _ in labels]
+    if schema["substitutes"]:
+        keys += schema["substitutes"][1]
+    return frozenset(map(_normalize, keys))
+
+
+# Normalized keys worth keeping while walking a payload, per site
+_WANTED_KEYS = {site: _schema_keys(schema) for site, schema in SITE_SCHEMAS.items()}
+
+
+# ---------- Payloads ----------
+
+def find_payloads(soup):
+    """Parses the page's JSON-LD scripts and ``__NEXT_DATA__`` blob.
+
+    JSON-LD comes first: it is written for search engines and describes the
+    product itself, while the Next.js blob also carries site-wide state.
+    Scripts that don't parse are skipped.
+    """
+    json_ld, next_data = [], []
+    for node in soup.descendants:
+        if not isinstance(node, Tag) or node.name != "script":
+            continue
+        if node.get("type") == JSON_LD_TYPE:
+            found = json_ld
+        elif node.get("id") == NEXT_DATA_ID:
+            found = next_data
+        else:
+            continue
+        text = (node.string or "").strip()
+        if not text:
+            continue
+        try:
+            found.append(json.loads(text, strict=False))
+        except ValueError:
+            continue
+    return json_ld + next_data
+
+
+def _type(node):
+    """A JSON-LD node's @type (the first one if it lists several)."""
+    kind = node.get("@type")
+    if isinstance(kind, list):
+        kind = kind[0] if kind else None
+    return kind if isinstance(kind, str) else None
+
+
+def _has_value(value):
+    return value not in (None, "", [], {})
+
+
+def _question(node):
+    """Returns a {"q", "a"} pair if node is a FAQ entry, else None."""
+    if _type(node) == "Question":
+        question, answer = _text(node.get("name")), _text(node.get("acceptedAnswer"))
+    else:
+        question, answer = node.get("question"), node.get("answer")
+        if not isinstance(question, str) or not isinstance(answer, (str, dict)):
+            return None
+        question, answer = _text(question), _text(answer)
+    if question and answer:
+        return {"q": question, "a": answer}
+    return None
+
+
+# ---------- Product Node ----------
+
+def _tokens(name):
+    return _NAME_TOKEN.findall(name.casefold())
+
+
+def _name_score(tokens, candidate):
+    """How many of the page name's tokens a node's name shares (0 unless the first
+    word matches); "650" matches "650mg" so strengths written either way agree."""
+    other = _tokens(candidate)
+    if not tokens or not other or tokens[0] != other[0]:
+        return 0
+    return sum(1 for token in tokens if any(word.startswith(token) or token.startswith(word)
+                                            for word in other))
+
+
+def _node_name(node, keys=NAME_KEYS):
+    for key in keys:
+        value = node.get(key)
+        if isinstance(value, str) and value.strip():
+            return value
+    return None
+
+
+def page_name(soup):
+    """The product name a page shows: its first ``<h1>``, else its ``og:title``."""
+    h1 = soup.find("h1")
+    if h1 is not None and h1.get_text(strip=True):
+        return h1.get_text(" ", strip=True)
+    meta = soup.find("meta", attrs={"property": "og:title"})
+    return meta.get("content") if meta is not None else None
+
+
+def _top_level(payload):
+    """A JSON-LD script's own nodes: the root, list items and ``@graph`` members."""
+    nodes = payload if isinstance(payload, list) else [payload]
+    for node in nodes:
+        if isinstance(node, dict):
+            yield node
+            graph = node.get("@graph")
+            if isinstance(graph, list):
+                yield from (item for item in graph if isinstance(item, dict))
+
+
+def find_product(payloads, name, wanted=frozenset()):
+    """Returns the payload node describing the page's product, or None.
+
+    Of the nodes whose name shares the page name's first word, the one
+    sharing most of it wins. Ties go to nodes marked as products (a JSON-LD
+    product type or a product-name key, so a product record beats an SEO
+    block of the same name), then to the one holding more ``wanted`` keys,
+    then to the shallower one. Without a match the first top-level JSON-LD node typed
+    as a product is used.
+    """
+    tokens = _tokens(name) if name else []
+    best, best_score = None, (0, False, 0)
+    if tokens:
+        queue = collections.deque(payloads)
+        while queue:  # Breadth first, so ties go to the shallower node
+            node = queue.popleft()
+            if isinstance(node, list):
+                queue.extend(node)
+                continue
+            if not isinstance(node, dict) or _type(node) in SKIPPED_TYPES:
+                continue
+            candidate = _node_name(node)
+            score = (_name_score(tokens, candidate) if candidate else 0,
+                     _type(node) in PRODUCT_TYPES or any(key.lower() in PRODUCT_NAME_KEYS
+                                                         for key in node),
+                     sum(1 for key in node if _normalize(key) in wanted))
+            if score[0] and score > best_score:
+                best, best_score = node, score
+            queue.extend(value for value in node.values() if isinstance(value, (dict, list)))
+    if best is not None:
+        return best
+
+    for payload in payloads:
+        for node in _top_level(payload):
+            if _type(node) in PRODUCT_TYPES:
+                return node
+    return None
+
+
+def _faq_pages(payloads):
+    """Top-level JSON-LD ``FAQPage`` nodes: product FAQs that sit beside the product node."""
+    return [node for payload in payloads for node in _top_level(payload)
+            if _type(node) == "FAQPage"]
+
+
+def _other_product(node, tokens):
+    """True for a nested node that describes a different product (a related-product card)."""
+    if _type(node) in PRODUCT_TYPES:
+        return True
+    candidate = _node_name(node, [key for key in node if key.lower() in PRODUCT_NAME_KEYS])
+    return candidate is not None and not _name_score(tokens, candidate)
+
+
+def _collect(root, wanted, tokens=()):
+    """Walks the product node in document order.
+
+    Returns ``(values, faqs)``: the first non-empty value of every wanted key
+    (by normalized name) and every FAQ entry found. Nested nodes describing
+    other products are skipped.
+    """
+    values, faqs = {}, []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict) or _type(node) in SKIPPED_TYPES:
+            continue
+        if node is not root and _other_product(node, tokens):
+            continue
+        faq = _question(node)
+        if faq is not None:
+            faqs.append(faq)
+            continue
+        children = []
+        for key, value in node.items():
+            name = _normalize(key)
+            if name in wanted and name not in values and _has_value(value):
+                values[name] = value
+            if isinstance(value, (dict, list)):
+                children.append(value)
+        stack.extend(reversed(children))
+    return values, faqs
+
+
+# ---------- Values ----------
+
+def _text(value):
+    """Flattens a JSON value into display text; None if it holds none."""
+    if isinstance(value, str):
+        text = html.unescape(value)
+        if "<" in text:  # Rich-text fields carry HTML markup
+            text = make_soup(text).get_text(" ", strip=True)
+        return " ".join(text.split()) or None
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        for key in ("text", "name", "description", "value"):
+            text = _text(value.get(key))
+            if text:
+                return text
+        return None
+    if isinstance(value, list):
+        return " | ".join(filter(None, map(_text, value))) or None
+    return None
+
+
+def _names(value, limit):
+    """Product names from a substitutes list, deduplicated, in order."""
+    names = []
+    for item in value if isinstance(value, list) else [value]:
+        if isinstance(item, dict):
+            item = item.get("name") or item.get("productName")
+        name = _text(item) if isinstance(item, str) else None
+        if name and len(name) < 100 and name not in names:
+            names.append(name)
+    return names[:limit]
+
+
+def extract_structured(site, soup, name=None):
+    """Returns the fields of ``site``'s record that the product node of the
+    page's embedded JSON provides; fields it doesn't provide are left out.
+
+    ``name`` is the product's name, by default the page's (``page_name``).
+    """
+    payloads = find_payloads(soup)
+    if not payloads:
+        return {}
+    name = name or page_name(soup)
+    product = find_product(payloads, name, _WANTED_KEYS[site])
+    if product is None:
+        return {}
+    schema = SITE_SCHEMAS[site]
+    tokens = _tokens(name) if name else []
+    values, faqs = _collect(product, _WANTED_KEYS[site], tokens)
+    if not faqs:
+        for faq_page in _faq_pages(payloads):
+            faqs += _collect(faq_page, frozenset(), tokens)[1]
+
+    def lookup(key):
+        return values.get(_normalize(key))
+
+    data = {}
+    for field, keys in schema["text"].items():
+        for key in keys:
+            text = _text(lookup(key))
+            if text:
+                data[field] = text
+                break
+
+    # Labelled fields are assembled from schema.org properties when the site's
+    # own payload has no ready-made text for them
+    for field, labels in schema["labelled"].items():
+        if field in data:
+            continue
+        parts = []
+        for key, label in labels:
+            text = _text(lookup(key))
+            if text:
+                parts.append(f"{label}: {text}")
+        if parts:
+            data[field] = " | ".join(parts)
+
+    if schema["substitutes"]:
+        field, keys, limit = schema["substitutes"]
+        for key in keys:
+            names = _names(lookup(key) or [], limit)
+            if names:
+                data[field] = names
+                break
+
+    if faqs:
+        data["faqs"] = faqs[:schema["max_faqs"]]
+    return data
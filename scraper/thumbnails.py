@@ -0,0 +1,229 @@
+"""Local thumbnails of product images for the Streamlit gallery.
+
+Showing a product's photos by their remote URLs makes every browser fetch
+the full-size images from three different CDNs on every render, and one slow
+CDN stalls the page. ``thumbnails(urls)`` downloads the images concurrently
+once, shrinks each to a small WebP thumbnail (Pillow) and keeps it on disk:
+
+* thumbnail files are named by the SHA-256 of the original image, so the
+  same photo served under different URLs (or by different sites) is stored
+  once;
+* a SQLite table maps each image URL to its content hash; URLs whose image
+  could not be downloaded or decoded are remembered for FAILED_TTL, so a
+  broken image isn't retried on every lookup;
+* the thumbnails are bounded to MAX_BYTES in total, least recently used
+  evicted first.
+
+Pillow ships with Streamlit. Without it ``thumbnails`` returns None for every
+URL and callers show the remote images instead.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from scraper.aio import coalesce, fetch_async, run_blocking, run_parse, run_sync
+from scraper.settings import data_path
+
+try:
+    from PIL import Image
+except ImportError:  # Optional: the gallery falls back to the remote URLs
+    Image = None
+
+# ---------- Defaults ----------
+THUMBNAIL_SIZE = (320, 320)  # Bounding box; the aspect ratio is kept
+THUMBNAIL_QUALITY = 80
+IMAGE_TIMEOUT = 5  # The gallery isn't worth waiting longer for
+FAILED_TTL = 3600
+MAX_BYTES = 64 * 1024 * 1024
+IMAGE_HEADERS = {"Accept": "image/webp,image/*;q=0.8"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    url TEXT PRIMARY KEY,
+    digest TEXT,
+    checked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS images_digest ON images (digest);
+CREATE TABLE IF NOT EXISTS thumbnails (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS thumbnails_accessed ON thumbnails (accessed_at);
+"""
+
+# Returned by ThumbnailCache.lookup() for a URL it knows nothing about
+MISS = object()
+
+
+def make_thumbnail(body, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Returns ``(digest, webp_bytes)`` for an image body; raises ValueError if it isn't one."""
+    digest = hashlib.sha256(body).hexdigest()
+    try:
+        with Image.open(io.BytesIO(body)) as image:
+            image.draft("RGB", size)  # JPEGs decode straight at a reduced scale
+            image.thumbnail(size)
+            if image.mode not in ("RGB", "RGBA"):
+                alpha = "A" in image.getbands() or "transparency" in image.info
+                image = image.convert("RGBA" if alpha else "RGB")
+            out = io.BytesIO()
+            image.save(out, "WEBP", quality=quality)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Not a usable image: {e}") from e
+    return digest, out.getvalue()
+
+
+class ThumbnailCache:
+    """Thumbnail files by content hash, plus a SQLite map from image URL to hash."""
+
+    def __init__(self, path=None, directory=None, max_bytes=MAX_BYTES, failed_ttl=FAILED_TTL):
+        self.path = path or data_path("thumbnails.sqlite")
+        self.directory = directory or data_path("thumbnails")
+        self.max_bytes = max_bytes
+        self.failed_ttl = failed_ttl
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(_SCHEMA)
+
+    def file_for(self, digest):
+        return os.path.join(self.directory, f"{digest}.webp")
+
+    def lookup(self, url):
+        """Returns the thumbnail path for an image URL, None for a known failure, or MISS."""
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT images.digest, images.checked_at, thumbnails.digest FROM images "
+                "LEFT JOIN thumbnails ON thumbnails.digest = images.digest WHERE url = ?",
+                (url,)).fetchone()
+            if row is None:
+                return MISS
+            digest, checked_at, stored = row
+            if digest is None:
+                return None if now - checked_at < self.failed_ttl else MISS
+            if stored is None:  # Evicted
+                return MISS
+            self._db.execute("UPDATE thumbnails SET accessed_at = ? WHERE digest = ?", (now, digest))
+            self._db.commit()
+        path = self.file_for(digest)
+        return path if os.path.exists(path) else MISS
+
+    def store(self, url, digest, thumbnail):
+        """Stores an image's thumbnail (unless its content is known) and maps url to it."""
+        path = self.file_for(digest)
+        if not os.path.exists(path):
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, "wb") as f:
+                f.write(thumbnail)
+            os.replace(partial, path)  # Readers never see half a file
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO images VALUES (?, ?, ?)", (url, digest, now))
+            self._db.execute(
+                "INSERT INTO thumbnails VALUES (?, ?, ?) "
+                "ON CONFLICT (digest) DO UPDATE SET accessed_at = excluded.accessed_at",
+                (digest, len(thumbnail), now))
+            self._evict()
+            self._db.commit()
+        return path
+
+    def fail(self, url):
+        """Remembers that an image URL could not be turned into a thumbnail."""
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO images VALUES (?, NULL, ?)", (url, time.time()))
+            self._db.commit()
+
+    def _evict(self):
+        """Drops least recently used thumbnails until they fit in max_bytes."""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._db.execute("SELECT digest, size FROM thumbnails ORDER BY accessed_at").fetchall()
+        for digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+            self._db.execute("DELETE FROM images WHERE digest = ?", (digest,))
+            try:
+                os.remove(self.file_for(digest))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        with self._lock:
+            digests = [digest for digest, in self._db.execute("SELECT digest FROM thumbnails")]
+            self._db.execute("DELETE FROM images")
+            self._db.execute("DELETE FROM thumbnails")
+            self._db.commit()
+        for digest in digests:
+            try:
+                os.remove(self.file_for(digest))
+            except FileNotFoundError:
+                pass
+
+
+# ---------- Thumbnails ----------
+
+@coalesce(lambda url, cache: url)
+async def _thumbnail_async(url, cache):
+    path = await run_blocking(cache.lookup, url)
+    if path is not MISS:
+        return path
+    try:
+        r = await fetch_async(url, timeout=IMAGE_TIMEOUT, use_cache=False, headers=IMAGE_HEADERS)
+        r.raise_for_status()
+        digest, thumbnail = await run_parse(make_thumbnail, r.content)
+    except (requests.exceptions.RequestException, ValueError):
+        await run_blocking(cache.fail, url)
+        return None
+    return await run_blocking(cache.store, url, digest, thumbnail)
+
+
+async def thumbnails_async(urls, cache=None):
+    """Returns the local thumbnail path of every image URL (None where there is none).
+
+    Missing thumbnails are downloaded and made concurrently.
+    """
+    cache = cache or get_thumbnails()
+    if cache is None:
+        return [None] * len(urls)
+    return list(await asyncio.gather(*(_thumbnail_async(url, cache) for url in urls)))
+
+
+def thumbnails(urls, cache=None):
+    """Blocking ``thumbnails_async``."""
+    return run_sync(thumbnails_async(urls, cache))
+
+
+_thumbnails = None
+_thumbnails_enabled = Image is not None
+_thumbnails_lock = threading.Lock()
+
+
+def get_thumbnails():
+    """Returns the shared thumbnail cache, or None when thumbnails are disabled."""
+    global _thumbnails
+    if not _thumbnails_enabled:
+        return None
+    if _thumbnails is None:
+        with _thumbnails_lock:
+            if _thumbnails is None:
+                _thumbnails = ThumbnailCache()
+    return _thumbnails
+
+
+def set_thumbnails(cache):
+    """Installs a thumbnail cache for all lookups; pass None to disable thumbnails."""
+    global _thumbnails, _thumbnails_enabled
+    with _thumbnails_lock:
+        _thumbnails = cache
+        _thumbnails_enabled = cache is not None
@@ -0,0 +1,401 @@
+"""Spans and metrics for the scraping hot paths.
+
+A slow lookup can spend its time waiting for a connection, downloading,
+parsing or in one keyword loop of an extractor. The hot paths are wrapped in
+spans:
+
+* ``span(name, **attributes)`` times a block and makes it the parent of
+  spans opened inside it, across ``await``, the scraper's executors and the
+  sync wrappers of ``scraper.aio``;
+* ``@staged(name)`` plus ``stage(step)`` time consecutive steps of one
+  function (the extractor stages) without re-indenting it.
+
+Every finished span feeds the ``scraper_span_seconds`` histogram. Spans are
+only kept while a ``trace()`` is active, which is how the Streamlit timing
+panel and ``python -m scraper.tracing`` collect one lookup's spans. A trace
+exports as OpenTelemetry (OTLP/JSON) spans; counters and histograms export
+in the Prometheus text format:
+
+    python -m scraper.tracing "dolo 650" --otlp trace.json --prometheus metrics.prom
+
+Everything here is standard library, so it is always on; a span costs about
+ten microseconds, against milliseconds for the work it times.
+"""
+import argparse
+import contextlib
+import contextvars
+import functools
+import json
+import random
+import sys
+import threading
+import time
+
+SERVICE_NAME = "medicine-scraper"
+
+# Help text and type of every metric, in export order
+METRICS = {
+    "scraper_span_seconds": ("histogram", "Duration of traced stages"),
+    "scraper_probes_total": ("counter", "Candidate URLs probed, by search function and outcome"),
+    "scraper_cache_lookups_total": ("counter", "Response cache lookups, by result"),
+    "scraper_catalog_lookups_total": ("counter", "Product catalog lookups, by result"),
+    "scraper_search_index_lookups_total": ("counter", "Search index lookups, by site and result"),
+    "scraper_http_responses_total": ("counter", "Network responses, by host and status"),
+    "scraper_downloaded_bytes_total": ("counter", "Body bytes read from the network, by host"),
+    "scraper_errors_total": ("counter", "Failures caught on the hot paths, by stage"),
+    "scraper_coalesced_total": ("counter", "Calls that joined an identical call in flight, by function"),
+}
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ---------- Metrics ----------
+
+def _labels(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+
+class Registry:
+    """Process-wide counters and histograms, keyed by metric name and label set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(BUCKETS) + 2)
+            for i, bound in enumerate(BUCKETS):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def counter(self, name, **labels):
+        """Current value of a counter, summed over the label sets that match ``labels``."""
+        wanted = set(_labels(labels))
+        with self._lock:
+            return sum(value for (metric, series), value in self._counters.items()
+                       if metric == name and wanted <= set(series))
+
+    def snapshot(self):
+        """Counters and histogram sums/counts as plain dicts, for display or JSON."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "sum": series[-2],
+                           "count": series[-1]}
+                          for (name, labels), series in sorted(self._histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus(self):
+        """Renders every metric in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, list(series)) for key, series in self._histograms.items())
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if kind == "counter":
+                lines += [f"{name}{_format_labels(labels)} {value}"
+                          for (metric, labels), value in counters if metric == name]
+                continue
+            for (metric, labels), series in histograms:
+                if metric != name:
+                    continue
+                for bound, count in zip(BUCKETS, series):
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', str(bound))])} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {series[-1]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {series[-2]:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {series[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+
+metrics = Registry()
+inc = metrics.inc
+
+
+# ---------- Spans ----------
+
+class Span:
+    """One timed operation; ``attributes`` may be added until it ends."""
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes")
+
+    def __init__(self, name, trace, parent_id, attributes):
+        self.name = name
+        self.trace = trace
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+
+    @property
+    def duration(self):
+        """Seconds from start to end (or to now, while the span is open)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def end(self):
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        metrics.observe("scraper_span_seconds", self.duration, span=self.name)
+        if self.trace is not None:
+            self.trace.spans.append(self)
+
+    def export(self):
+        """A picklable copy, for spans recorded in another process."""
+        return (self.name, self.span_id, self.parent_id, self.start_ns, self.end_ns, self.attributes)
+
+
+class Trace:
+    """The spans recorded under one ``trace()`` block."""
+
+    def __init__(self):
+        self.trace_id = random.getrandbits(128)
+        self.spans = []  # Finished spans, in the order they ended
+        self.root = None
+
+    def tree(self):
+        """Yields ``(depth, span)`` in start order, children under their parent."""
+        children = {}
+        for span in sorted(self.spans, key=lambda span: span.start_ns):
+            children.setdefault(span.parent_id, []).append(span)
+        stack = [(0, span) for span in reversed(children.get(None, []))]
+        while stack:
+            depth, span = stack.pop()
+            yield depth, span
+            stack += [(depth + 1, child) for child in reversed(children.get(span.span_id, []))]
+
+    def summary(self):
+        """Per span name: how often it ran and its total seconds, slowest first."""
+        totals = {}
+        for span in self.spans:
+            count, seconds = totals.get(span.name, (0, 0.0))
+            totals[span.name] = (count + 1, seconds + span.duration)
+        return sorted(((name, count, seconds) for name, (count, seconds) in totals.items()),
+                      key=lambda row: -row[2])
+
+    def stats(self):
+        """Fetch, cache and probe totals of this trace (the per-trace view of the counters)."""
+        stats = {"fetches": 0, "cache_hit": 0, "cache_revalidated": 0, "cache_miss": 0,
+                 "downloaded_bytes": 0, "probes": 0, "probe_hits": 0}
+        for span in self.spans:
+            if span.name == "fetch":
+                stats["fetches"] += 1
+                cache = span.attributes.get("cache")
+                if cache:
+                    stats["cache_" + cache] += 1
+            elif span.name == "http.download":
+                stats["downloaded_bytes"] += span.attributes.get("bytes", 0)
+            elif span.name == "probe":
+                stats["probes"] += 1
+                stats["probe_hits"] += span.attributes.get("outcome") == "hit"
+        lookups = stats["cache_hit"] + stats["cache_revalidated"] + stats["cache_miss"]
+        stats["cache_hit_ratio"] = (stats["cache_hit"] + stats["cache_revalidated"]) / lookups if lookups else None
+        return stats
+
+    def format(self, min_ms=0.0):
+        """Renders the span tree as indented text with durations in milliseconds."""
+        lines = []
+        for depth, span in self.tree():
+            ms = span.duration * 1000
+            if ms < min_ms and depth:
+                continue
+            attributes = " ".join(f"{key}={value}" for key, value in span.attributes.items())
+            lines.append(f"{ms:9.1f} ms  {'  ' * depth}{span.name} {attributes}".rstrip())
+        return "\n".join(lines)
+
+    def to_otlp(self):
+        """The trace as an OTLP/JSON ``ExportTraceServiceRequest``."""
+        def value(v):
+            if isinstance(v, bool):
+                return {"boolValue": v}
+            if isinstance(v, int):
+                return {"intValue": str(v)}
+            if isinstance(v, float):
+                return {"doubleValue": v}
+            return {"stringValue": str(v)}
+
+        spans = []
+        for span in self.spans:
+            entry = {
+                "traceId": f"{self.trace_id:032x}",
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": k, "value": value(v)} for k, v in span.attributes.items()],
+            }
+            if span.parent_id is not None:
+                entry["parentSpanId"] = f"{span.parent_id:016x}"
+            spans.append(entry)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name",
+                                         "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "scraper"}, "spans": spans}],
+        }]}
+
+
+_current = contextvars.ContextVar("scraper_span", default=None)
+_stages = contextvars.ContextVar("scraper_stages", default=None)
+
+
+def current_span():
+    """The innermost open span of this context, or None."""
+    return _current.get()
+
+
+def start_span(name, **attributes):
+    """Opens a child of the current span without making it current; call ``end()``."""
+    parent = _current.get()
+    if parent is None:
+        return Span(name, None, None, attributes)
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+@contextlib.contextmanager
+def span(name, **attributes):
+    """Times a block as a span that is the parent of the spans opened inside it."""
+    current = start_span(name, **attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes.setdefault("error", type(e).__name__)
+        raise
+    finally:
+        _current.reset(token)
+        current.end()
+
+
+@contextlib.contextmanager
+def trace(name, **attributes):
+    """Records every span opened inside the block; yields the ``Trace``."""
+    recording = Trace()
+    root = Span(name, recording, None, attributes)
+    recording.root = root
+    token = _current.set(root)
+    try:
+        yield recording
+    finally:
+        _current.reset(token)
+        root.end()
+
+
+def adopt(exported):
+    """Adds spans exported by another process's ``trace()`` to the current trace.
+
+    The other trace's root is dropped and its children are re-parented under
+    the current span. Every span also feeds this process's histograms.
+    """
+    parent = _current.get()
+    roots = {span_id for _, span_id, parent_id, _, _, _ in exported if parent_id is None}
+    for name, span_id, parent_id, start_ns, end_ns, attributes in exported:
+        if parent_id is None:
+            continue
+        metrics.observe("scraper_span_seconds", (end_ns - start_ns) / 1e9, span=name)
+        if parent is None or parent.trace is None:
+            continue
+        span = Span(name, parent.trace, parent.span_id if parent_id in roots else parent_id,
+                    attributes)
+        span.span_id, span.start_ns, span.end_ns = span_id, start_ns, end_ns
+        parent.trace.spans.append(span)
+
+
+class _Stages:
+    """The step spans of one ``@staged`` call; the open step is the current span."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+        self.open = None
+        self._token = None
+
+    def next(self, step):
+        self.end()
+        self.open = start_span(f"{self.prefix}.{step}")
+        self._token = _current.set(self.open)
+
+    def end(self):
+        if self.open is not None:
+            _current.reset(self._token)
+            self.open.end()
+            self.open = None
+
+
+def staged(name):
+    """Decorates a function whose steps are marked with ``stage()`` calls.
+
+    The call is a span named ``name``; each ``stage(step)`` ends the previous
+    step and starts a child span ``name.step`` that lasts until the next
+    ``stage()`` or the function's return. Spans opened during a step nest
+    under it.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            stages = _Stages(name)
+            token = _stages.set(stages)
+            try:
+                with span(name):
+                    try:
+                        return fn(*args, **kwargs)
+                    finally:
+                        stages.end()
+            finally:
+                _stages.reset(token)
+        return wrapper
+    return decorator
+
+
+def stage(step):
+    """Starts the next step of the enclosing ``@staged`` function (no-op outside one)."""
+    stages = _stages.get()
+    if stages is not None:
+        stages.next(step)
+
+
+if __name__ == "__main__":
+    from scraper.pipeline import lookup
+
+    parser = argparse.ArgumentParser(description="Trace one medicine lookup.")
+    parser.add_argument("name", help="Medicine name to look up")
+    parser.add_argument("--otlp", help="Write the trace as OTLP/JSON to this file")
+    parser.add_argument("--prometheus", help="Write the metrics in Prometheus text format to this file")
+    parser.add_argument("--min-ms", type=float, default=0.0, help="Hide spans shorter than this")
+    args = parser.parse_args()
+
+    with trace("lookup", query=args.name) as recorded:
+        record = lookup(args.name)
+    print(recorded.format(args.min_ms))
+    print(f"Found: {', '.join(record['results']) or 'nothing'}", file=sys.stderr)
+    if args.otlp:
+        with open(args.otlp, "w", encoding="utf-8") as f:
+            json.dump(recorded.to_otlp(), f, indent=2)
+    if args.prometheus:
+        with open(args.prometheus, "w", encoding="utf-8") as f:
+            f.write(metrics.prometheus())
@@ -0,0 +1,74 @@
+"""Shared fixtures: a local HTTP server whose responses each test scripts."""
+import http.server
+import threading
+
+import pytest
+
+
+class StubServer:
+    """Threaded HTTP/1.1 server on localhost that counts connections and requests.
+
+    ``respond(path, headers)`` returns ``(status, headers, body)`` for each
+    GET; the default answers 200 with a small HTML page.
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda path, headers: (200, {}, b"<html><h1>ok</h1></html>"))
+        self.connections = 0
+        self.requests = []  # (path, request headers) per GET
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+
+            def setup(self):
+                super().setup()
+                with stub._lock:
+                    stub.connections += 1
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                status, headers, body = stub.respond(self.path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True  # The client stopped reading (a scan decided)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,),
+                                        daemon=True)
+        self._thread.start()
+
+    def url(self, path="/"):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}{path}"
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """Returns a factory for StubServers, all shut down after the test."""
+    servers = []
+
+    def make(respond=None):
+        server = StubServer(respond)
+        servers.append(server)
+        return server
+
+    yield make
+    for server in servers:
+        server.close()
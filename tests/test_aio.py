@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+import requests
+
+from scraper import aio, http_cache, rate_limiter
+from scraper.aio import fetch_async, run_sync
+from scraper.http_client import MAX_RESPONSE_BYTES, ResponseTooLarge
+
+needs_httpx = pytest.mark.skipif(aio.httpx is None, reason="httpx is not installed")
+
+
+@pytest.fixture
+def no_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiter_enabled", False)
+    monkeypatch.setattr(http_cache, "_cache_enabled", False)
+
+
+@needs_httpx
+def test_httpx_responses_convert_to_requests_responses(stub_server, no_limiter):
+    server = stub_server(lambda path, headers: (
+        200, {"Content-Type": "text/html; charset=iso-8859-1", "ETag": '"v1"'}, "caf\xe9".encode("latin-1")))
+    r = run_sync(fetch_async(server.url("/page"), headers={"X-Probe": "1"}))
+    assert isinstance(r, requests.Response)
+    assert (r.status_code, r.reason, r.url) == (200, "OK", server.url("/page"))
+    assert r.headers["etag"] == '"v1"'
+    assert r.encoding == "iso-8859-1"
+    assert r.text == "caf\xe9"
+    assert server.requests[0][1]["X-Probe"] == "1"
+
+
+@needs_httpx
+def test_httpx_5xx_responses_are_retried(stub_server, no_limiter, monkeypatch):
+    monkeypatch.setattr(aio, "BACKOFF_FACTOR", 0)
+    statuses = iter([502, 500, 200])
+    server = stub_server(lambda path, headers: (next(statuses), {}, b"body"))
+    r = run_sync(fetch_async(server.url()))
+    assert (r.status_code, r.content) == (200, b"body")
+    assert len(server.requests) == 3
+
+
+@needs_httpx
+def test_httpx_last_5xx_is_returned_once_retries_run_out(stub_server, no_limiter, monkeypatch):
+    monkeypatch.setattr(aio, "BACKOFF_FACTOR", 0)
+    server = stub_server(lambda path, headers: (500, {}, b"down"))
+    assert run_sync(fetch_async(server.url())).status_code == 500
+    assert len(server.requests) == aio.RETRIES + 1
+
+
+@needs_httpx
+def test_httpx_bodies_over_the_cap_raise(stub_server, no_limiter):
+    server = stub_server(lambda path, headers: (200, {}, b"x" * (MAX_RESPONSE_BYTES + 1)))
+    with pytest.raises(ResponseTooLarge):
+        run_sync(fetch_async(server.url()))
+
+
+@needs_httpx
+def test_httpx_scan_stops_reading_and_marks_truncated(stub_server, no_limiter):
+    body = b"<html>" + b"<p>row</p>" * 20000 + b"</html>"
+    server = stub_server(lambda path, headers: (200, {}, body))
+    chunks = []
+
+    def consume(chunk):
+        chunks.append(chunk)
+        return True
+
+    r = run_sync(fetch_async(server.url(), consume=consume))
+    assert len(chunks) == 1
+    assert r.truncated
+    assert r.content == chunks[0] and len(r.content) < len(body)
+
+
+@needs_httpx
+def test_httpx_scan_reads_non_200_bodies_whole(stub_server, no_limiter):
+    server = stub_server(lambda path, headers: (404, {}, b"not here"))
+    r = run_sync(fetch_async(server.url(), consume=lambda chunk: True))
+    assert (r.status_code, r.content) == (404, b"not here")
+    assert not getattr(r, "truncated", False)
+
+
+def counted(fn_body):
+    """A coalesced coroutine function keyed on its argument, counting the calls that run."""
+    calls = []
+
+    @aio.coalesce(lambda name: name.lower())
+    async def lookup(name):
+        calls.append(name)
+        return await fn_body(name)
+    return lookup, calls
+
+
+def test_coalesced_callers_share_one_call():
+    async def main():
+        release = asyncio.Event()
+
+        async def body(name):
+            await release.wait()
+            return {"name": name}
+
+        lookup, calls = counted(body)
+        tasks = [asyncio.ensure_future(lookup(name)) for name in ["Dolo", "dolo", "DOLO"]]
+        other = asyncio.ensure_future(lookup("crocin"))
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        assert results[0] is results[1] is results[2]
+        assert (await other) == {"name": "crocin"}
+        await lookup("dolo")  # A finished call is forgotten
+        return calls
+
+    assert run_sync(main()) == ["Dolo", "crocin", "dolo"]
+
+
+def test_coalesced_exception_reaches_every_caller():
+    async def main():
+        release = asyncio.Event()
+
+        async def body(name):
+            await release.wait()
+            raise ValueError(name)
+
+        lookup, calls = counted(body)
+        tasks = [asyncio.ensure_future(lookup("dolo")) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        return results, calls
+
+    results, calls = run_sync(main())
+    assert calls == ["dolo"]
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def test_cancelled_caller_leaves_the_shared_call_running():
+    async def main():
+        release = asyncio.Event()
+        cancelled = []
+
+        async def body(name):
+            try:
+                await release.wait()
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+            return name
+
+        lookup, calls = counted(body)
+        first, second, third = [asyncio.ensure_future(lookup("dolo")) for _ in range(3)]
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await asyncio.gather(second, third) == ["dolo", "dolo"]
+        assert first.cancelled()
+
+        # Once every caller has given up, the shared call is cancelled too
+        release.clear()
+        tasks = [asyncio.ensure_future(lookup("crocin")) for _ in range(2)]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+        return calls, cancelled
+
+    assert run_sync(main()) == (["dolo", "crocin"], ["crocin"])
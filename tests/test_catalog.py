@@ -0,0 +1,121 @@
+import time
+
+import pytest
+
+from scraper import catalog as catalog_module
+from scraper.catalog import Catalog, ingredient_keys
+
+
+def record(slug, name, composition, manufacturer, uses="Used for fever and pain."):
+    return {
+        "url": f"https://www.1mg.com/drugs/{slug}",
+        "medicine_name": name,
+        "product_images": [],
+        "details": {
+            "overview": uses,
+            "fact_box": f"Composition: {composition} | Manufacturer: {manufacturer}",
+            "side_effects": "Common side effects include nausea and drowsiness.",
+        },
+    }
+
+
+DOLO = record("dolo-650", "Dolo 650 Tablet", "Paracetamol (650mg)", "Micro Labs Ltd")
+DOLO_500 = record("dolo-500", "Dolo 500 Tablet", "Paracetamol (500mg)", "Micro Labs Ltd")
+AUGMENTIN = record("augmentin-625", "Augmentin 625 Duo Tablet",
+                   "Amoxycillin (500mg) + Clavulanic Acid (125mg)", "GlaxoSmithKline Pharmaceuticals Ltd",
+                   uses="Treats bacterial infections of the ear, nose and throat.")
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = Catalog(path=str(tmp_path / "catalog.sqlite"), ttl=3600)
+    for product in (DOLO, DOLO_500, AUGMENTIN):
+        assert catalog.add(product)
+    return catalog
+
+
+def names(records):
+    return sorted(record["medicine_name"] for record in records)
+
+
+def test_error_and_unknown_site_records_are_not_added(catalog):
+    assert not catalog.add({"url": DOLO["url"], "error": "timeout"})
+    assert not catalog.add({"url": "https://example.com/x", "medicine_name": "X"})
+    assert not catalog.add({"medicine_name": "No URL"})
+    assert len(catalog) == 3
+
+
+def test_add_replaces_a_url_and_its_indexes(catalog):
+    renamed = dict(DOLO, medicine_name="Dolo 650mg Strip",
+                   details=dict(DOLO["details"], fact_box="Composition: Ibuprofen (400mg)"))
+    catalog.add(renamed)
+    assert len(catalog) == 3
+    assert catalog.get(DOLO["url"])["medicine_name"] == "Dolo 650mg Strip"
+    assert names(catalog.containing("ibuprofen")) == ["Dolo 650mg Strip"]
+    assert names(catalog.containing("paracetamol")) == ["Dolo 500 Tablet"]
+    assert names(catalog.search("ibuprofen")) == ["Dolo 650mg Strip"]
+
+
+def test_find_matches_leading_words_and_strengths(catalog):
+    assert names(catalog.find("dolo")) == ["Dolo 500 Tablet", "Dolo 650 Tablet"]
+    assert names(catalog.find("Dolo 650mg")) == ["Dolo 650 Tablet"]
+    assert catalog.find("dol") == []  # Whole words only
+    assert catalog.find("tablet") == []
+    assert catalog.find("  ") == []
+
+
+def test_containing_matches_ingredients(catalog):
+    assert names(catalog.containing("Paracetamol")) == ["Dolo 500 Tablet", "Dolo 650 Tablet"]
+    assert names(catalog.containing("clavulanic")) == ["Augmentin 625 Duo Tablet"]
+    assert names(catalog.containing("clavulanic acid")) == ["Augmentin 625 Duo Tablet"]
+    assert catalog.containing("acid") == []
+
+
+def test_ingredient_keys_drop_parenthesized_strengths():
+    assert ingredient_keys("Amoxycillin (500mg) + Clavulanic Acid (125mg)") == [
+        "amoxycillin", "clavulanic acid"]
+    assert ingredient_keys(None) == []
+
+
+def test_by_manufacturer_and_site_filter(catalog):
+    assert names(catalog.by_manufacturer("micro labs")) == ["Dolo 500 Tablet", "Dolo 650 Tablet"]
+    assert names(catalog.by_manufacturer("GlaxoSmithKline")) == ["Augmentin 625 Duo Tablet"]
+    assert catalog.by_manufacturer("micro", site="apollo") == []
+    assert len(catalog.by_manufacturer("micro", limit=1)) == 1
+
+
+def test_search_matches_full_text(catalog):
+    assert names(catalog.search("bacterial infections")) == ["Augmentin 625 Duo Tablet"]
+    assert names(catalog.search("drowsiness")) == ["Augmentin 625 Duo Tablet", "Dolo 500 Tablet",
+                                                   "Dolo 650 Tablet"]
+    assert catalog.search("nothing-like-this") == []
+
+
+@pytest.mark.parametrize("text", ['"unbalanced', "fever AND", "NEAR(", "name:dolo", "*", "a OR"])
+def test_search_input_is_never_fts_syntax(catalog, text):
+    assert isinstance(catalog.search(text), list)  # Quoted as words, so it never raises
+
+
+def test_unbalanced_quote_finds_nothing(catalog):
+    assert catalog.search('"unbalanced') == []
+
+
+def test_search_of_blank_or_quote_only_input_is_empty(catalog):
+    assert catalog.search("") == []
+    assert catalog.search('"') == []
+
+
+def test_fresh_respects_the_ttl(catalog, monkeypatch):
+    assert catalog.fresh(DOLO["url"]) == DOLO
+    now = time.time()
+    monkeypatch.setattr(catalog_module.time, "time", lambda: now + 3601)
+    assert catalog.fresh(DOLO["url"]) is None
+    assert catalog.get(DOLO["url"]) == DOLO  # Still stored
+    catalog.touch(DOLO["url"])
+    assert catalog.fresh(DOLO["url"]) == DOLO
+
+
+def test_clear(catalog):
+    catalog.clear()
+    assert len(catalog) == 0
+    assert catalog.find("dolo") == [] and catalog.search("fever") == []
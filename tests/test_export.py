@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from scraper import export
+from scraper.export import Exporter, export_file, next_part
+from scraper.records import MedicineRecord
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def record(name="Dolo 650", **fields):
+    return MedicineRecord(url="https://www.1mg.com/drugs/dolo-650", site="1mg", name=name, **fields)
+
+
+def test_next_part_skips_taken_paths_and_leftover_parts(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    assert next_part(path) == path
+    (tmp_path / "results.parquet").touch()
+    assert next_part(path) == str(tmp_path / "results.1.parquet")
+    (tmp_path / "results.1.parquet.part").touch()  # An interrupted run's rows
+    assert next_part(path) == str(tmp_path / "results.2.parquet")
+
+
+def test_parquet_rows_round_trip(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    with Exporter(path, row_group_size=2) as exporter:
+        for n in range(5):
+            exporter.write(record(f"Dolo {n}", images=("a.jpg",), faqs=(("q?", "a."),),
+                                  extra={"mrp": n}), query="dolo")
+        assert not (tmp_path / "results.parquet").exists()  # Only the .part until close()
+    table = pq.read_table(path)
+    assert pq.ParquetFile(path).num_row_groups == 3
+    rows = table.to_pylist()
+    assert [row["name"] for row in rows] == [f"Dolo {n}" for n in range(5)]
+    assert rows[0]["query"] == "dolo"
+    assert rows[0]["images"] == ["a.jpg"]
+    assert rows[0]["faqs"] == [{"q": "q?", "a": "a."}]
+    assert json.loads(rows[4]["extra"]) == {"mrp": 4}
+    assert not (tmp_path / "results.parquet.part").exists()
+
+
+def test_arrow_export(tmp_path):
+    path = str(tmp_path / "results.arrow")
+    with Exporter(path) as exporter:
+        exporter.write(record())
+    with pa.memory_map(path) as source:
+        assert pa.ipc.open_file(source).read_all().column("name").to_pylist() == ["Dolo 650"]
+
+
+def test_append_keeps_earlier_parquet_and_leftover_part(tmp_path):
+    path = str(tmp_path / "results.parquet")
+    with Exporter(path) as exporter:
+        exporter.write(record("first"))
+    (tmp_path / "results.1.parquet.part").write_bytes(b"interrupted")
+    with Exporter(path, append=True) as exporter:
+        exporter.write(record("second"))
+    assert exporter.path == str(tmp_path / "results.2.parquet")
+    assert pq.read_table(path).column("name").to_pylist() == ["first"]
+    assert pq.read_table(exporter.path).column("name").to_pylist() == ["second"]
+    assert (tmp_path / "results.1.parquet.part").read_bytes() == b"interrupted"
+
+
+def test_append_extends_jsonl(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    with Exporter(path) as exporter:
+        exporter.write(record("first"), query="a")
+    with Exporter(path, append=True) as exporter:
+        exporter.write(record("second"))
+    with open(path, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f]
+    assert [(row.get("query"), row["name"]) for row in rows] == [("a", "first"), (None, "second")]
+
+
+def test_export_file_skips_errors(tmp_path):
+    lines = [
+        json.dumps({"query": "dolo", "results": {"1mg": record().to_dict()}}),
+        json.dumps({"query": "nothing", "error": "not found"}),
+        "",
+        json.dumps(record("Crocin").to_dict()),
+    ]
+    path = str(tmp_path / "results.parquet")
+    with Exporter(path) as exporter:
+        assert export_file(lines, exporter) == 2
+    assert pq.read_table(path).column("query").to_pylist() == ["dolo", None]
+
+
+@pytest.mark.parametrize("name", ["results.parquet", "results.arrow"])
+def test_columnar_extension_without_pyarrow_is_an_error(tmp_path, monkeypatch, name):
+    monkeypatch.setattr(export, "pa", None)
+    with pytest.raises(RuntimeError, match="pyarrow"):
+        Exporter(str(tmp_path / name))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_extension_without_pyarrow_writes_jsonl(tmp_path, monkeypatch):
+    monkeypatch.setattr(export, "pa", None)
+    with Exporter(str(tmp_path / "results.out")) as exporter:
+        exporter.write(record())
+    assert exporter.format == "jsonl"
+    assert exporter.path == str(tmp_path / "results.jsonl")
@@ -0,0 +1,47 @@
+import glob
+import json
+import os
+
+import pytest
+
+from scraper.extractors import scrape_1mg, scrape_apollo
+from scraper.parsing import BACKENDS, make_soup, prune_page
+
+# Generated product pages, each next to the details the extractor returned
+# for it before its single-pass rewrite
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+
+def fixture_pages(site):
+    return sorted(glob.glob(os.path.join(PAGES, site, "*.html")))
+
+
+def expected(page):
+    with open(page[:-len(".html")] + ".json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse(page, backend):
+    with open(page, encoding="utf-8") as f:
+        return prune_page(make_soup(f.read(), backend=backend))
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("page", fixture_pages("1mg"), ids=os.path.basename)
+def test_scrape_1mg_matches_stored_details(page, backend):
+    assert scrape_1mg(parse(page, backend)) == expected(page)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("page", fixture_pages("apollo"), ids=os.path.basename)
+def test_scrape_apollo_matches_stored_details(page, backend):
+    assert scrape_apollo(parse(page, backend)) == expected(page)
+
+
+def test_apollo_safety_scan_skips_script_strings():
+    # A JSON script survives prune_page; its text used to be kept as advice verbatim
+    html = ('<html><head><script type="application/json">{"tip": "Avoid alcohol with it."}</script>'
+            "</head><body><h1>Dolo 650 Tablet</h1>"
+            "<p>Avoid alcohol while taking this medicine.</p></body></html>")
+    data = scrape_apollo(prune_page(make_soup(html)))
+    assert data["safety_advice"] == "Avoid alcohol while taking this medicine."
@@ -0,0 +1,62 @@
+import time
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from scraper.http_cache import ResponseCache
+
+
+def response(url, body=b"<html></html>", **headers):
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r.headers = CaseInsensitiveDict(headers)
+    r._content = body
+    return r
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(path=str(tmp_path / "cache.sqlite"), host_ttls={}, default_ttl=3600,
+                         max_bytes=1000)
+
+
+@pytest.mark.parametrize("cache_control", ["no-store", "private", "private, max-age=60"])
+def test_uncacheable_responses_are_not_stored(cache, cache_control):
+    cache.store("http://a/", response("http://a/", **{"Cache-Control": cache_control}))
+    assert cache.lookup("http://a/") is None
+
+
+def test_no_cache_responses_are_stored_stale_for_revalidation(cache):
+    cache.store("http://a/", response("http://a/", **{"Cache-Control": "no-cache", "ETag": '"v1"'}))
+    entry = cache.lookup("http://a/")
+    assert not entry.fresh
+    assert entry.validators() == {"If-None-Match": '"v1"'}
+    cache.store("http://b/", response("http://b/", **{"Cache-Control": "no-cache"}))
+    assert cache.lookup("http://b/") is None  # Nothing to revalidate it with
+
+
+def test_max_age_shortens_the_lifetime(cache):
+    cache.store("http://a/", response("http://a/", **{"Cache-Control": "public, max-age=60"}))
+    assert cache.lookup("http://a/").expires_at == pytest.approx(time.time() + 60, abs=2)
+    cache.store("http://b/", response("http://b/", **{"Cache-Control": "max-age=999999"}))
+    assert cache.lookup("http://b/").expires_at == pytest.approx(time.time() + 3600, abs=2)
+
+
+def test_hits_do_not_write(cache):
+    cache.store("http://a/", response("http://a/"))
+    writes = cache._db.total_changes
+    for _ in range(10):
+        assert cache.lookup("http://a/") is not None
+    assert cache._db.total_changes == writes
+
+
+def test_running_total_drives_lru_eviction(cache):
+    for name in "abcd":
+        cache.store(f"http://{name}/", response(f"http://{name}/", b"x" * 300))
+        time.sleep(0.01)
+    cache.store("http://b/", response("http://b/", b"x" * 100))  # Replacing frees bytes
+    assert cache._total == cache._stored_bytes() <= 1000
+    assert cache.lookup("http://a/") is None
+    assert [cache.lookup(f"http://{name}/") is not None for name in "bcd"] == [True, True, True]
@@ -0,0 +1,74 @@
+import gzip
+
+import pytest
+
+from scraper import http_client, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def session(monkeypatch):
+    """A fresh shared session per test, without the rate limiter in the way."""
+    monkeypatch.setattr(rate_limiter, "_limiter_enabled", False)
+    monkeypatch.setattr(http_client, "_session", None)
+    yield
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def test_repeated_fetches_reuse_the_pooled_connection(stub_server):
+    server = stub_server()
+    for i in range(5):
+        r = http_client.fetch(server.url(f"/page/{i}"), use_cache=False)
+        assert r.status_code == 200
+    assert len(server.requests) == 5
+    assert server.connections == 1
+
+
+def test_streamed_fetches_reuse_the_connection_once_read(stub_server):
+    server = stub_server()
+    for _ in range(3):
+        r = http_client.fetch(server.url(), use_cache=False, stream=True)
+        http_client.read_body(r)
+        assert r.content.startswith(b"<html>")
+    assert server.connections == 1
+
+
+def test_each_host_gets_its_own_pool(stub_server):
+    first, second = stub_server(), stub_server()
+    for _ in range(3):
+        http_client.fetch(first.url(), use_cache=False)
+        http_client.fetch(second.url(), use_cache=False)
+    assert (first.connections, second.connections) == (1, 1)
+
+
+def test_5xx_responses_are_retried(stub_server, monkeypatch):
+    statuses = iter([502, 500, 200])
+    server = stub_server(lambda path, headers: (next(statuses), {}, b"body"))
+    monkeypatch.setattr(http_client, "_session", http_client.create_session(backoff_factor=0))
+    r = http_client.fetch(server.url(), use_cache=False)
+    assert r.status_code == 200
+    assert len(server.requests) == 3
+
+
+def test_last_5xx_is_returned_once_retries_run_out(stub_server, monkeypatch):
+    server = stub_server(lambda path, headers: (500, {}, b"down"))
+    monkeypatch.setattr(http_client, "_session",
+                        http_client.create_session(retries=2, backoff_factor=0))
+    r = http_client.fetch(server.url(), use_cache=False)
+    assert r.status_code == 500
+    assert len(server.requests) == 3
+
+
+def test_gzip_bodies_are_negotiated_and_decoded(stub_server):
+    def respond(path, headers):
+        assert "gzip" in headers["Accept-Encoding"]
+        return 200, {"Content-Encoding": "gzip"}, gzip.compress(b"<html>compressed</html>")
+
+    server = stub_server(respond)
+    assert http_client.fetch(server.url(), use_cache=False).text == "<html>compressed</html>"
+
+
+def test_bodies_over_the_cap_are_refused(stub_server):
+    server = stub_server(lambda path, headers: (200, {}, b"x" * 2048))
+    with pytest.raises(http_client.ResponseTooLarge):
+        http_client.fetch(server.url(), use_cache=False, max_bytes=1024)
@@ -0,0 +1,69 @@
+import pytest
+
+from scraper.images import best_srcset, find_images, srcset_candidates
+from scraper.parsing import make_soup
+
+URL = "https://www.1mg.com/drugs/dolo-650-tablet"
+
+
+def images(body, name="Dolo 650 Tablet", **kwargs):
+    return find_images(make_soup(f"<html><head></head><body>{body}</body></html>"), URL, name, **kwargs)
+
+
+@pytest.mark.parametrize("srcset, candidates", [
+    ("a.jpg 300w, b.jpg 600w", [("a.jpg", "300w"), ("b.jpg", "600w")]),
+    ("a.jpg, b.jpg 2x", [("a.jpg", ""), ("b.jpg", "2x")]),
+    ("  a.jpg 1x ,b.jpg 2x  ", [("a.jpg", "1x"), ("b.jpg", "2x")]),
+    ("https://cdn/x.jpg?w=1,2 500w", [("https://cdn/x.jpg?w=1,2", "500w")]),
+    ("", []),
+])
+def test_srcset_candidates(srcset, candidates):
+    assert list(srcset_candidates(srcset)) == candidates
+
+
+def test_best_srcset_prefers_widths_then_the_largest():
+    assert best_srcset("a.jpg 2x, b.jpg 300w, c.jpg 900w") == "c.jpg"
+    assert best_srcset("a.jpg, b.jpg 3x", "c.jpg 1.5x") == "b.jpg"
+    assert best_srcset("data:image/gif;base64,R0 2000w, a.jpg 100w") == "a.jpg"
+    assert best_srcset("") is None
+
+
+def test_records_keep_every_image_unless_limited():
+    body = "".join(f'<img src="/product/{i}.jpg">' for i in range(8))
+    assert len(images(body)) == 8
+    assert images(body, limit=3) == [f"https://www.1mg.com/product/{i}.jpg" for i in range(3)]
+
+
+def test_picture_sources_compete_with_the_img():
+    body = ('<picture><source srcset="/product/small.webp 400w, /product/large.webp 1200w">'
+            '<img src="/product/fallback.jpg" srcset="/product/mid.jpg 800w"></picture>')
+    assert images(body) == ["https://www.1mg.com/product/large.webp"]
+
+
+def test_base_href_resolves_relative_urls():
+    page = make_soup('<html><head><base href="https://cdn.1mg.com/media/"></head>'
+                     '<body><img src="product/a.jpg"><img src="//img.1mg.com/product/b.jpg">'
+                     '<img src="/product/c.jpg"></body></html>')
+    assert find_images(page, URL) == ["https://cdn.1mg.com/media/product/a.jpg",
+                                      "https://img.1mg.com/product/b.jpg",
+                                      "https://cdn.1mg.com/product/c.jpg"]
+
+
+def test_data_placeholders_fall_through_to_lazy_sources():
+    body = ('<img src="data:image/gif;base64,R0lGOD" data-src="/product/lazy.jpg">'
+            '<img src="data:image/gif;base64,R0lGOD" alt="Dolo 650">')
+    assert images(body) == ["https://www.1mg.com/product/lazy.jpg"]
+
+
+def test_chrome_and_unrelated_images_are_skipped():
+    body = ('<img src="/static/logo-product.png"><img src="/banner/tablet.jpg">'
+            '<img src="/uploads/photo.jpg" alt="Dolo 650 strip"><img src="/uploads/team.jpg" alt="Our team">')
+    assert images(body) == ["https://www.1mg.com/uploads/photo.jpg"]
+
+
+def test_og_image_is_the_fallback_only():
+    head = ('<meta property="og:image" content="/og/dolo.jpg">'
+            '<meta name="twitter:image" content="/tw/dolo.jpg">')
+    assert images(head) == ["https://www.1mg.com/og/dolo.jpg"]
+    assert images(head + '<img src="/product/dolo.jpg">') == ["https://www.1mg.com/product/dolo.jpg"]
+    assert images('<meta property="og:image" content="/static/logo.png">') == []
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from scraper import http_client, rate_limiter
+from scraper.rate_limiter import HostLimiter, HostPolicy, RateLimiter, parse_retry_after
+
+FAST = dict(rate=100.0, burst=100, max_concurrency=4, min_rate=1.0)
+
+
+def throttling(statuses, retry_after=None):
+    """Stub responder answering each GET with the next status in turn."""
+    statuses = iter(statuses)
+
+    def respond(path, headers):
+        status = next(statuses)
+        extra = {"Retry-After": retry_after} if status == 429 and retry_after else {}
+        return status, extra, b"<html></html>"
+    return respond
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    """Installs a limiter for the stub server's host and returns it."""
+    limiter = RateLimiter(policies={"127.0.0.1": HostPolicy(**FAST)})
+    monkeypatch.setattr(rate_limiter, "_limiter", limiter)
+    monkeypatch.setattr(rate_limiter, "_limiter_enabled", True)
+    monkeypatch.setattr(http_client, "_session", http_client.create_session(backoff_factor=0))
+    return limiter
+
+
+def test_retry_after_is_honoured(stub_server, limiter):
+    server = stub_server(throttling([429, 200], retry_after="0.3"))
+    start = time.monotonic()
+    r = http_client.fetch(server.url(), use_cache=False)
+    assert r.status_code == 200
+    assert len(server.requests) == 2
+    assert time.monotonic() - start >= 0.3
+
+
+def test_throttling_without_retry_after_pauses_for_one_interval(stub_server, monkeypatch, limiter):
+    limiter.policies["127.0.0.1"] = HostPolicy(rate=4.0, burst=4, min_rate=1.0)
+    server = stub_server(throttling([503, 200]))
+    start = time.monotonic()
+    assert http_client.fetch(server.url(), use_cache=False).status_code == 200
+    assert time.monotonic() - start >= 0.5  # 1 / the halved rate of 2 req/s
+
+
+def test_last_throttled_response_is_returned_after_max_attempts(stub_server, limiter):
+    server = stub_server(throttling([429] * 3, retry_after="0"))
+    assert http_client.fetch(server.url(), use_cache=False).status_code == 429
+    assert len(server.requests) == HostPolicy().max_attempts
+
+
+def test_throttling_halves_the_rate_and_successes_restore_it(stub_server, limiter):
+    server = stub_server(throttling([429, 429, 200] + [200] * 40, retry_after="0"))
+    http_client.fetch(server.url(), use_cache=False)
+    host = limiter.for_host("127.0.0.1")
+    assert host.rate == pytest.approx(25.0 + 5.0)  # Halved twice, then one success
+    for _ in range(40):
+        http_client.fetch(server.url(), use_cache=False)
+    assert host.rate == 100.0  # Back up to, and capped at, the policy rate
+
+
+def test_slowdown_stops_at_the_minimum_rate():
+    host = HostLimiter("h", HostPolicy(rate=2.0, min_rate=0.5))
+    for _ in range(5):
+        host.feedback(429, {"Retry-After": "0"})
+    assert host.rate == 0.5
+
+
+def test_throttled_host_does_not_hold_up_other_hosts(stub_server, limiter):
+    limiter.policies["localhost"] = HostPolicy(**FAST)
+    throttled = stub_server(throttling([429, 200], retry_after="1"))
+    other = stub_server()
+    thread = threading.Thread(target=http_client.fetch,
+                              args=(throttled.url().replace("127.0.0.1", "localhost"),),
+                              kwargs={"use_cache": False})
+    thread.start()
+    time.sleep(0.1)  # localhost is now paused for a second
+    start = time.monotonic()
+    assert http_client.fetch(other.url(), use_cache=False).status_code == 200
+    assert time.monotonic() - start < 0.5
+    thread.join()
+    assert len(throttled.requests) == 2
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("2") == 2.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("garbage") is None
+    assert parse_retry_after(None) is None
+    assert 9 < parse_retry_after(time.strftime("%a, %d %b %Y %H:%M:%S GMT",
+                                               time.gmtime(time.time() + 10))) <= 10
+
+
+def test_streamed_body_holds_the_slot_until_read(stub_server, limiter):
+    limiter.policies["127.0.0.1"] = HostPolicy(rate=100.0, burst=100, max_concurrency=1)
+    server = stub_server()
+    first = http_client.fetch(server.url("/first"), use_cache=False, stream=True)
+    second = threading.Thread(target=http_client.fetch, args=(server.url("/second"),),
+                              kwargs={"use_cache": False})
+    second.start()
+    time.sleep(0.2)
+    assert [path for path, _ in server.requests] == ["/first"]
+    http_client.read_body(first)
+    second.join(timeout=5)
+    assert [path for path, _ in server.requests] == ["/first", "/second"]
+
+
+def test_slots_are_handed_out_in_arrival_order():
+    host = HostLimiter("h", HostPolicy(rate=1000.0, burst=1000, max_concurrency=1))
+    order = []
+
+    async def request(i):
+        await host.acquire_async()
+        order.append(i)
+        await asyncio.sleep(0)
+        host.release()
+
+    async def main():
+        host.acquire()
+        tasks = []
+        for i in range(5):
+            tasks.append(asyncio.create_task(request(i)))
+            await asyncio.sleep(0)  # Queue them one after another
+        # A thread queued behind the coroutines gets its turn after them
+        thread = threading.Thread(target=lambda: (host.acquire(), order.append("thread"),
+                                                  host.release()))
+        thread.start()
+        await asyncio.sleep(0.1)
+        host.release()
+        await asyncio.gather(*tasks)
+        await asyncio.to_thread(thread.join)
+
+    asyncio.run(main())
+    assert order == [0, 1, 2, 3, 4, "thread"]
+    assert host._in_flight == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    host = HostLimiter("h", HostPolicy(rate=1000.0, burst=1000, max_concurrency=1))
+
+    async def main():
+        host.acquire()
+        waiting = asyncio.create_task(host.acquire_async())
+        await asyncio.sleep(0)
+        waiting.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        host.release()
+        await asyncio.wait_for(host.acquire_async(), 1)
+        host.release()
+
+    asyncio.run(main())
+    assert host._in_flight == 0 and not host._waiters
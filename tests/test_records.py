@@ -0,0 +1,82 @@
+import glob
+import io
+import json
+import os
+
+import pytest
+
+from scraper.records import (FIELDS, SITE_FIELDS, MedicineRecord, dump_jsonl, from_columns,
+                             load_jsonl, to_columns)
+
+PAGES = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+URLS = {"1mg": "https://www.1mg.com/drugs/dolo-650-tablet-74467",
+        "apollo": "https://www.apollopharmacy.in/medicine/dolo-650mg-tablet"}
+
+
+def extracted(details_path):
+    """An extract_product envelope around a fixture page's stored details."""
+    site = os.path.basename(os.path.dirname(details_path))
+    with open(details_path, encoding="utf-8") as f:
+        details = json.load(f)
+    return {"url": URLS[site], "medicine_name": "Dolo 650 Tablet",
+            "product_images": ["https://cdn/a.jpg", "https://cdn/b.jpg"], "details": details}
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob(os.path.join(PAGES, "*", "*.json"))),
+                         ids=lambda path: "/".join(path.split(os.sep)[-2:]))
+def test_extractor_output_round_trips_exactly(path):
+    product = extracted(path)
+    record = MedicineRecord.from_product(product)
+    assert record.extra is None
+    assert record.to_product() == product
+    assert MedicineRecord.from_dict(json.loads(json.dumps(record.to_dict()))) == record
+
+
+def test_unset_keys_come_back_as_none():
+    product = {"url": URLS["apollo"], "medicine_name": "Dolo", "product_images": [],
+               "details": {"side_effects": "Nausea"}}
+    details = MedicineRecord.from_product(product).to_product()["details"]
+    assert list(details) == list(SITE_FIELDS["apollo"])
+    assert details["side_effects"] == "Nausea"
+    assert details["about_medicine"] is None and details["faqs"] == []
+
+
+def test_unknown_detail_keys_go_to_extra():
+    product = {"url": URLS["1mg"], "medicine_name": "Dolo", "product_images": [],
+               "details": {"overview": "Fever", "price": {"mrp": 30}, "badge": "Bestseller"}}
+    record = MedicineRecord.from_product(product)
+    assert record.overview == "Fever"
+    assert record.extra == {"price": {"mrp": 30}, "badge": "Bestseller"}
+    details = record.to_product()["details"]
+    assert (details["price"], details["badge"]) == ({"mrp": 30}, "Bestseller")
+    assert MedicineRecord.from_dict(record.to_dict()).extra == record.extra
+
+
+def test_unknown_sites_are_rejected():
+    with pytest.raises(ValueError):
+        MedicineRecord.from_product({"url": "https://example.com/x", "details": {}})
+
+
+def test_to_dict_leaves_out_empty_fields():
+    record = MedicineRecord(url="u", site="1mg", name="Dolo", faqs=(("Q?", "A."),))
+    assert record.to_dict() == {"url": "u", "site": "1mg", "name": "Dolo",
+                                "faqs": [{"q": "Q?", "a": "A."}]}
+    assert MedicineRecord.from_dict(record.to_dict()) == record
+
+
+def test_jsonl_and_columns_round_trip():
+    records = [MedicineRecord(url=f"u{i}", site="apollo", name=f"Dolo {i}", images=("a.jpg",) * i,
+                              faqs=(("Q?", "A."),), extra={"n": i} if i else None)
+               for i in range(3)]
+    out = io.StringIO()
+    assert dump_jsonl(records, out) == 3
+    assert list(load_jsonl(io.StringIO(out.getvalue()))) == records
+
+    columns = to_columns(records)
+    assert set(columns) == set(FIELDS)
+    assert columns["name"] == ["Dolo 0", "Dolo 1", "Dolo 2"]
+    # Columnar formats hand lists back instead of tuples
+    listed = {field: [list(v) if isinstance(v, tuple) else v for v in values]
+              for field, values in columns.items()}
+    listed["faqs"] = [[list(faq) for faq in faqs] for faqs in listed["faqs"]]
+    assert from_columns(listed) == records
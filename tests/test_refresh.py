@@ -0,0 +1,103 @@
+import pytest
+
+from scraper import http_client, rate_limiter, refresh
+from scraper.aio import run_sync
+from scraper.refresh import RefreshStore, changed_fields, content_hash, refresh_url_async
+
+PAGE = (b'<html><head><script>var t = 1;</script></head><body><nav>menu</nav>'
+        b'<div class="drug-info main" id="a1"><h1>Dolo 650</h1>'
+        b'<img src="/dolo.jpg" style="width:1px"></div></body></html>')
+
+
+def test_content_hash_ignores_chrome_ids_and_styles():
+    same = (PAGE.replace(b"var t = 1;", b"var t = 2;").replace(b"menu", b"Menu")
+            .replace(b'id="a1"', b'id="b7"').replace(b"width:1px", b"width:2px"))
+    assert content_hash(same) == content_hash(PAGE)
+    assert content_hash(b"<p>a   b</p>") == content_hash(b"<p>a\nb</p>")
+
+
+@pytest.mark.parametrize("old, new", [
+    (b'class="drug-info main"', b'class="drug-info side"'),   # Extractors select by class
+    (b"<h1>Dolo 650</h1>", b"<h2>Dolo 650</h2>"),            # ... and by tag
+    (b"/dolo.jpg", b"/dolo-new.jpg"),                          # Image targets
+    (b"Dolo 650", b"Dolo 500"),                                # Text
+])
+def test_content_hash_sees_what_extractors_read(old, new):
+    assert content_hash(PAGE.replace(old, new)) != content_hash(PAGE)
+
+
+def test_changed_fields():
+    old = {"url": "u", "medicine_name": "Dolo", "details": {"uses": "fever", "dosage": "1"}}
+    new = {"url": "u", "medicine_name": "Dolo 650", "details": {"uses": "fever", "storage": "cool"},
+           "product_images": ["a.jpg"]}
+    assert changed_fields(old, new) == ["details.dosage", "details.storage", "medicine_name",
+                                        "product_images"]
+    assert changed_fields(old, old) == []
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """A refresh store with the site lookup, extractor and catalog stubbed around it."""
+    extracted = []
+
+    async def extract(site, url, body, encoding):
+        extracted.append(url)
+        return {"url": url, "medicine_name": body.decode().split("<h1>")[1].split("<")[0]}
+
+    monkeypatch.setattr(refresh, "site_for", lambda url: "1mg")
+    monkeypatch.setattr(refresh, "extract_async", extract)
+    monkeypatch.setattr(refresh, "get_catalog", lambda: None)
+    monkeypatch.setattr(rate_limiter, "_limiter_enabled", False)
+    monkeypatch.setattr(http_client, "_session", None)
+    store = RefreshStore(path=str(tmp_path / "refresh.sqlite"))
+    store.extracted = extracted
+    yield store
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def page_server(stub_server, pages, etag='"v1"'):
+    """Serves pages[-1] with an ETag (if any), answering a matching If-None-Match with 304."""
+    validators = {"ETag": etag} if etag else {}
+
+    def respond(path, headers):
+        if etag and headers.get("If-None-Match") == etag:
+            return 304, validators, b""
+        return 200, validators, pages[-1]
+    return stub_server(respond)
+
+
+def test_matching_validators_skip_download_and_extraction(stub_server, store):
+    server = page_server(stub_server, [PAGE])
+    url = server.url("/drugs/dolo")
+    assert run_sync(refresh_url_async(url, store))[0]["status"] == "new"
+    entry, record = run_sync(refresh_url_async(url, store))
+    assert entry == {"url": url, "status": "unchanged", "by": "validators"}
+    assert record is None
+    assert server.requests[1][1]["If-None-Match"] == '"v1"'
+    assert store.extracted == [url]
+
+
+def test_same_content_skips_extraction(stub_server, store):
+    pages = [PAGE]
+    server = page_server(stub_server, pages, etag=None)
+    url = server.url("/drugs/dolo")
+    run_sync(refresh_url_async(url, store))
+    pages.append(PAGE.replace(b'id="a1"', b'id="z9"'))
+    assert run_sync(refresh_url_async(url, store))[0]["by"] == "content"
+    pages.append(PAGE.replace(b"Dolo 650", b"Dolo 650 Tablet"))
+    entry, record = run_sync(refresh_url_async(url, store))
+    assert entry == {"url": url, "status": "changed", "fields": ["medicine_name"]}
+    assert record["medicine_name"] == "Dolo 650 Tablet"
+    assert len(store.extracted) == 2
+
+
+def test_new_extractor_version_forces_extraction(stub_server, store, monkeypatch):
+    server = page_server(stub_server, [PAGE])
+    url = server.url("/drugs/dolo")
+    run_sync(refresh_url_async(url, store))
+    monkeypatch.setattr(refresh, "EXTRACTOR_VERSION", refresh.EXTRACTOR_VERSION + 1)
+    entry, _ = run_sync(refresh_url_async(url, store))
+    assert entry == {"url": url, "status": "unchanged", "by": "record"}
+    assert "If-None-Match" not in server.requests[1][1]  # Fetched in full
+    assert len(store.extracted) == 2
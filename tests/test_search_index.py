@@ -0,0 +1,77 @@
+import pytest
+
+from scraper import search_index
+from scraper.aio import run_sync
+from scraper.search_index import MISS, SearchIndex, indexed, normalize_query, note_answered
+
+
+@pytest.mark.parametrize("query, key", [
+    ("Dolo 650", "dolo 650"),
+    ("dolo 650mg", "dolo 650"),
+    ("Dolo 650 MG ", "dolo 650"),
+    ("dolo 500mg", "dolo 500"),
+    ("Calpol 120mg/5ml", "calpol 120"),
+    ("Calpol 0.5 mg/ml syrup", "calpol 0.5 syrup"),
+    ("Crocin-Advance", "crocin advance"),
+    ("  levocetrizen\t5mg  tablet ", "levocetrizen 5 tablet"),
+])
+def test_normalize_query(query, key):
+    assert normalize_query(query) == key
+
+
+def test_strengths_keep_their_own_entries(tmp_path):
+    index = SearchIndex(path=str(tmp_path / "index.sqlite"), seeds=None)
+    index.record("apollo", "Dolo 650mg", "https://a/dolo-650")
+    assert index.lookup("apollo", "dolo 650 mg") == "https://a/dolo-650"
+    assert index.lookup("apollo", "dolo 650") == "https://a/dolo-650"
+    assert index.lookup("apollo", "dolo 500mg") is MISS
+
+
+@pytest.fixture
+def index(tmp_path, monkeypatch):
+    index = SearchIndex(path=str(tmp_path / "index.sqlite"), seeds=None)
+    monkeypatch.setattr(search_index, "_index", index)
+    monkeypatch.setattr(search_index, "_index_enabled", True)
+    return index
+
+
+def counting_search(url, answered=True):
+    calls = []
+
+    @indexed("apollo")
+    async def search(product_name):
+        calls.append(product_name)
+        if answered:
+            note_answered()
+        return url
+    return search, calls
+
+
+def test_indexed_hit_skips_the_search(index):
+    index.record("apollo", "dolo 650", "https://a/dolo-650")
+    search, calls = counting_search("https://a/other")
+    assert run_sync(search("Dolo 650mg")) == "https://a/dolo-650"
+    assert calls == []
+
+
+def test_indexed_miss_searches_and_records(index):
+    search, calls = counting_search("https://a/dolo-650")
+    assert run_sync(search("Dolo 650mg")) == "https://a/dolo-650"
+    assert run_sync(search("dolo 650")) == "https://a/dolo-650"
+    assert calls == ["Dolo 650mg"]
+
+
+def test_indexed_records_answered_not_found(index):
+    search, calls = counting_search(None)
+    assert run_sync(search("unknown")) is None
+    assert index.lookup("apollo", "unknown") is None  # A remembered miss, not MISS
+    assert run_sync(search("unknown")) is None
+    assert calls == ["unknown"]
+
+
+def test_indexed_unanswered_search_is_not_recorded(index):
+    search, calls = counting_search(None, answered=False)
+    assert run_sync(search("unknown")) is None
+    assert index.lookup("apollo", "unknown") is MISS
+    run_sync(search("unknown"))
+    assert calls == ["unknown", "unknown"]
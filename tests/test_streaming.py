@@ -0,0 +1,102 @@
+import pytest
+
+from scraper import http_cache, http_client, rate_limiter
+from scraper.aio import fetch_async, run_sync
+from scraper.http_cache import ResponseCache
+from scraper.http_client import MAX_SCAN_BYTES, READ_REST
+from scraper.streaming import PageScanner, ScanRule
+
+
+def medicine_link(href):
+    return "https://a" + href if "/medicine/" in href else None
+
+
+def scanner(link=medicine_link, heading=None):
+    return PageScanner("https://a/page", ScanRule(link=link, heading=heading))
+
+
+def feed(scanner, html, chunk_size=7):
+    """Feeds html in small chunks; returns the chunk count read until the scanner said stop."""
+    body = html.encode()
+    for n, start in enumerate(range(0, len(body), chunk_size), 1):
+        if scanner.feed_bytes(body[start:start + chunk_size]):
+            return n
+    return None
+
+
+def test_first_matching_link_decides_and_stops_reading():
+    s = scanner()
+    html = '<a href="/about">x</a><a href="/medicine/dolo">Dolo</a>' + "<p>rest</p>" * 100
+    assert feed(s, html) is not None
+    assert s.result == "https://a/medicine/dolo"
+
+
+def test_heading_takes_priority_over_an_earlier_link():
+    s = scanner(heading=lambda text: "dolo" in text.lower())
+    s.feed_bytes(b'<a href="/medicine/other">Other</a>')
+    assert not s.decided  # A heading further down could still win
+    assert s.feed_bytes(b"<h1>Dolo 650 Tablet</h1><p>more</p>") is READ_REST
+    assert s.result == "https://a/page"
+
+
+def test_non_matching_heading_falls_back_to_the_link():
+    s = scanner(heading=lambda text: False)
+    assert feed(s, '<a href="/medicine/dolo">x</a><h1>Search results</h1>') is not None
+    assert s.result == "https://a/medicine/dolo"
+
+
+def test_heading_only_rule_decides_none_on_a_wrong_heading():
+    s = scanner(link=None, heading=lambda text: False)
+    assert s.feed_bytes(b"<h1>Not found</h1>") is True
+    assert s.decided and s.result is None
+
+
+def test_undecided_page_is_left_to_the_check():
+    s = scanner()
+    assert feed(s, '<div class="card"><a href="/otc/x">x</a></div>') is None
+    assert not s.decided
+    assert not s.scan(b"<p>no links here</p>")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / "cache.sqlite"), host_ttls={}, default_ttl=3600)
+    monkeypatch.setattr(http_cache, "_cache", cache)
+    monkeypatch.setattr(http_cache, "_cache_enabled", True)
+    monkeypatch.setattr(rate_limiter, "_limiter_enabled", False)
+    monkeypatch.setattr(http_client, "_session", None)
+    yield cache
+    if http_client._session is not None:
+        http_client._session.close()
+
+
+def test_product_page_decided_by_its_heading_is_read_whole_and_cached(stub_server, cache):
+    body = b"<html><h1>Dolo 650 Tablet</h1>" + b"<p>details</p>" * 10000 + b"</html>"
+    server = stub_server(lambda path, headers: (200, {}, body))
+    s = scanner(heading=lambda text: "dolo" in text.lower())
+    r = run_sync(fetch_async(server.url("/medicine/dolo"), consume=s.feed_bytes))
+    assert s.result == "https://a/page"
+    assert r.content == body
+    assert not getattr(r, "truncated", False)
+    assert run_sync(fetch_async(server.url("/medicine/dolo"))).content == body
+    assert len(server.requests) == 1  # The scrape that follows is answered from the cache
+
+
+def test_search_page_decided_by_a_link_stops_early_and_is_not_cached(stub_server, cache):
+    body = b'<html><a href="/medicine/dolo">Dolo</a>' + b"<p>result</p>" * 10000 + b"</html>"
+    server = stub_server(lambda path, headers: (200, {}, body))
+    s = scanner()
+    r = run_sync(fetch_async(server.url("/search"), consume=s.feed_bytes))
+    assert s.result == "https://a/medicine/dolo"
+    assert r.truncated and len(r.content) < len(body)
+    assert cache.lookup(server.url("/search")) is None
+
+
+def test_undecided_scan_stops_at_the_scan_cap(stub_server, cache):
+    body = b"<html>" + b"<p>no links</p>" * (MAX_SCAN_BYTES // 10) + b"</html>"
+    server = stub_server(lambda path, headers: (200, {}, body))
+    s = scanner()
+    r = run_sync(fetch_async(server.url("/search"), consume=s.feed_bytes))
+    assert not s.decided
+    assert r.truncated
+    assert MAX_SCAN_BYTES <= len(r.content) < len(body)
@@ -0,0 +1,44 @@
+import json
+
+from scraper.parsing import make_soup
+from scraper.structured_data import extract_structured
+
+
+def page(h1, next_data=None, json_ld=None):
+    scripts = ""
+    if json_ld is not None:
+        scripts += f'<script type="application/ld+json">{json.dumps(json_ld)}</script>'
+    if next_data is not None:
+        scripts += f'<script id="__NEXT_DATA__" type="application/json">{json.dumps(next_data)}</script>'
+    return make_soup(f"<html><head>{scripts}</head><body><h1>{h1}</h1></body></html>")
+
+
+def test_fields_come_from_the_product_node_only():
+    next_data = {"props": {"pageProps": {
+        "settings": {"description": "India's leading online pharmacy", "storage": "Cloud storage"},
+        "seo": {"name": "Dolo 650 Tablet", "description": "Buy Dolo 650 Tablet online"},
+        "product": {
+            "productName": "Dolo 650mg Tablet 15's",
+            "description": "Dolo 650 relieves fever and pain.",
+            "relatedProducts": [{"productName": "Calpol 500 Tablet", "storage": "Below 25C"}],
+        },
+    }}}
+    data = extract_structured("apollo", page("Dolo 650 Tablet", next_data))
+    assert data == {"about_medicine": "Dolo 650 relieves fever and pain."}
+
+
+def test_pages_without_a_product_node_are_left_to_the_dom():
+    next_data = {"props": {"pageProps": {"settings": {"description": "India's leading online pharmacy"}}}}
+    assert extract_structured("1mg", page("Dolo 650 Tablet", next_data)) == {}
+
+
+def test_top_level_json_ld_drug_is_the_fallback_product_node():
+    json_ld = [
+        {"@type": "Organization", "description": "A pharmacy"},
+        {"@type": "Drug", "name": "Paracetamol", "description": "Relieves pain.",
+         "isSimilarTo": {"@type": "Drug", "name": "Other", "storage": "Cool place"}},
+        {"@type": "FAQPage", "mainEntity": [
+            {"@type": "Question", "name": "Is it safe?", "acceptedAnswer": {"text": "Yes."}}]},
+    ]
+    data = extract_structured("apollo", page("Crocin Advance", json_ld=json_ld))
+    assert data == {"about_medicine": "Relieves pain.", "faqs": [{"q": "Is it safe?", "a": "Yes."}]}